@@ -1,58 +1,46 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
+from nimphel.crossbar import IdealCrossbar
+from nimphel.results import read_ocnprint
+from nimphel.storage import load_matrix
+
 
 positiveCurrentfilepath = "./CURRENTS/positivecurrent.txt"
 negativeCurrentfilepath = "./CURRENTS/negativecurrent.txt"
 
+# Simulated input and crossbars, for the ideal reference
+inputfilepath = "./INPUTS/inputs_0.csv"
+resistorfilepath = "./RESISTANCES/resistances.csv"
+resistorNegfilepath = "./RESISTANCES/resistances_neg.csv"
 
-# Stores current values in order from COL_000 to COL_099 in a list
-
-with open(positiveCurrentfilepath, "r", encoding="utf8") as f1:
-    f1.readline()
-    f1.readline()
-    f1.readline()
-    f1.readline()
-    f1.readline()
-    poscurrent = f1.readline()
-
-listOfPositiveCurrentString = poscurrent.split()
-listOfPositiveCurrentString.pop(0)
-
-listOfPositiveCurrent = []
 
-for i in listOfPositiveCurrentString:
-    listOfPositiveCurrent.append((-1)*float(i))
+# Columns of the second time point (sixth line of the file), in order from
+# COL_000 to COL_099 and from COLN_000 to COLN_099
+# ocnPrint truncates the labels, so they are given explicitly
+timeIndex = 1
 
-print(listOfPositiveCurrent)
+positiveCurrents = read_ocnprint(positiveCurrentfilepath, labels=[f"COL_{i:03d}" for i in range(100)])
+negativeCurrents = read_ocnprint(negativeCurrentfilepath, labels=[f"COLN_{i:03d}" for i in range(100)])
 
-# Stores current values in order from COLN_000 to COLN_099 in a list
+listOfPositiveCurrent = (-1) * positiveCurrents.values[timeIndex]
+listOfNegativeCurrent = negativeCurrents.values[timeIndex]
 
-with open(negativeCurrentfilepath, "r", encoding="utf8") as f1:
-    f1.readline()
-    f1.readline()
-    f1.readline()
-    f1.readline()
-    f1.readline()
-    poscurrent = f1.readline()
+print(listOfPositiveCurrent.tolist())
+print(listOfNegativeCurrent.tolist())
 
-listOfNegativeCurrentString = poscurrent.split()
-listOfNegativeCurrentString.pop(0)
-
-listOfNegativeCurrent = []
+# Computes the value of each column current
 
-for i in listOfNegativeCurrentString:
-    listOfNegativeCurrent.append(float(i))
+listOfCurrent = listOfPositiveCurrent + listOfNegativeCurrent
 
-print(listOfNegativeCurrent)
+print(listOfCurrent.tolist())
 
-# Computes the value of each column current
+# Ideal reference: same currents without any wire resistance, I = G^T V for each crossbar
 
-listOfCurrent = []
-for i in range(len(listOfPositiveCurrent)):
-    listOfCurrent.append(listOfPositiveCurrent[i] + listOfNegativeCurrent[i])
+idealCrossbar = IdealCrossbar.from_resistances(load_matrix(resistorfilepath, prefer_binary=True), load_matrix(resistorNegfilepath, prefer_binary=True))
+idealCurrent = idealCrossbar.differential(load_matrix(inputfilepath)[0])
 
-print(listOfCurrent)
+print("Max deviation from the ideal crossbar (A):", np.abs(listOfCurrent - idealCurrent).max())
 
 # Histogramme pour tous les courants sur toutes les colonnes sans et avec process variability
 # Et un histogramme sur chaque colonne avec process variability 
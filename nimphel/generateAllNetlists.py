@@ -1,4 +1,16 @@
-import subprocess
+#!/usr/bin/env python3
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from mnist_rram import load_matrix, crossbar, build_template, write_from_template, write_sweep
+from mnist_rram import nets_in, nets_col, nets_col_neg, Mem
+from nimphel.readers import read_many
+from nimphel.variability import Variability
+
+import numpy as np
 
 # DIRECTORIES
 
@@ -12,12 +24,195 @@ process_var_dir = "./NETLISTS/PV"
 numberOfInputs = 20
 numberOfProcessVariabiliyFiles = 20
 
-# Generates 20 netlists with the same resistor crossbar (no process variability)
-for i in range(numberOfInputs):
-    result = subprocess.call(["python3", "mnist_rram.py", input_dir + "/" + "inputs_" + str(i) + ".csv", res_dir + "/" + "resistances" + ".csv", res_dir + "/" + "resistances_neg" + ".csv", netlist_dir + "/netlist_no_PV" + str(i)])
+# Process variability: sigma = 0.03 * (Rmax - Rmin)
+Rmin = 1e4
+Rmax = 1e6
+seed = 0
+
+# Nominal resistances of the positive and negative crossbars
+resistance_files = (res_dir + "/resistances.csv", res_dir + "/resistances_neg.csv")
+
+
+def up_to_date(output, sources):
+    """Returns True if the output exists and is newer than all its sources"""
+    if not os.path.exists(output):
+        return False
+    mtime = os.path.getmtime(output)
+    return all(os.path.getmtime(s) <= mtime for s in sources)
+
+
+def load_crossbars(sample=None, seed=seed):
+    """Resistances of the positive and negative crossbars
+
+    Args:
+        sample: Index of the process variability sample. If None, the nominal resistances are returned
+        seed: Seed of the process variability
+
+    Returns:
+        The (positive, negative) resistance matrices
+    """
+    nominal = tuple(load_matrix(f, prefer_binary=True) for f in resistance_files)
+    if sample is None:
+        return nominal
+    variability = Variability.from_range(Rmin, Rmax, 0.03, seed)
+    # Each crossbar has its own stream so that their noise is independent
+    return tuple(variability.sample(r, sample, stream=i) for i, r in enumerate(nominal))
+
+
+def generate(sample, jobs, force=False, include=None, seed=seed):
+    """Generates the netlists of a crossbar for many input files
+
+    The resistance matrices are read and the crossbar is formatted only once.
+
+    Args:
+        sample: Index of the process variability sample, or None for the nominal crossbar
+        jobs: List of (input file, netlist) pairs
+        force: If True, netlists are generated even if they are up to date
+        include: If given, the crossbar is written once to this file and the netlists include it
+        seed: Seed of the process variability
+
+    Returns:
+        The list of (netlist, generated) pairs
+    """
+    pending = [
+        (input_file, netlist)
+        for input_file, netlist in jobs
+        if force or not up_to_date(netlist, [input_file, *resistance_files])
+        or (include and not up_to_date(include, resistance_files))
+    ]
+    done = [(job[1], False) for job in jobs if job not in pending]
+    if not pending:
+        return done
+    resistances, resistances_neg = load_crossbars(sample, seed)
+    crossbars = [
+        crossbar(resistances, nets_col),
+        crossbar(resistances_neg, nets_col_neg),
+    ]
+    # Netlists of a group are in the same directory as the include file
+    reference = include and os.path.basename(include)
+    template = build_template(crossbars, include=include, reference=reference)
+    if include:
+        template.write_include()
+    for input_file, netlist in pending:
+        inputs = load_matrix(input_file)[0]
+        write_from_template(template, inputs, netlist)
+        done.append((netlist, True))
+    return done
+
 
-# Generates for each input file 20 crossbar with different resistor values due to process variability
+def sweep(numberOfInputs, numberOfProcessVariabiliyFiles):
+    """Jobs of the sweep grouped by process variability sample
 
-for i in range(numberOfInputs):
+    Returns:
+        A dictionary with the sample index (None for the nominal crossbar) as keys and, as values,
+        the list of (input file, netlist) pairs and the include file of the crossbar
+    """
+    inputs = [input_dir + "/inputs_" + str(i) + ".csv" for i in range(numberOfInputs)]
+    grid = {}
+    # 20 netlists with the same resistor crossbar (no process variability)
+    include = netlist_dir + "/crossbar_no_PV.scs"
+    grid[None] = ([(f, netlist_dir + "/netlist_no_PV" + str(i)) for i, f in enumerate(inputs)], include)
+    # For each input file 20 crossbar with different resistor values due to process variability
     for j in range(numberOfProcessVariabiliyFiles):
-        result = subprocess.call(["python3", "mnist_rram.py", input_dir + "/" + "inputs_" + str(i) + ".csv", res_dir + "/" + "processvariabiliy" + str(j) + ".csv", res_dir + "/" + "processvariabiliy_neg_" + str(j) + ".csv", process_var_dir + "/netlist_input_" + str(i) + "res_" + str(j)])
+        include = process_var_dir + "/crossbar_res_" + str(j) + ".scs"
+        grid[j] = ([(f, process_var_dir + "/netlist_input_" + str(i) + "res_" + str(j)) for i, f in enumerate(inputs)], include)
+    return grid
+
+
+def generate_sweeps(grid, seed=seed):
+    """Writes a single netlist for all the inputs without process variability and another one for all the inputs and process variability samples"""
+    (nominal, (jobs, _)), *variability = grid.items()
+    vectors = [load_matrix(input_file)[0] for input_file, _ in jobs]
+    write_sweep(vectors, [load_crossbars(nominal)], netlist_dir + "/sweep_no_PV.scs")
+    print(netlist_dir + "/sweep_no_PV.scs")
+    if variability:
+        write_sweep(vectors, [load_crossbars(sample, seed) for sample, _ in variability], process_var_dir + "/sweep.scs")
+        print(process_var_dir + "/sweep.scs")
+
+
+def crossbar_from_columns(columns):
+    """Resistance matrices of the positive and negative crossbars of a netlist read by `read_many`"""
+    shape = (len(nets_in), len(nets_col))
+    crossbars = (np.zeros(shape), np.zeros(shape))
+    resistors = columns.select(Mem.name)
+    if resistors is None:
+        return crossbars
+    # Lookup tables from the net ids of the netlist to the rows and columns of the crossbars
+    index = {net: i for i, net in enumerate(nets_in)}
+    index.update({net: i for i, net in enumerate(nets_col)})
+    index.update({net: i for i, net in enumerate(nets_col_neg)})
+    lookup = np.array([index.get(net, -1) for net in columns.nets])
+    negative = np.isin(columns.nets, nets_col_neg)
+    p, n = (resistors.nodes[:, resistors.node_names.index(k)] for k in ("P", "N"))
+    rows, cols, neg = lookup[p], lookup[n], negative[n]
+    r = resistors.params["r"].astype(float)
+    crossbars[0][rows[~neg], cols[~neg]] = r[~neg]
+    crossbars[1][rows[neg], cols[neg]] = r[neg]
+    return crossbars
+
+
+def audit(grid, include=False, seed=seed, workers=None):
+    """Checks that the resistances of the generated netlists match the crossbars they were generated from
+
+    The netlists (or the include files of the crossbars) are read in parallel as columns.
+
+    Returns:
+        The list of netlists that do not match
+    """
+    files = [
+        (sample, path)
+        for sample, (jobs, include_file) in grid.items()
+        for path in ([include_file] if include else [netlist for _, netlist in jobs])
+        if os.path.exists(path)
+    ]
+    expected = {sample: load_crossbars(sample, seed) for sample in grid}
+    mismatches = []
+    for (sample, path), columns in zip(files, read_many([path for _, path in files], [Mem], workers)):
+        found = crossbar_from_columns(columns)
+        if not all(np.allclose(f, e, rtol=1e-12, atol=0) for f, e in zip(found, expected[sample])):
+            mismatches.append(path)
+    print(f"Audited {len(files)} files, {len(mismatches)} mismatches")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the netlists of all the inputs and process variability samples")
+    parser.add_argument('--inputs', type=int, default=numberOfInputs, help="Number of input files")
+    parser.add_argument('--samples', type=int, default=numberOfProcessVariabiliyFiles, help="Number of process variability samples")
+    parser.add_argument('--seed', type=int, default=seed, help="Seed of the process variability. Use --force after changing it")
+    parser.add_argument('--workers', type=int, default=None, help="Number of processes. Defaults to the number of CPUs")
+    parser.add_argument('--force', action="store_true", help="Generate the netlists even if they are up to date")
+    parser.add_argument('--include', action="store_true", help="Write each crossbar once to an include file instead of copying it into every netlist")
+    parser.add_argument('--audit', action="store_true", help="Check the resistances of the generated netlists instead of generating them")
+    parser.add_argument('--sweep', action="store_true", help="Write single netlists sweeping all the inputs and samples instead of a netlist per input and sample")
+    args = parser.parse_args()
+
+    os.makedirs(process_var_dir, exist_ok=True)
+    grid = sweep(args.inputs, args.samples)
+    if args.audit:
+        for path in audit(grid, args.include, args.seed, args.workers):
+            print(f"Mismatch: {path}")
+        return
+    if args.sweep:
+        generate_sweeps(grid, args.seed)
+        return
+
+    total = sum(len(jobs) for jobs, _ in grid.values())
+    count, generated, start = 0, 0, time.time()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(generate, sample, jobs, args.force, include if args.include else None, args.seed)
+            for sample, (jobs, include) in grid.items()
+        ]
+        for future in as_completed(futures):
+            for netlist, written in future.result():
+                count += 1
+                generated += written
+                print(f"[{count}/{total}] {netlist}" + ("" if written else " (up to date)"))
+
+    print(f"Generated {generated} netlists in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,12 @@
-import csv
-import numpy as np
 import argparse
 
-def invert_csv(input_filepath, output_filepath):
-    # Lire le fichier CSV
-    with open(input_filepath, 'r', newline='') as infile:
-        reader = csv.reader(infile)
-        data = list(reader)
-    
-    # Convertir les données en un tableau numpy et le transposer
-    data_array = np.array(data)
-    transposed_data = data_array.T
-    
-    # Écrire les données transposées dans un nouveau fichier CSV
-    with open(output_filepath, 'w', newline='') as outfile:
-        writer = csv.writer(outfile)
-        writer.writerows(transposed_data)
+from nimphel.storage import transpose_csv
+
+def invert_csv(input_filepath, output_filepath, memory=256 << 20):
+    # Le fichier est lu par blocs de lignes dans un tampon projeté en mémoire, qui garde le
+    # texte des valeurs, puis écrit transposé par blocs de colonnes : la mémoire utilisée
+    # est bornée par `memory`
+    transpose_csv(input_filepath, output_filepath, memory=memory)
 
 def main():
     # Créer un analyseur d'arguments
@@ -23,13 +14,14 @@ def main():
     
     # Ajouter des arguments pour les chemins des fichiers d'entrée et de sortie
     parser.add_argument('input_filepath', type=str, help='Le chemin du fichier CSV d\'entrée.')
-    parser.add_argument('output_filepath', type=str, help='Le chemin du fichier CSV de sortie.')
+    parser.add_argument('output_filepath', type=str, help='Le chemin du fichier CSV de sortie (binaire si le suffixe est .npy).')
+    parser.add_argument('--memory', type=int, default=256, help='Mémoire maximale d\'un bloc, en Mo.')
 
     # Analyser les arguments
     args = parser.parse_args()
     
     # Inverser les lignes et colonnes du fichier CSV
-    invert_csv(args.input_filepath, args.output_filepath)
+    invert_csv(args.input_filepath, args.output_filepath, args.memory << 20)
 
 if __name__ == '__main__':
     main()
@@ -1,19 +1,13 @@
 #!/usr/bin/env python3
 
 from nimphel.core import *
-from nimphel.readers import *
 from nimphel.writers import *
+from nimphel.storage import load_matrix
+from nimphel.crossbar import build_crossbar
+from nimphel.mapping import conductance
 from itertools import product
 import argparse
-
-parser = argparse.ArgumentParser(description="Generate a crossbar array from an input file and a resistor file to a netlist file")
-
-parser.add_argument('input_file', type=str, help="File containing the INPUTS for the crossbar")
-parser.add_argument('resistor_file', type=str, help="File containing the positive resistors for the crossbar")
-parser.add_argument('resistor_neg_file', type=str, help="File containing the 'negative' resistors for the crossbar")
-parser.add_argument('netlist', type=str, help="Filepath to netlist")
-
-args = parser.parse_args()
+import numpy as np
 
 # Only on first layer of the network 
 rows = 784
@@ -29,63 +23,171 @@ nets_col_neg = [f"COLN_{i:03d}" for i in range(cols)]
 # Components
 Vsource = Component("vsource", ["VDD", "GND"], {"type": "pwl"}, cap="V")
 Mem = Component("resistor", ["P", "N"], {})
-circuit = Circuit()
-
-# netlistHeader
-circuit += Directive("simulator", lang="spectre")
-circuit += Directive("global 0 gnd!")
-
-# For whatever reason, it is impossible to descend into hierarchy to get signals that's why
-# I add them as input/output of a symbol
-listOfNets = ""
-for i in nets_col:
-    listOfNets += " "
-    listOfNets += i
-for j in nets_col_neg:
-    listOfNets += " "
-    listOfNets += j
-circuit += Directive("subckt mnist_grid" + listOfNets)
-
-
-with open(args.input_file, "r") as fin:
-    line = fin.readline().split(",")
-    line = [float(j) for j in line]
-    for i in range(len(nets_in)):
-        circuit.add(Vsource.new(dict(VDD=i, GND=0), params={"dc": line[i]}))
-fin.close()
-
-
-with open(args.resistor_file, "r") as fr:
-    for i in nets_in:
-        listOfResistances = fr.readline().split(",")
-        listOfResistances = [float(j) for j in listOfResistances]
-        for o in range(len(nets_col)):
-            if(listOfResistances[o] != 0): # Do not place a resistor if there is a negative weight at this index
-                inst = Mem.new(dict(P=i, N=nets_col[o]), params={"r" : listOfResistances[o]})
-                circuit.add(inst)
-fr.close()
-
-with open(args.resistor_neg_file, "r") as frneg:
-    for i in nets_in:
-        listOfResistances = frneg.readline().split(",")
-        listOfResistances = [float(j) for j in listOfResistances]
-        for o in range(len(nets_col_neg)):
-            if(listOfResistances[o] != 0): # Do not place a resistor if there is a negative weight at this index
-                inst = Mem.new(dict(P=i, N=nets_col_neg[o]), params={"r" : listOfResistances[o]})
-                circuit.add(inst)
-frneg.close()
-
-
-
-    
-
-writer = SpectreWriter()
-
-with open(args.netlist, "w+") as fp:
-
-    writer.dump_to_file(circuit, fp)
-    fp.write("\n")
-    fp.write("ends mnist_grid")
 
-fp.close()
 
+def crossbar(resistances, nets_out):
+    """Creates a resistor between each input and output net
+
+    Do not place a resistor if there is a negative weight at this index (resistance is 0)
+    """
+    rows_idx, cols_idx = np.nonzero(resistances)
+    P = np.asarray(nets_in)[rows_idx]
+    N = np.asarray(nets_out)[cols_idx]
+    return Mem.new_many(dict(P=P, N=N), params={"r": resistances[rows_idx, cols_idx]})
+
+
+def parasitic_crossbar(resistances, nets_out, wire):
+    """Same as `crossbar`, with a resistance `wire` between two cells of the rows and columns"""
+    return build_crossbar(conductance(resistances), nets_in, nets_out, wire, wire)
+
+
+def header():
+    """Directives at the start of the netlist"""
+    # For whatever reason, it is impossible to descend into hierarchy to get signals that's why
+    # I add them as input/output of a symbol
+    listOfNets = " ".join(nets_col + nets_col_neg)
+    return [
+        Directive("simulator", lang="spectre"),
+        Directive("global 0 gnd!"),
+        Directive("subckt mnist_grid " + listOfNets),
+    ]
+
+
+def sources(inputs):
+    """Voltage sources driving each input row"""
+    return Vsource.new_many(dict(VDD=nets_in, GND=0), params={"dc": inputs})
+
+
+def build_circuit(inputs, crossbars):
+    """Creates the crossbar netlist for an input vector
+
+    Args:
+        inputs: Voltage of each input row
+        crossbars: Resistors of the positive and negative crossbars, as created by `crossbar`
+    """
+    circuit = Circuit(columnar=True)
+    circuit.add(header())
+    circuit.add(sources(inputs))
+    for batch in crossbars:
+        circuit.add(batch)
+    return circuit
+
+
+def write_netlist(circuit, path):
+    writer = SpectreWriter()
+    with open(path, "w+") as fp:
+        writer.dump_to_file(circuit, fp)
+        fp.write("\n")
+        fp.write("ends mnist_grid")
+
+
+def build_template(crossbars, include=None, reference=None):
+    """Template whose body contains the resistors of the crossbars
+
+    Args:
+        crossbars: Resistors of the positive and negative crossbars, as created by `crossbar`
+        include: If given, the crossbars are written to this file instead of every netlist
+        reference: Path of the include file as seen from the netlists
+    """
+    body = Circuit(columnar=True)
+    body.add(crossbars)
+    return Template(SpectreWriter(), body, include=include, reference=reference)
+
+
+def write_from_template(template, inputs, path):
+    """Writes the netlist of an input vector, only formatting the sources"""
+    head = Circuit(columnar=True)
+    head.add(header())
+    head.add(sources(inputs))
+    with open(path, "w+") as fp:
+        template.dump_to_file(fp, head=head, tail=Directive("ends mnist_grid"))
+
+
+def write_sweep(vectors, samples, path, altergroups=False):
+    """Writes a single netlist running a DC analysis for every input vector and resistance sample
+
+    The voltages of the sources (and the resistances, if there are many samples) are netlist
+    parameters that are changed between analyses, so the crossbar is only parsed once.
+    With many samples, alter groups are always used and only contain the changed parameters.
+
+    Args:
+        vectors: Matrix with an input vector per row
+        samples: List of (positive, negative) resistance matrices.
+            All samples must have resistors at the same positions.
+        path: Filepath to netlist
+        altergroups: If True, use alter groups instead of a paramset sweep for the inputs
+    """
+    vectors = np.atleast_2d(vectors)
+    vin = [f"vin_{i:03d}" for i in range(rows)]
+    crossbars = [crossbar(samples[0][0], nets_col), crossbar(samples[0][1], nets_col_neg)]
+    positions = [np.nonzero(matrix) for matrix in samples[0]]
+    if len(samples) > 1:
+        # Each resistor gets its own parameter
+        for batch, (r, c), prefix in zip(crossbars, positions, ["rp", "rn"]):
+            batch.params["r"] = np.array([f"{prefix}_{i:03d}_{j:03d}" for i, j in zip(r, c)])
+
+    def resistors(sample):
+        if len(samples) == 1:
+            return {}
+        return {
+            name: value
+            for batch, (r, c), matrix in zip(crossbars, positions, sample)
+            for name, value in zip(batch.params["r"].tolist(), matrix[r, c].tolist())
+        }
+
+    op = Analysis("op", "dc")
+    if len(samples) == 1 and not altergroups:
+        parameters, *analyses = parameter_sweep(op, dict(zip(vin, vectors.T)))
+    else:
+        parameters = Directive("parameters", {**dict(zip(vin, vectors[0].tolist())), **resistors(samples[0])})
+        previous = dict(parameters.args)
+        analyses = []
+        for j, sample in enumerate(samples):
+            changed_resistors = resistors(sample) if j else {}
+            for i, inputs in enumerate(vectors.tolist()):
+                changed = {k: v for k, v in zip(vin, inputs) if previous[k] != v}
+                changed.update(changed_resistors if i == 0 else {})
+                if changed:
+                    analyses.append(AlterGroup(f"alt_{j}_{i}", changed))
+                    previous.update(changed)
+                analyses.append(Analysis(f"op_{j}_{i}", "dc"))
+
+    simulator, ground, subckt = header()
+    head = Circuit(columnar=True)
+    head.add([simulator, ground, parameters, subckt])
+    head.add(Vsource.new_many(dict(VDD=nets_in, GND=0), params={"dc": vin}))
+
+    tail = Circuit()
+    tail.add(Directive("ends mnist_grid"))
+    # The columns are connected to the ground to measure their currents
+    tail.add(Directive(f"I0 ({' '.join(['0'] * 2 * cols)}) mnist_grid"))
+    tail.add(Directive("save_currents options currents=all"))
+    tail.add(analyses)
+
+    template = build_template(crossbars)
+    with open(path, "w+") as fp:
+        template.dump_to_file(fp, head=head, tail=tail)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a crossbar array from an input file and a resistor file to a netlist file")
+
+    parser.add_argument('input_file', type=str, help="File containing the INPUTS for the crossbar")
+    parser.add_argument('resistor_file', type=str, help="File containing the positive resistors for the crossbar")
+    parser.add_argument('resistor_neg_file', type=str, help="File containing the 'negative' resistors for the crossbar")
+    parser.add_argument('netlist', type=str, help="Filepath to netlist")
+    parser.add_argument('--wire', type=float, default=0, help="Resistance of the wires between two cells (IR drop), 0 for ideal wires")
+
+    args = parser.parse_args()
+
+    inputs = load_matrix(args.input_file)[0]
+    resistances = [load_matrix(f, prefer_binary=True) for f in (args.resistor_file, args.resistor_neg_file)]
+    if args.wire > 0:
+        crossbars = [parasitic_crossbar(r, nets, args.wire) for r, nets in zip(resistances, [nets_col, nets_col_neg])]
+    else:
+        crossbars = [crossbar(r, nets) for r, nets in zip(resistances, [nets_col, nets_col_neg])]
+    write_netlist(build_circuit(inputs, crossbars), args.netlist)
+
+
+if __name__ == "__main__":
+    main()
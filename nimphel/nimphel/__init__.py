@@ -4,3 +4,9 @@ from . import utils
 from . import core
 from . import readers
 from . import writers
+from . import mapping
+from . import variability
+from . import storage
+from . import results
+from . import crossbar
+from . import montecarlo
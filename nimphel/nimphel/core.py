@@ -5,9 +5,22 @@ from pathlib import Path
 from dataclasses import dataclass, field, asdict, fields
 from collections import defaultdict
 
-from typing import List, Dict, Any, Union, Optional, IO, TypeAlias
+from typing import (
+    List,
+    Dict,
+    Any,
+    Union,
+    Optional,
+    IO,
+    Tuple,
+    Iterator,
+    NamedTuple,
+    TypeAlias,
+)
 from os import PathLike
 
+import numpy as np
+
 from nimphel.utils import missing_defaults
 
 #: A Node represents an electrical point in the circuit
@@ -73,7 +86,7 @@ class Directive:
             >>> d2 = Directive("tran 0 stop=100n")
             >>> d1 == d2 # False
         """
-        if not isinstance(other, Directive):
+        if not isinstance(other, Directive) or type(other) is not type(self):
             return False
 
         if self.is_raw and other.is_raw:
@@ -83,6 +96,151 @@ class Directive:
         return False
 
 
+@dataclass
+class Analysis(Directive):
+    """Simulator analysis
+
+    Attributes:
+        name: Name of the analysis
+        command: The type of analysis (e.g. tran, dc, ac)
+        args: Dictionary containing the name and values of the analysis arguments
+
+    Example:
+        >>> Analysis("tran1", "tran", stop="10m")
+        >>> # tran1 tran stop=10m
+    """
+
+    name: str = ""
+
+    def __init__(
+        self, name: str, command: str, args: Optional[Dict[str, Any]] = None, **kwargs
+    ):
+        super().__init__(command, args, **kwargs)
+        self.name = name
+
+
+@dataclass
+class AlterGroup(Directive):
+    """Group of parameter changes applied to the analyses that follow it
+
+    Attributes:
+        name: Name of the alter group
+        args: Dictionary containing the name and new values of the parameters
+
+    Example:
+        >>> AlterGroup("alt1", {"vin": 0.5})
+        >>> # alt1 altergroup {
+        >>> # parameters vin=0.5
+        >>> # }
+    """
+
+    name: str = ""
+
+    def __init__(self, name: str, args: Optional[Dict[str, Any]] = None, **kwargs):
+        super().__init__("altergroup", args, **kwargs)
+        self.name = name
+
+
+@dataclass
+class ParamSet(Directive):
+    """Table of parameter values that can be swept
+
+    Attributes:
+        name: Name of the paramset
+        args: Dictionary containing the name and the list of values of each parameter
+
+    Example:
+        >>> ParamSet("inputs", {"v0": [0, 1], "v1": [1, 0]})
+        >>> # inputs paramset {
+        >>> # v0 v1
+        >>> # 0 1
+        >>> # 1 0
+        >>> # }
+    """
+
+    name: str = ""
+
+    def __init__(self, name: str, args: Optional[Dict[str, Any]] = None, **kwargs):
+        super().__init__("paramset", args, **kwargs)
+        self.name = name
+
+
+@dataclass
+class Sweep(Directive):
+    """Sweep running the analyses of its body for every value of a parameter or paramset
+
+    Attributes:
+        name: Name of the sweep
+        args: Dictionary containing the arguments of the sweep (e.g. param, values, paramset)
+        body: List of Analyses performed at each point of the sweep
+
+    Example:
+        >>> Sweep("swp", [Analysis("op", "dc")], param="vin", values=[0, 1])
+        >>> # swp sweep param=vin values=[0 1] {
+        >>> # op dc
+        >>> # }
+    """
+
+    name: str = ""
+    body: List[Directive] = field(default_factory=list)
+
+    def __init__(
+        self,
+        name: str,
+        body: Optional[List[Directive]] = None,
+        args: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ):
+        super().__init__("sweep", args, **kwargs)
+        self.name = name
+        self.body = body or []
+
+
+def parameter_sweep(
+    analysis: Analysis,
+    table: Dict[str, Any],
+    altergroups: bool = False,
+    name: str = "swp",
+) -> List[Directive]:
+    """Run an analysis for every row of a table of parameters
+
+    The first row of the table is used as the default value of the parameters.
+    The directives returned either contain an AlterGroup and a copy of the analysis for each row,
+    or a ParamSet with the whole table and a Sweep over it.
+    Alter groups only contain the parameters that changed from the previous row.
+
+    Args:
+        analysis: The analysis to run for every row
+        table: Dictionary containing the name and the list of values of each parameter
+        altergroups: If True, use alter groups instead of a paramset sweep
+        name: Name of the paramset, sweep or alter groups
+
+    Returns:
+        The list of Directives to add to a Circuit
+    """
+    columns = {k: np.asarray(v).tolist() for k, v in table.items()}
+    rows = len(next(iter(columns.values()), []))
+    if rows == 0:
+        raise ValueError("The table of parameters is empty")
+    directives: List[Directive] = [
+        Directive("parameters", {k: v[0] for k, v in columns.items()})
+    ]
+    if not altergroups:
+        directives.append(ParamSet(f"{name}_values", columns))
+        directives.append(Sweep(name, [analysis.copy()], paramset=f"{name}_values"))
+        return directives
+    for row in range(rows):
+        changed = {
+            k: v[row] for k, v in columns.items() if row and v[row] != v[row - 1]
+        }
+        if changed:
+            directives.append(AlterGroup(f"{name}_alt{row}", changed))
+        step = analysis.copy()
+        step.name = f"{analysis.name}{row}"
+        directives.append(step)
+    return directives
+
+
 @dataclass
 class Model:
     """SPICE Component Model
@@ -134,12 +292,120 @@ class Instance:
     cap: Optional[str] = None
 
     def copy(self):
-        return copy.deepcopy(self)
+        inst = copy.deepcopy(self)
+        # A copy is never owned by a Circuit or Subcircuit
+        inst.__dict__.pop("_owned", None)
+        return inst
+
+    @property
+    def is_owned(self) -> bool:
+        """Returns true if the instance was added without copy to a Circuit or Subcircuit"""
+        return self.__dict__.get("_owned", False)
 
     def __iter__(self):
         yield from ((field.name, getattr(self, field.name)) for field in fields(self))
 
 
+def _take(inst: Instance, copy: bool) -> Instance:
+    """Get the Instance to store in a Circuit or Subcircuit
+
+    If `copy` is False, the ownership of the instance is transferred and the instance is returned as is.
+    Instances that are already owned are always copied, so an instance is never modified once it has been stored.
+    """
+    if copy or inst.is_owned:
+        inst = inst.copy()
+    inst._owned = True
+    return inst
+
+
+@dataclass
+class InstanceBatch:
+    """Many Instances of the same Component
+
+    A batch is created with `Component.new_many` and behaves as the list of
+    instances it represents, while storing the values of the nodes and parameters as arrays.
+    When added to a Circuit, the uids of all the instances are assigned at once.
+
+    Attributes:
+        name: Descriptive name of the instances
+        nodes: Dictionary containing the names and the array of values of the Nodes
+        params: Dictionary containing the names and the array of values of the Parameters
+        ctx: Context of the instances.
+        cap: Letter of the Component used to export in SPICE
+        nets: If given, the arrays of `nodes` contain indices into this array of Node values
+            instead of the values themselves.
+        internal: Number of nets at the end of `nets` that are internal to the batch. They are
+            registered without being looked up, so no other element may connect to them.
+    """
+
+    name: str
+    nodes: Dict[str, np.ndarray]
+    params: Dict[str, np.ndarray] = field(default_factory=dict)
+    ctx: Optional[str] = None
+    cap: Optional[str] = None
+    nets: Optional[np.ndarray] = None
+    internal: int = 0
+
+    def __len__(self) -> int:
+        columns = [*self.nodes.values(), *self.params.values()]
+        return len(columns[0]) if columns else 0
+
+    def __iter__(self) -> Iterator[Instance]:
+        if self.nets is None:
+            nodes = {k: v.tolist() for k, v in self.nodes.items()}
+        else:
+            nodes = {k: self.nets[v].tolist() for k, v in self.nodes.items()}
+        params = {k: _to_list(v) for k, v in self.params.items()}
+        for i in range(len(self)):
+            yield Instance(
+                self.name,
+                nodes={k: v[i] for k, v in nodes.items()},
+                params={k: v[i] for k, v in params.items()},
+                ctx=self.ctx,
+                cap=self.cap,
+            )
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+
+def _as_array(values: Any) -> np.ndarray:
+    """Convert a sequence to an array, keeping the type of each value
+
+    `np.asarray` converts every value of a sequence of mixed types to a string
+    (e.g. `[0, "B"]` to `["0", "B"]`), an array of objects is used instead.
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    array = np.asarray(values)
+    if array.dtype.kind != "U" or array.ndim == 0:
+        return array
+    objects = np.asarray(values, dtype=object)
+    if all(isinstance(v, str) for v in objects.flat):
+        return array
+    return objects
+
+
+def _to_list(values: np.ndarray) -> List[Any]:
+    "Values of an array as Python scalars, except floats narrower than a Python float"
+    if values.dtype.kind == "f" and values.dtype != np.float64:
+        # A Python float would print float32 values with all the digits of a double
+        return list(values)
+    return values.tolist()
+
+
+def _broadcast(values: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    "Broadcast scalars and sequences to arrays of the same length"
+    arrays = {k: _as_array(v) for k, v in values.items()}
+    lengths = set(len(v) for v in arrays.values() if v.ndim > 0)
+    if len(lengths) > 1:
+        raise ValueError(f"All values must have the same length, got {sorted(lengths)}")
+    count = lengths.pop() if lengths else 1
+    return {
+        k: v if v.ndim > 0 else np.broadcast_to(v, (count,)) for k, v in arrays.items()
+    }
+
+
 @dataclass
 class Component:
     """Component is an Instance Generator
@@ -216,6 +482,56 @@ class Component:
             self.name, nodes=nodes, params=params, uid=uid, ctx=ctx, cap=self.cap
         )
 
+    def new_many(
+        self,
+        nodes: Union[Dict[str, Any], List[Any]],
+        params: Optional[Dict[str, Any]] = None,
+        ctx: Optional[str] = None,
+        *,
+        check_defaults: bool = True,
+    ) -> InstanceBatch:
+        """Create many Instances at once
+
+        The result is equivalent to calling `new` for every row, but the default values
+        are only checked once and the values are stored as arrays.
+        Scalar values are shared by all the instances.
+
+        Args:
+            nodes: List of arrays of Node values or Dictionary containing the names and arrays of values of the Nodes
+            params: Dictionary containing the names and arrays of values of the Parameters.
+            ctx: The context of the generated instances.
+            check_defaults: If True, check if the default values of nodes and params are supplied.
+
+        Returns:
+            The generated InstanceBatch
+
+        Example:
+            >>> R = Component("resistor", ["P", "N"])
+            >>> batch = R.new_many([["IN_0", "IN_1"], "OUT"], {"r": [1e3, 2e3]})
+            >>> len(batch) # 2
+        """
+        if isinstance(nodes, list):
+            nodes = dict(zip(self.nodes.keys(), nodes))
+        params = params if params else {}
+
+        if check_defaults:
+            missing_nodes = missing_defaults(self.nodes, nodes)
+            if missing_nodes:
+                raise ValueError(f"Missing nodes {missing_nodes}")
+
+            missing_params = missing_defaults(self.params, params)
+            if missing_params:
+                raise ValueError(f"Missing parameters {missing_params}")
+
+        columns = _broadcast({**nodes, **params})
+        return InstanceBatch(
+            self.name,
+            nodes={k: columns[k] for k in nodes},
+            params={k: columns[k] for k in params},
+            ctx=ctx,
+            cap=self.cap,
+        )
+
     def __call__(self, *args, **kwargs):
         "Alias for `new`"
         return self.new(*args, **kwargs)
@@ -288,15 +604,21 @@ class Subcircuit:
         self.cap: Optional[str] = cap
         self.uids_map: Dict[str, int] = defaultdict(int)
 
-    def add(self, inst: Instance):
-        """Add an Instance to the Subcircuit
+    def add(self, inst: Union[Instance, InstanceBatch], copy: bool = True):
+        """Add an Instance or an InstanceBatch to the Subcircuit
 
         A copy of the instance is created and its uid and ctx are modified.
 
         Args:
             inst: The Instance to add
+            copy: If False, the instance is not copied and its ownership is transferred to the subcircuit.
+                The instance must not be modified afterwards.
         """
-        inst_copy = inst.copy()
+        if isinstance(inst, InstanceBatch):
+            for i in inst:
+                self.add(i, copy=False)
+            return
+        inst_copy = _take(inst, copy)
         self.uids_map[inst.name] += 1
         inst_copy.uid = self.uids_map[inst.name]
         inst_copy.ctx = self.name
@@ -304,7 +626,7 @@ class Subcircuit:
 
     def __iadd__(self, other: object):
         assert isinstance(other, Instance)
-        self.add(instance)
+        self.add(other)
         return self
 
     def new(
@@ -358,30 +680,432 @@ class Subcircuit:
         return isinstance(o, Instance) and o in self.instances
 
 
+#: Layout shared by the instances of a block: name, cap, node names and parameter names
+Layout: TypeAlias = Tuple[str, Optional[str], Tuple[str, ...], Tuple[str, ...]]
+
+
+def _column(values: Any) -> np.ndarray:
+    """Convert the values of a parameter into a column
+
+    Numeric values are stored in a numeric array. Values of mixed types
+    are stored as objects so that they are written back exactly as given.
+    """
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in "biuf":
+            return values
+        return values.astype(object)
+    values = list(values)
+    column = np.asarray(values) if len(set(map(type, values))) <= 1 else None
+    if column is None or column.dtype.kind not in "biuf":
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+    return column
+
+
+def _concat(chunks: List[np.ndarray]) -> np.ndarray:
+    "Concatenate columns, falling back to objects if their kinds differ"
+    if len(set(c.dtype.kind for c in chunks)) > 1:
+        chunks = [c.astype(object) for c in chunks]
+    return np.concatenate(chunks)
+
+
+class _Block:
+    """Columns of all the instances sharing the same Layout
+
+    Rows added one by one are kept pending and converted to arrays in chunks.
+    """
+
+    CHUNK: int = 1 << 14
+
+    def __init__(self, layout: Layout):
+        self.layout: Layout = layout
+        self.size: int = 0
+        self._nodes: List[np.ndarray] = []
+        self._params: Dict[str, List[np.ndarray]] = {k: [] for k in layout[3]}
+        self._uids: List[np.ndarray] = []
+        self._pending: List[tuple] = []
+
+    def append(self, uid: int, node_ids: Tuple[int, ...], values: tuple):
+        self._pending.append((uid, node_ids, values))
+        self.size += 1
+        if len(self._pending) >= self.CHUNK:
+            self.flush()
+
+    def extend(self, uids: np.ndarray, node_ids: np.ndarray, params: Dict[str, Any]):
+        self.flush()
+        self._uids.append(np.asarray(uids, dtype=np.int64))
+        self._nodes.append(np.asarray(node_ids, dtype=np.int32))
+        for k in self.layout[3]:
+            self._params[k].append(_column(params[k]))
+        self.size += len(uids)
+
+    def flush(self):
+        if not self._pending:
+            return
+        uids, node_ids, values = zip(*self._pending)
+        n_nodes = len(self.layout[2])
+        self._uids.append(np.array(uids, dtype=np.int64))
+        self._nodes.append(np.array(node_ids, dtype=np.int32).reshape(-1, n_nodes))
+        for k, column in zip(self.layout[3], zip(*values)):
+            self._params[k].append(_column(column))
+        self._pending = []
+
+    def compact(self):
+        "Merge all the chunks into a single array per column"
+        self.flush()
+        if len(self._uids) > 1:
+            self._uids = [np.concatenate(self._uids)]
+            self._nodes = [np.concatenate(self._nodes)]
+            self._params = {k: [_concat(v)] for k, v in self._params.items()}
+
+    @property
+    def uids(self) -> np.ndarray:
+        self.compact()
+        return self._uids[0] if self._uids else np.empty(0, dtype=np.int64)
+
+    @property
+    def nodes(self) -> np.ndarray:
+        self.compact()
+        if self._nodes:
+            return self._nodes[0]
+        return np.empty((0, len(self.layout[2])), dtype=np.int32)
+
+    @property
+    def params(self) -> Dict[str, np.ndarray]:
+        self.compact()
+        return {k: v[0] for k, v in self._params.items() if v}
+
+
+class Columns(NamedTuple):
+    """Consecutive instances of the same Layout stored in an InstanceTable
+
+    Attributes:
+        name: Name of the instances
+        cap: Letter of the Component used to export in SPICE
+        node_names: Names of the nodes, in the order of the columns of `nodes`
+        nodes: Array of shape (n, len(node_names)) with the indices of the Nodes in `InstanceTable.nets`
+        params: Dictionary containing the name and the array of values of each parameter
+        uids: Array with the numerical index of each instance. A negative value means no uid.
+        ctx: Context of the instances
+    """
+
+    name: str
+    cap: Optional[str]
+    node_names: Tuple[str, ...]
+    nodes: np.ndarray
+    params: Dict[str, np.ndarray]
+    uids: np.ndarray
+    ctx: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        "Number of instances"
+        return len(self.uids)
+
+    def chunks(self, size: int) -> Iterator["Columns"]:
+        "Split the columns into consecutive chunks of at most `size` instances"
+        for start in range(0, self.size, size):
+            stop = start + size
+            yield self._replace(
+                nodes=self.nodes[start:stop],
+                params={k: v[start:stop] for k, v in self.params.items()},
+                uids=self.uids[start:stop],
+            )
+
+
+class InstanceTable:
+    """Columnar storage of Instances
+
+    Instead of keeping an Instance object per device, instances that share the same
+    name, cap, node names and parameter names are stored as a block of arrays: node ids,
+    parameter values and uids. Each different layout is assigned a type code, and the
+    order in which the instances were added is kept as runs of type codes.
+
+    Iterating over the table creates the Instances on the fly, so it can be used wherever
+    a list of instances is expected. Writers should use `columns` instead,
+    which never creates per-device objects.
+
+    Attributes:
+        nets: List of Node values. Node arrays contain indices into this list.
+        layouts: List of the Layouts stored. The type code of a layout is its index.
+        runs: List of [code, start, stop] describing the order of the instances.
+        ctx: Context of the stored instances.
+
+    Example:
+        >>> table = InstanceTable()
+        >>> table.append(Instance("resistor", {"P": "IN", "N": 0}, {"r": 1e3}), uid=1)
+        >>> len(table) # 1
+        >>> next(iter(table)).params # {"r": 1000.0}
+    """
+
+    def __init__(self, ctx: Optional[str] = None):
+        self.nets: List[Node] = []
+        self.layouts: List[Layout] = []
+        self.runs: List[List[int]] = []
+        self.ctx: Optional[str] = ctx
+        self._net_ids: Dict[Node, int] = {}
+        # Number of nets in `_net_ids`, the others were added by `new_nets`
+        self._indexed: int = 0
+        self._codes: Dict[Layout, int] = {}
+        self._blocks: List[_Block] = []
+        self._size: int = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _index(self):
+        "Index the nets added by `new_nets`"
+        if self._indexed < len(self.nets):
+            added = self.nets[self._indexed :]
+            self._net_ids.update(zip(added, range(self._indexed, len(self.nets))))
+        self._indexed = len(self.nets)
+
+    def net_id(self, node: Node) -> int:
+        "Index of a Node in `nets`, registering it if needed"
+        self._index()
+        try:
+            return self._net_ids[node]
+        except KeyError:
+            self._net_ids[node] = len(self.nets)
+            self.nets.append(node)
+            self._indexed += 1
+            return self._net_ids[node]
+
+    def new_nets(self, nodes: Any) -> np.ndarray:
+        """Register nets that are not in the table yet
+
+        The nets are not looked up, they are only indexed when another net is registered.
+        Adding the millions of internal nets of a large circuit is then as cheap as
+        copying their names.
+
+        Args:
+            nodes: Array of Node values, none of which may be in the table
+
+        Returns:
+            The indices of the nets in `nets`
+        """
+        nodes = np.asarray(nodes, dtype=object).ravel()
+        start = len(self.nets)
+        self.nets.extend(nodes.tolist())
+        return np.arange(start, len(self.nets), dtype=np.int32)
+
+    def net_ids(self, nodes: Any) -> np.ndarray:
+        "Vectorized version of `net_id`"
+        self._index()
+        nodes = _as_array(nodes)
+        try:
+            uniques, inverse = np.unique(nodes, return_inverse=True)
+        except TypeError:
+            # Nodes of mixed types (e.g. 0 and "IN") can't be sorted
+            return np.fromiter(
+                (self.net_id(n) for n in nodes.ravel().tolist()),
+                dtype=np.int32,
+                count=nodes.size,
+            ).reshape(nodes.shape)
+        uniques = uniques.tolist()
+        get = self._net_ids.get
+        ids = np.fromiter(
+            (get(n, -1) for n in uniques), dtype=np.int32, count=len(uniques)
+        )
+        new = np.flatnonzero(ids < 0)
+        if len(new):
+            # New nets are registered at once, e.g. the internal nets of a large circuit
+            start = len(self.nets)
+            ids[new] = np.arange(start, start + len(new))
+            added = [uniques[i] for i in new.tolist()]
+            self.nets.extend(added)
+            self._net_ids.update(zip(added, range(start, start + len(new))))
+            self._indexed = len(self.nets)
+        return ids[inverse].reshape(nodes.shape)
+
+    def code(self, layout: Layout) -> int:
+        "Type code of a Layout, registering it if needed"
+        try:
+            return self._codes[layout]
+        except KeyError:
+            self._codes[layout] = len(self.layouts)
+            self.layouts.append(layout)
+            self._blocks.append(_Block(layout))
+            return self._codes[layout]
+
+    def _push(self, code: int, count: int):
+        block = self._blocks[code]
+        start = block.size - count
+        if self.runs and self.runs[-1][0] == code and self.runs[-1][2] == start:
+            self.runs[-1][2] = block.size
+        else:
+            self.runs.append([code, start, block.size])
+        self._size += count
+
+    def append(self, inst: Instance, uid: Optional[int] = None):
+        """Store an Instance
+
+        The values of the instance are copied into the table, the instance itself is not kept.
+
+        Args:
+            inst: The Instance to store
+            uid: The uid to store. If None, the uid of the instance is used.
+        """
+        uid = inst.uid if uid is None else uid
+        params = inst.params or {}
+        layout = (inst.name, inst.cap, tuple(inst.nodes.keys()), tuple(params.keys()))
+        code = self.code(layout)
+        node_ids = tuple(self.net_id(n) for n in inst.nodes.values())
+        self._blocks[code].append(
+            -1 if uid is None else uid, node_ids, tuple(params.values())
+        )
+        self._push(code, 1)
+
+    def extend(
+        self,
+        name: str,
+        nodes: Dict[str, Any],
+        params: Optional[Dict[str, Any]] = None,
+        uids: Optional[Any] = None,
+        cap: Optional[str] = None,
+        nets: Optional[Any] = None,
+        internal: int = 0,
+    ):
+        """Store many instances of the same layout at once
+
+        Args:
+            name: Name of the instances
+            nodes: Dictionary containing the name and the array of values of each node
+            params: Dictionary containing the name and the array of values of each parameter
+            uids: Array with the uid of each instance. If None, the instances have no uid.
+            cap: Letter of the Component used to export in SPICE
+            nets: If given, the arrays of `nodes` contain indices into this array of Node values
+            internal: Number of nets at the end of `nets` registered with `new_nets`
+        """
+        params = params or {}
+        columns = [_as_array(v) for v in nodes.values()]
+        count = len(columns[0]) if columns else len(next(iter(params.values()), []))
+        if count == 0:
+            return
+        if nets is not None:
+            nets = np.asarray(nets, dtype=object)
+            split = len(nets) - internal
+            ids = np.concatenate(
+                [self.net_ids(nets[:split]), self.new_nets(nets[split:])]
+            )
+            columns = [ids[column] for column in columns]
+        node_ids = np.empty((count, len(columns)), dtype=np.int32)
+        for i, column in enumerate(columns):
+            node_ids[:, i] = column if nets is not None else self.net_ids(column)
+        uids = np.full(count, -1, dtype=np.int64) if uids is None else uids
+        code = self.code((name, cap, tuple(nodes.keys()), tuple(params.keys())))
+        self._blocks[code].extend(uids, node_ids, params)
+        self._push(code, count)
+
+    def columns(self) -> Iterator[Columns]:
+        """Iterate over the stored instances as columns
+
+        Each item contains consecutive instances of the same layout, in the order they were added.
+        """
+        for code, start, stop in self.runs:
+            block = self._blocks[code]
+            name, cap, node_names, _ = block.layout
+            yield Columns(
+                name,
+                cap,
+                node_names,
+                block.nodes[start:stop],
+                {k: v[start:stop] for k, v in block.params.items()},
+                block.uids[start:stop],
+                self.ctx,
+            )
+
+    def __iter__(self) -> Iterator[Instance]:
+        nets = self.nets
+        for cols in self.columns():
+            params = {k: _to_list(v) for k, v in cols.params.items()}
+            for row, (uid, ids) in enumerate(
+                zip(cols.uids.tolist(), cols.nodes.tolist())
+            ):
+                yield Instance(
+                    cols.name,
+                    nodes={k: nets[i] for k, i in zip(cols.node_names, ids)},
+                    params={k: v[row] for k, v in params.items()},
+                    uid=None if uid < 0 else uid,
+                    ctx=self.ctx,
+                    cap=cols.cap,
+                )
+
+    def __contains__(self, o: object) -> bool:
+        return isinstance(o, Instance) and any(o == i for i in self)
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+
 class Circuit:
     """Circuit a.k.a. SPICE Netlist
 
     Attributes:
         directives: List of Directives
         subcircuits: List of registered Subcircuits
-        instances: List of Instances
+        instances: List of Instances, or an InstanceTable if the circuit is columnar
         uids_map: Dictionary containing the uids of all different Instances
         path: Optional path to the SPICE netlist
+
+    Args:
+        columnar: If True, instances are stored in an InstanceTable instead of a list.
+            This greatly reduces the memory needed for circuits with millions of instances.
+
+    Example:
+        >>> C = Circuit(columnar=True)
+        >>> C.add(Instance("resistor", {"P": "IN", "N": "OUT"}, {"r": 1e3}))
+        >>> [i.uid for i in C.instances] # [1]
     """
 
-    def __init__(self):
+    def __init__(self, columnar: bool = False):
         self.directives: List[Directive] = []
         self.subcircuits: List[Subcircuit] = []
-        self.instances: List[Instance] = []
+        self.instances: Union[List[Instance], InstanceTable] = (
+            InstanceTable() if columnar else []
+        )
         self.uids_map: Dict[str, int] = defaultdict(int)
         self._path: Optional[PathLike] = None
 
-    def __add_one(self, elem: "Element"):
+    @property
+    def columnar(self) -> bool:
+        "Returns true if the instances are stored in an InstanceTable"
+        return isinstance(self.instances, InstanceTable)
+
+    def __add_one(self, elem: "Element", copy: bool = True):
         """
         If a Subcircuit has been modified after registered, it can't be updated
         TODO: Add a way to update registered elements
         """
-        elem_copy = elem.copy()
+        if isinstance(elem, InstanceBatch):
+            count = len(elem)
+            start = self.uids_map[elem.name]
+            self.uids_map[elem.name] += count
+            uids = np.arange(start + 1, start + count + 1)
+            if self.columnar:
+                self.instances.extend(
+                    elem.name,
+                    elem.nodes,
+                    elem.params,
+                    uids,
+                    elem.cap,
+                    elem.nets,
+                    elem.internal,
+                )
+                return
+            for inst, uid in zip(elem, uids.tolist()):
+                inst.uid, inst._owned = uid, True
+                self.instances.append(inst)
+            return
+        if isinstance(elem, Instance) and self.columnar:
+            # The table copies the values, so there is no need to copy the instance
+            self.uids_map[elem.name] += 1
+            self.instances.append(elem, uid=self.uids_map[elem.name])
+            return
+        if isinstance(elem, Instance):
+            elem_copy = _take(elem, copy)
+        else:
+            elem_copy = elem.copy() if copy else elem
         if isinstance(elem_copy, Directive):
             self.directives.append(elem_copy)
         if isinstance(elem_copy, Subcircuit):
@@ -392,12 +1116,23 @@ class Circuit:
             elem_copy.uid = self.uids_map[elem_copy.name]
             self.instances.append(elem_copy)
 
-    def add(self, args: Union[object, List[object]]):
+    def add(self, args: Union[object, List[object]], copy: bool = True):
+        """Add one or many elements to the Circuit
+
+        By default every element is copied before being stored. With `copy=False`, the ownership
+        of the elements is transferred to the circuit and only the uid of the instances is assigned.
+        In that case, the elements must not be modified afterwards. Instances that are already
+        owned by another Circuit or Subcircuit are still copied, so they are never modified.
+
+        Args:
+            args: The element or list of elements to add
+            copy: If False, elements are stored without being copied.
+        """
         if isinstance(args, (list, tuple)):
             for e in args:
-                self.__add_one(e)
+                self.__add_one(e, copy)
         else:
-            self.__add_one(args.copy())
+            self.__add_one(args, copy)
 
     def __iadd__(self, args):
         self.add(args)
@@ -427,4 +1162,6 @@ class Circuit:
 
 
 #: A Physical Element
-Element: TypeAlias = Union[Directive, Model, Instance, Subcircuit, Circuit]
+Element: TypeAlias = Union[
+    Directive, Model, Instance, InstanceBatch, Subcircuit, Circuit
+]
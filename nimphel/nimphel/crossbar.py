@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .core import Circuit, InstanceBatch, InstanceTable, Node
+from .mapping import conductance
+from .utils import NetGen
+
+__all__ = ["conductance_matrix", "build_crossbar", "IdealCrossbar"]
+
+
+def _resistors(
+    circuit: Circuit, name: str, nodes: Tuple[str, str], param: str
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    "Nodes and resistances of the resistors of a circuit and its subcircuits, by chunks"
+    for instances in [circuit.instances, *(s.instances for s in circuit.subcircuits)]:
+        if isinstance(instances, InstanceTable):
+            nets = np.empty(len(instances.nets), dtype=object)
+            nets[:] = instances.nets
+            for cols in instances.columns():
+                if cols.name != name or cols.size == 0:
+                    continue
+                p, n = (cols.nodes[:, cols.node_names.index(k)] for k in nodes)
+                yield nets[p], nets[n], cols.params[param]
+            continue
+        chosen = [i for i in instances if i.name == name]
+        if chosen:
+            p = np.array([i.nodes[nodes[0]] for i in chosen], dtype=object)
+            n = np.array([i.nodes[nodes[1]] for i in chosen], dtype=object)
+            yield p, n, np.array([i.params[param] for i in chosen])
+
+
+def _lookup(nets: np.ndarray, names: Sequence[Node]) -> np.ndarray:
+    index = {net: i for i, net in enumerate(names)}
+    return np.array([index.get(net, -1) for net in nets.tolist()], dtype=np.int64)
+
+
+def conductance_matrix(
+    circuit: Circuit,
+    rows: Sequence[Node],
+    cols: Sequence[Node],
+    name: str = "resistor",
+    nodes: Tuple[str, str] = ("P", "N"),
+    param: str = "r",
+) -> np.ndarray:
+    """Conductance matrix of a crossbar of resistors in a circuit
+
+    Resistors between a row net and a column net are placed in the matrix, in either
+    direction. Parallel resistors are summed and other resistors are ignored.
+    The resistors of the subcircuits are included.
+
+    Args:
+        circuit: Circuit containing the resistors, for instance from `mnist_rram.py`
+        rows: Nets of the rows of the crossbar
+        cols: Nets of the columns of the crossbar
+        name: Name of the resistor instances
+        nodes: Names of the two nodes of the resistors
+        param: Name of the resistance parameter
+
+    Returns:
+        The matrix of conductances, of shape (len(rows), len(cols))
+
+    Example:
+        >>> G = conductance_matrix(circuit, nets_in, nets_col)
+    """
+    matrix = np.zeros((len(rows), len(cols)))
+    for p, n, r in _resistors(circuit, name, nodes, param):
+        g = conductance(np.asarray(r, dtype=np.float64))
+        for a, b in ((p, n), (n, p)):
+            i, j = _lookup(a, rows), _lookup(b, cols)
+            found = (i >= 0) & (j >= 0)
+            np.add.at(matrix, (i[found], j[found]), g[found])
+    return matrix
+
+
+def _wire(resistance: Any, shape: Tuple[int, int], kind: str) -> np.ndarray:
+    wire = np.broadcast_to(np.asarray(resistance, dtype=np.float64), shape)
+    if not np.all(wire > 0):
+        raise ValueError(
+            f"The {kind} wire resistances must be positive, use None for ideal wires"
+        )
+    return wire.ravel()
+
+
+def _cell_nets(first: Sequence[Node], second: Sequence[Node]) -> np.ndarray:
+    'Nets named "{first[i]}_{second[j]}", of shape (len(first), len(second))'
+    first = np.array([f"{n}_" for n in first])
+    second = np.array([str(n) for n in second])
+    return np.char.add(first[:, None], second[None, :])
+
+
+def build_crossbar(
+    conductances: np.ndarray,
+    rows: Sequence[Node],
+    cols: Sequence[Node],
+    row_wire: Optional[Any] = None,
+    col_wire: Optional[Any] = None,
+    nets: Optional[NetGen] = None,
+    name: str = "resistor",
+    nodes: Tuple[str, str] = ("P", "N"),
+    param: str = "r",
+    cap: Optional[str] = None,
+) -> InstanceBatch:
+    """Resistors of a crossbar, with the resistance of the wires
+
+    The device of the cell `(i, j)` connects the row node `(i, j)` to the column node `(i, j)`.
+    With a row wire, the row `i` is a ladder driven by `rows[i]`: a segment of resistance
+    `row_wire[i, j]` connects the row node `(i, j - 1)`, or `rows[i]` for the first cell, to the
+    row node `(i, j)`. Likewise, the column `j` is a ladder ending on `cols[j]`: a segment of
+    resistance `col_wire[i, j]` connects the column node `(i, j)` to the column node `(i + 1, j)`,
+    or to `cols[j]` for the last cell. Without wire resistance, the nodes are the nets themselves,
+    as in `mnist_rram.py`.
+
+    The intermediate nets are generated by `nets` and are internal to the batch, so adding the
+    batch to a columnar Circuit never looks them up.
+
+    Args:
+        conductances: Conductance matrix of shape (len(rows), len(cols)). Cells with a
+            conductance of 0 have no device.
+        rows: Nets driving the rows
+        cols: Output nets of the columns
+        row_wire: Resistance of the row segments, broadcastable to the shape of the matrix.
+            If None, the rows are ideal.
+        col_wire: Resistance of the column segments, broadcastable to the shape of the matrix.
+            If None, the columns are ideal.
+        nets: Generator of the intermediate nets. Defaults to nets named after the row and the
+            column of their cell: `IN_000_COL_003` on the row `IN_000` and `COL_003_IN_000` on
+            the column `COL_003`, so crossbars with different columns never share nets. Neither
+            do crossbars sharing a generator.
+        name: Name of the resistor instances
+        nodes: Names of the two nodes of the resistors
+        param: Name of the resistance parameter
+        cap: Letter of the resistors used to export in SPICE
+
+    Returns:
+        An InstanceBatch with the devices, followed by the row and the column segments
+
+    Raises:
+        ValueError: If the shapes don't match or if a wire resistance is not positive
+
+    Example:
+        >>> G = conductance(resistances)
+        >>> circuit.add(build_crossbar(G, nets_in, nets_col, row_wire=2.5, col_wire=2.5))
+    """
+    conductances = np.asarray(conductances, dtype=np.float64)
+    shape = (len(rows), len(cols))
+    if conductances.shape != shape:
+        raise ValueError(
+            f"Expected conductances of shape {shape}, got {conductances.shape}"
+        )
+    size = conductances.size
+    # Node values are indices into [*rows, *cols, *row nodes, *column nodes]
+    row_ids = np.arange(shape[0])
+    col_ids = np.arange(shape[1]) + shape[0]
+    internal = []
+    if row_wire is None:
+        row_nodes = np.repeat(row_ids, shape[1])
+    else:
+        internal.append(
+            _cell_nets(rows, cols).ravel() if nets is None else nets.array(size)
+        )
+        row_nodes = np.arange(sum(shape), sum(shape) + size)
+    if col_wire is None:
+        col_nodes = np.tile(col_ids, shape[0])
+    else:
+        start = sum(shape) + sum(map(len, internal))
+        internal.append(
+            _cell_nets(cols, rows).T.ravel() if nets is None else nets.array(size)
+        )
+        col_nodes = np.arange(start, start + size)
+
+    cells = np.flatnonzero(conductances)
+    p, n = [row_nodes[cells]], [col_nodes[cells]]
+    resistances = [1.0 / conductances.ravel()[cells]]
+    if row_wire is not None:
+        previous = np.column_stack([row_ids, row_nodes.reshape(shape)[:, :-1]])
+        p.append(previous.ravel())
+        n.append(row_nodes)
+        resistances.append(_wire(row_wire, shape, "row"))
+    if col_wire is not None:
+        following = np.vstack([col_nodes.reshape(shape)[1:], col_ids])
+        p.append(col_nodes)
+        n.append(following.ravel())
+        resistances.append(_wire(col_wire, shape, "column"))
+
+    external = [*rows, *cols]
+    values = np.empty(len(external) + sum(map(len, internal)), dtype=object)
+    values[: len(external)] = external
+    if internal:
+        values[len(external) :] = np.concatenate(internal)
+    return InstanceBatch(
+        name,
+        nodes={nodes[0]: np.concatenate(p), nodes[1]: np.concatenate(n)},
+        params={param: np.concatenate(resistances)},
+        cap=cap,
+        nets=values,
+        internal=len(values) - len(external),
+    )
+
+
+class IdealCrossbar:
+    """Column currents of ideal crossbars
+
+    With ideal wires, the current flowing into the column `j` of a crossbar whose columns are
+    held at 0 V is `I[j] = sum(G[i, j] * V[i])`, i.e. `I = Gᵀ·V`. The conductance matrices of
+    all the crossbars are stacked, so the currents of a whole batch of input vectors are
+    computed with a single matrix product.
+
+    The currents flow from the rows into the columns. Simulators report the terminal current
+    of the columns of the subcircuit, which has the opposite sign.
+
+    Args:
+        conductances: Conductance matrices of the crossbars, of shape (rows, cols),
+            all with the same number of rows
+        dtype: Type of the computation. `np.float32` halves the memory and time of large batches.
+
+    Example:
+        >>> xbar = IdealCrossbar.from_resistances(resistances, resistances_neg)
+        >>> currents = xbar.differential(load_matrix("INPUTS/inputs.npy"))
+    """
+
+    def __init__(self, conductances: Sequence[np.ndarray], dtype=np.float64):
+        matrices = [np.atleast_2d(np.asarray(g, dtype=dtype)) for g in conductances]
+        if len({g.shape[0] for g in matrices}) > 1:
+            raise ValueError("All the crossbars must have the same number of rows")
+        self.cols: List[int] = [g.shape[1] for g in matrices]
+        self.dtype = np.dtype(dtype)
+        self.conductances: np.ndarray = np.hstack(matrices)
+
+    @classmethod
+    def from_resistances(cls, *resistances: np.ndarray, dtype=np.float64):
+        """Ideal crossbars from resistance matrices, where resistances of 0 mean no resistor
+
+        Args:
+            resistances: Resistance matrices of the crossbars
+            dtype: Type of the computation
+        """
+        return cls([conductance(r) for r in resistances], dtype)
+
+    @classmethod
+    def from_circuit(
+        cls,
+        circuit: Circuit,
+        rows: Sequence[Node],
+        outputs: Sequence[Sequence[Node]],
+        name: str = "resistor",
+        dtype=np.float64,
+    ):
+        """Ideal crossbars from the resistors of a circuit
+
+        Args:
+            circuit: Circuit containing the resistors
+            rows: Nets of the rows, shared by all the crossbars
+            outputs: Nets of the columns of each crossbar
+            name: Name of the resistor instances
+            dtype: Type of the computation
+
+        Example:
+            >>> xbar = IdealCrossbar.from_circuit(circuit, nets_in, [nets_col, nets_col_neg])
+        """
+        return cls([conductance_matrix(circuit, rows, c, name) for c in outputs], dtype)
+
+    @property
+    def rows(self) -> int:
+        "Number of rows"
+        return self.conductances.shape[0]
+
+    def currents(self, inputs: np.ndarray) -> np.ndarray:
+        """Currents of the columns of all the crossbars
+
+        Args:
+            inputs: Input voltages, a vector of `rows` values or a matrix with a vector per row
+
+        Returns:
+            The currents of the columns of the first crossbar, followed by the other crossbars.
+            For a matrix of inputs, a row of currents per input vector.
+        """
+        inputs = np.asarray(inputs, dtype=self.dtype)
+        if inputs.shape[-1] != self.rows:
+            raise ValueError(f"Expected {self.rows} inputs, got {inputs.shape[-1]}")
+        return inputs @ self.conductances
+
+    def split(self, currents: np.ndarray) -> List[np.ndarray]:
+        "Split currents returned by `currents` into the currents of each crossbar"
+        return np.split(currents, np.cumsum(self.cols)[:-1], axis=-1)
+
+    def differential(self, inputs: np.ndarray) -> np.ndarray:
+        """Difference between the currents of a positive and a negative crossbar
+
+        Args:
+            inputs: Input voltages, a vector or a matrix with a vector per row
+
+        Returns:
+            The currents of the positive crossbar minus the currents of the negative crossbar
+
+        Raises:
+            ValueError: If there are not exactly two crossbars with the same number of columns
+        """
+        if len(self.cols) != 2 or self.cols[0] != self.cols[1]:
+            raise ValueError("Expected a positive and a negative crossbar")
+        positive, negative = self.split(self.currents(inputs))
+        return positive - negative
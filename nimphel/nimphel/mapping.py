@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .storage import PathLike, MatrixWriter, read_csv_chunks
+
+__all__ = [
+    "weight_to_resistance",
+    "split_polarity",
+    "map_weights",
+    "conductance",
+    "quantize",
+    "quantize_dataset",
+]
+
+
+def weight_to_resistance(
+    weights: np.ndarray,
+    rmin: float = 1e4,
+    rmax: float = 1e6,
+    max_weight: Optional[float] = None,
+) -> np.ndarray:
+    """Linear mapping of weights to signed resistances
+
+    The absolute value of a weight is mapped linearly from 0 -> Rmax to `max_weight` -> Rmin.
+    The sign of the resistance is the sign of the weight, and null weights are mapped to -Rmax.
+    Positive and negative weights use the same scale.
+
+    Args:
+        weights: Array of weights
+        rmin: Resistance of the largest weight
+        rmax: Resistance of a null weight
+        max_weight: Weight mapped to Rmin. Defaults to the largest absolute weight.
+
+    Returns:
+        The array of signed resistances
+
+    Example:
+        >>> weight_to_resistance(np.array([1.0, 0.5, -1.0]), 1e4, 1e6)
+        >>> # array([ 10000., 505000., -10000.])
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if max_weight is None:
+        max_weight = max(np.abs(weights).max(initial=0.0), 0.0)
+    resistances = (rmin - rmax) * np.abs(weights) / max_weight + rmax
+    return np.where(weights > 0, resistances, -resistances)
+
+
+def split_polarity(resistances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Split signed resistances into the positive and negative crossbars
+
+    Each cell only has a resistor in one of the crossbars. The other crossbar has a 0 (no resistor).
+
+    Args:
+        resistances: Array of signed resistances
+
+    Returns:
+        The resistances of the positive and negative crossbars
+    """
+    resistances = np.asarray(resistances)
+    positive = resistances > 0
+    return np.where(positive, resistances, 0.0), np.where(positive, 0.0, -resistances)
+
+
+def map_weights(
+    weights: np.ndarray, rmin: float = 1e4, rmax: float = 1e6
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Map weights to the resistances of the positive and negative crossbars
+
+    Args:
+        weights: Matrix of weights, with a row per input and a column per output
+        rmin: Resistance of the largest weight
+        rmax: Resistance of a null weight
+
+    Returns:
+        The resistances of the positive and negative crossbars
+
+    Example:
+        >>> positive, negative = map_weights(np.loadtxt("weights.csv", delimiter=","))
+    """
+    return split_polarity(weight_to_resistance(weights, rmin, rmax))
+
+
+def conductance(resistances: np.ndarray) -> np.ndarray:
+    """Conductances of a crossbar, where resistances of 0 mean no resistor
+
+    Args:
+        resistances: Array of resistances
+
+    Returns:
+        The array of conductances, with 0 where there is no resistor
+    """
+    resistances = np.asarray(resistances, dtype=np.float64)
+    present = resistances != 0
+    return np.divide(1.0, resistances, out=np.zeros_like(resistances), where=present)
+
+
+def quantize(
+    values: np.ndarray, bits: int = 10, vlow: float = -3.0, vhigh: float = 3.0
+) -> np.ndarray:
+    """DAC conversion of values in [0, 1] to input voltages
+
+    Values are truncated to `bits` bits and mapped linearly from 0 -> `vlow` to 1 -> `vhigh`.
+
+    Args:
+        values: Array of values between 0 and 1
+        bits: Resolution of the DAC
+        vlow: Voltage of a null value
+        vhigh: Voltage of a value of 1
+
+    Returns:
+        The array of voltages
+
+    Example:
+        >>> quantize(np.array([0.0, 0.5, 1.0]), bits=2)
+        >>> # array([-3., -1.,  3.])
+    """
+    levels = 2**bits - 1
+    codes = np.trunc(np.asarray(values, dtype=np.float64) * levels)
+    return (codes / levels) * (vhigh - vlow) + vlow
+
+
+def quantize_dataset(
+    path: PathLike,
+    output: PathLike,
+    bits: int = 10,
+    vlow: float = -3.0,
+    vhigh: float = 3.0,
+    min_nonzero: int = 0,
+    indices: Optional[Sequence[int]] = None,
+    chunk: int = 1024,
+) -> np.ndarray:
+    """DAC conversion of a whole dataset to a binary batch of input voltages
+
+    The dataset is read by chunks of vectors, so it does not need to fit in memory.
+    Vectors with `min_nonzero` or less non-zero values are skipped.
+
+    Args:
+        path: CSV file with a vector of values between 0 and 1 per row
+        output: Filepath to the binary `.npy` batch, with a vector of voltages per row
+        bits: Resolution of the DAC
+        vlow: Voltage of a null value
+        vhigh: Voltage of a value of 1
+        min_nonzero: Minimum number of non-zero values of a vector, exclusive
+        indices: If given, only the vectors at these rows of the dataset are converted
+        chunk: Number of vectors read at once
+
+    Returns:
+        The row of each converted vector in the dataset
+
+    Example:
+        >>> rows = quantize_dataset("inputs_inverted.csv", "INPUTS/inputs.npy", min_nonzero=100)
+        >>> voltages = load_matrix("INPUTS/inputs.npy")
+    """
+    wanted = None if indices is None else np.asarray(indices)
+    kept = []
+    start = 0
+    with MatrixWriter(output) as writer:
+        for values in read_csv_chunks(path, chunk):
+            rows = np.arange(start, start + len(values))
+            start += len(values)
+            mask = np.count_nonzero(values, axis=1) > min_nonzero
+            if wanted is not None:
+                mask &= np.isin(rows, wanted)
+            writer.write(quantize(values[mask], bits, vlow, vhigh))
+            kept.append(rows[mask])
+    return np.concatenate(kept) if kept else np.empty(0, dtype=np.int64)
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .core import Circuit, Component
+from .crossbar import build_crossbar
+from .mapping import conductance
+from .storage import PathLike, MatrixWriter, load_matrix
+from .variability import Variability
+
+__all__ = ["MonteCarloResult", "MonteCarlo"]
+
+_Vsource = Component("vsource", ["VDD", "GND"], {"type": "dc"}, cap="V")
+
+# Engine and inputs of a worker process, sent once when the process starts
+_WORKER: Optional[Tuple["MonteCarlo", np.ndarray]] = None
+
+
+def _init_worker(engine: "MonteCarlo", inputs: np.ndarray):
+    global _WORKER
+    _WORKER = (engine, inputs)
+
+
+def _evaluate_worker(samples: List[int]) -> np.ndarray:
+    engine, inputs = _WORKER
+    return engine._evaluate(samples, inputs)
+
+
+class MonteCarloResult(NamedTuple):
+    """Column currents and accuracy of process variability samples
+
+    The class of an input is the column with the largest differential current.
+
+    Attributes:
+        samples: Index of each sample
+        nominal: Currents without variability, of shape (inputs, cols)
+        currents: Currents of each sample, of shape (samples, inputs, cols)
+        predictions: Class of each input for each sample, of shape (samples, inputs)
+        accuracy: Fraction of the inputs correctly classified by each sample
+    """
+
+    samples: np.ndarray
+    nominal: np.ndarray
+    currents: np.ndarray
+    predictions: np.ndarray
+    accuracy: np.ndarray
+
+    @property
+    def mean(self) -> np.ndarray:
+        "Mean of the currents over the samples, of shape (inputs, cols)"
+        return self.currents.mean(axis=0)
+
+    @property
+    def std(self) -> np.ndarray:
+        "Standard deviation of the currents over the samples, of shape (inputs, cols)"
+        return self.currents.std(axis=0)
+
+    def quantile(self, q: Any) -> np.ndarray:
+        "Quantiles of the currents over the samples, see `numpy.quantile`"
+        return np.quantile(self.currents, q, axis=0)
+
+
+class MonteCarlo:
+    """Differential column currents of a pair of crossbars under process variability
+
+    The samples are generated by `variability` like in `weightToResistance.py`: the positive
+    crossbar uses the stream 0 and the negative crossbar the stream 1, so the sample `i` has the
+    resistances exported to `processvariabiliy{i}.csv`. No netlist is written.
+
+    Without wire resistance, the crossbars are ideal: the conductances of a chunk of samples
+    are stacked and the currents of all the inputs are a single batched matrix product.
+    Chunks are evaluated in a thread pool.
+
+    With wire resistance (see `build_crossbar`), the circuit of each sample is solved by a
+    `DCSolver`: the flattened circuit is built once, then each sample is factored once and
+    all the inputs are solved with its factorization. Samples are evaluated in a process pool.
+
+    Args:
+        positive: Nominal resistances of the positive crossbar, 0 for no resistor
+        negative: Nominal resistances of the negative crossbar, 0 for no resistor
+        variability: Generator of the samples, e.g. `Variability.from_range(Rmin, Rmax, 0.03)`
+        row_wire: Resistance of the row segments between two cells, None for ideal rows
+        col_wire: Resistance of the column segments between two cells, None for ideal columns
+        memory: Budget in bytes of the chunks evaluated at once, shared by the workers
+        workers: Number of threads or processes. Defaults to the number of CPUs.
+        dtype: Type of the currents. `np.float32` halves the memory of the results.
+
+    Example:
+        >>> mc = MonteCarlo(resistances, resistances_neg, Variability.from_range(1e4, 1e6))
+        >>> result = mc.run(load_matrix("INPUTS/inputs.npy")[:1000], range(5000))
+        >>> result.accuracy.mean(), result.std.max()
+    """
+
+    def __init__(
+        self,
+        positive: np.ndarray,
+        negative: np.ndarray,
+        variability: Variability,
+        row_wire: Optional[Any] = None,
+        col_wire: Optional[Any] = None,
+        memory: int = 1 << 28,
+        workers: Optional[int] = None,
+        dtype=np.float64,
+    ):
+        self.positive = np.asarray(positive, dtype=np.float64)
+        self.negative = np.asarray(negative, dtype=np.float64)
+        if self.positive.shape != self.negative.shape or self.positive.ndim != 2:
+            raise ValueError("Expected two resistance matrices of the same shape")
+        self.variability = variability
+        self.row_wire = row_wire
+        self.col_wire = col_wire
+        self.memory = memory
+        self.workers: int = workers or os.cpu_count() or 1
+        self.dtype = np.dtype(dtype)
+        # Nominal DCSolver and position of the devices in its resistors
+        self._solver: Optional[Tuple[Any, np.ndarray]] = None
+
+    def __getstate__(self):
+        # The factorization can't be sent to other processes
+        return {**self.__dict__, "_solver": None}
+
+    @property
+    def wires(self) -> bool:
+        "Returns true if the wire resistance is simulated"
+        return self.row_wire is not None or self.col_wire is not None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        "Number of rows and columns of the crossbars"
+        return self.positive.shape
+
+    def resistances(
+        self, sample: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Resistances of the positive and negative crossbars for a sample
+
+        Args:
+            sample: Index of the sample, None for the nominal resistances
+        """
+        if sample is None:
+            return self.positive, self.negative
+        return (
+            self.variability.sample(self.positive, sample, stream=0),
+            self.variability.sample(self.negative, sample, stream=1),
+        )
+
+    def currents(self, inputs: np.ndarray, sample: Optional[int] = None) -> np.ndarray:
+        """Differential column currents for a sample
+
+        Args:
+            inputs: Input voltages, a vector or a matrix with a vector per row
+            sample: Index of the sample, None for the nominal resistances
+
+        Returns:
+            The currents of the positive crossbar minus the currents of the negative crossbar
+        """
+        values = self._inputs(inputs)
+        currents = self._evaluate([sample], values)[0]
+        return currents.reshape(*np.shape(inputs)[:-1], self.shape[1])
+
+    def run(
+        self,
+        inputs: np.ndarray,
+        samples: Iterable[int],
+        labels: Optional[np.ndarray] = None,
+        output: Optional[PathLike] = None,
+    ) -> MonteCarloResult:
+        """Evaluate many samples for a batch of inputs
+
+        Args:
+            inputs: Input voltages, a matrix with a vector per row
+            samples: Indices of the samples
+            labels: Expected class of each input. Defaults to the classes of the nominal crossbars,
+                the accuracy is then the agreement with the nominal crossbars.
+            output: If given, the currents are written to this `.npy` file chunk by chunk and
+                memory mapped from it. Otherwise they are kept in memory.
+
+        Returns:
+            The MonteCarloResult, with the samples in the order of `samples`
+        """
+        inputs = self._inputs(inputs)
+        samples = np.array(list(samples), dtype=np.int64)
+        count, cols = len(inputs), self.shape[1]
+        nominal = self._evaluate([None], inputs)[0]
+        reference = nominal.argmax(axis=-1) if labels is None else np.asarray(labels)
+        if reference.shape != (count,):
+            raise ValueError(f"Expected {count} labels, got {reference.shape}")
+
+        size = self._chunk_size(count)
+        chunks = [samples[i : i + size].tolist() for i in range(0, len(samples), size)]
+        predictions = np.empty((len(samples), count), dtype=np.int64)
+        writer = None if output is None else MatrixWriter(output, self.dtype)
+        currents = None
+        if writer is None:
+            currents = np.empty((len(samples), count, cols), dtype=self.dtype)
+        start = 0
+        try:
+            for block in self._map(chunks, inputs):
+                stop = start + len(block)
+                predictions[start:stop] = block.argmax(axis=-1)
+                if writer is None:
+                    currents[start:stop] = block
+                else:
+                    writer.write(block.reshape(-1, cols))
+                start = stop
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is not None:
+            currents = load_matrix(writer.path).reshape(len(samples), count, cols)
+        accuracy = (predictions == reference).mean(axis=1)
+        return MonteCarloResult(samples, nominal, currents, predictions, accuracy)
+
+    def _inputs(self, inputs: np.ndarray) -> np.ndarray:
+        inputs = np.atleast_2d(np.asarray(inputs, dtype=np.float64))
+        if inputs.shape[-1] != self.shape[0]:
+            raise ValueError(f"Expected {self.shape[0]} inputs, got {inputs.shape[-1]}")
+        return inputs.reshape(-1, self.shape[0])
+
+    def _chunk_size(self, count: int) -> int:
+        "Number of samples of a chunk"
+        if self.wires:
+            # The factorization of a sample dominates, each sample is a task
+            return 1
+        rows, cols = self.shape
+        per_sample = self.dtype.itemsize * (3 * rows * cols + count * cols)
+        return max(1, self.memory // self.workers // per_sample)
+
+    def _map(self, chunks: List[List[int]], inputs: np.ndarray) -> Iterator[np.ndarray]:
+        "Evaluate the chunks in order, with at most one chunk in flight per worker"
+        if self.workers == 1 or len(chunks) <= 1:
+            yield from (self._evaluate(c, inputs) for c in chunks)
+            return
+        pool: Executor
+        task: Callable[[List[int]], np.ndarray]
+        if self.wires:
+            pool = ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=(self, inputs)
+            )
+            task = _evaluate_worker
+        else:
+            pool = ThreadPoolExecutor(self.workers)
+            task = lambda chunk: self._evaluate(chunk, inputs)
+        with pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(task, chunk))
+                if len(pending) >= self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _evaluate(self, samples: List[Optional[int]], inputs: np.ndarray) -> np.ndarray:
+        "Currents of a chunk of samples, of shape (len(samples), len(inputs), cols)"
+        if self.wires:
+            return np.stack([self._solve(s, inputs) for s in samples])
+        G = np.empty((len(samples), *self.shape), dtype=self.dtype)
+        for i, sample in enumerate(samples):
+            positive, negative = self.resistances(sample)
+            G[i] = conductance(positive) - conductance(negative)
+        return np.matmul(inputs.astype(self.dtype, copy=False), G)
+
+    def _nominal_solver(self) -> Tuple[Any, np.ndarray]:
+        if self._solver is not None:
+            return self._solver
+        from .solver import DCSolver
+
+        rows, cols = self.shape
+        nets_in = [f"IN_{i:03d}" for i in range(rows)]
+        outputs = [
+            [f"COL_{j:03d}" for j in range(cols)],
+            [f"COLN_{j:03d}" for j in range(cols)],
+        ]
+        circuit = Circuit(columnar=True)
+        circuit.add(_Vsource.new_many(dict(VDD=nets_in, GND=0), {"dc": 0.0}))
+        devices, offset = [], 0
+        for resistances, nets_out in zip([self.positive, self.negative], outputs):
+            batch = build_crossbar(
+                conductance(resistances),
+                nets_in,
+                nets_out,
+                self.row_wire,
+                self.col_wire,
+            )
+            circuit.add(batch)
+            devices.append(offset + np.arange(np.count_nonzero(resistances)))
+            offset += len(batch)
+        solver = DCSolver(circuit, ground=["0", *outputs[0], *outputs[1]])
+        self._solver = (solver, np.concatenate(devices))
+        return self._solver
+
+    def _solve(self, sample: Optional[int], inputs: np.ndarray) -> np.ndarray:
+        "Currents of a sample with wire resistance, solving the inputs by chunks"
+        solver, devices = self._nominal_solver()
+        if sample is not None:
+            g = solver.conductances.copy()
+            sampled = zip(self.resistances(sample), (self.positive, self.negative))
+            g[devices] = np.concatenate([conductance(r)[n != 0] for r, n in sampled])
+            solver = solver.with_conductances(g)
+        cols = self.shape[1]
+        outputs = [f"COL_{j:03d}" for j in range(cols)] + [
+            f"COLN_{j:03d}" for j in range(cols)
+        ]
+        # Right-hand sides, solutions and voltages of the unknowns for each input
+        unknowns = len(solver.nets) + len(solver.sources)
+        size = max(1, self.memory // self.workers // (3 * 8 * unknowns))
+        currents = np.empty((len(inputs), cols), dtype=self.dtype)
+        for start in range(0, len(inputs), size):
+            op = solver.solve(inputs[start : start + size])
+            both = solver.currents_into(op, outputs)
+            currents[start : start + size] = both[:, :cols] - both[:, cols:]
+        return currents
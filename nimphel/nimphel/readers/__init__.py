@@ -1,3 +1,32 @@
 #!/usr/bin/env python3
 
-from .reader import BaseReader, Reader, ToCircuit
+from importlib import import_module
+
+from .bulk import NetlistColumns, read_columns, read_many
+from .fast import FastSpectreReader
+from .index import NetlistIndex
+
+# The grammar based readers need lark, which is only imported when one of them is used
+_LAZY = [
+    "BaseReader",
+    "Reader",
+    "ToCircuit",
+    "Parser",
+    "SpectreReader",
+    "VerilogAReader",
+]
+
+__all__ = [
+    "FastSpectreReader",
+    "NetlistIndex",
+    "NetlistColumns",
+    "read_columns",
+    "read_many",
+    *_LAZY,
+]
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(import_module(".reader", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from nimphel.core import Columns, Component, InstanceTable, _concat
+from nimphel.readers.fast import FastSpectreReader
+
+__all__ = ["NetlistColumns", "read_columns", "read_many"]
+
+
+class NetlistColumns(NamedTuple):
+    """Instances of a netlist as columns
+
+    Only arrays and strings are stored, so results are cheap to send between processes.
+    The nets of each subcircuit are distinct from the nets of the top level circuit,
+    even if they have the same name.
+
+    Attributes:
+        path: Path of the netlist
+        nets: Array with the name of each net. Node arrays contain indices into this array.
+        columns: Consecutive instances of the same layout, in the order of the netlist.
+            The context of the columns is the name of their subcircuit.
+    """
+
+    path: str
+    nets: np.ndarray
+    columns: List[Columns]
+
+    def select(self, name: str, ctx: Optional[str] = ...) -> Optional[Columns]:
+        """All the instances with the same name as a single Columns
+
+        Args:
+            name: Name of the instances (e.g. `resistor`)
+            ctx: If given, only the instances of this subcircuit (None for the top level)
+
+        Returns:
+            The Columns, or None if there are no such instances
+        """
+        cols = [
+            c for c in self.columns if c.name == name and (ctx is ... or c.ctx == ctx)
+        ]
+        if not cols:
+            return None
+        params = {k: _concat([c.params[k] for c in cols]) for k in cols[0].params}
+        return cols[0]._replace(
+            nodes=np.concatenate([c.nodes for c in cols]),
+            params=params,
+            uids=np.concatenate([c.uids for c in cols]),
+        )
+
+
+def read_columns(
+    path: Union[str, Path], components: Optional[List[Component]] = None
+) -> NetlistColumns:
+    """Read a netlist as columns
+
+    The tables of the circuit and of its subcircuits share a single `nets` array.
+
+    Args:
+        path: Path of the netlist
+        components: Components used to name the nodes of the instances
+
+    Returns:
+        The columns of the netlist
+    """
+    circuit = FastSpectreReader(components, columnar=True).read(path)
+    tables: List[InstanceTable] = [circuit.instances]
+    tables += [s.instances for s in circuit.subcircuits]
+    nets, columns = [], []
+    for table in tables:
+        offset = len(nets)
+        nets += [str(n) for n in table.nets]
+        for cols in table.columns():
+            columns.append(cols._replace(nodes=cols.nodes + offset))
+    return NetlistColumns(str(path), np.array(nets, dtype=object), columns)
+
+
+def read_many(
+    paths: Iterable[Union[str, Path]],
+    components: Optional[List[Component]] = None,
+    workers: Optional[int] = None,
+) -> List[NetlistColumns]:
+    """Read many netlists as columns in a process pool
+
+    Each process parses whole netlists and only sends back their columns.
+
+    Args:
+        paths: Paths of the netlists
+        components: Components used to name the nodes of the instances
+        workers: Number of processes. Defaults to the number of CPUs.
+            With a single worker, netlists are read in this process.
+
+    Returns:
+        The columns of each netlist, in the order of `paths`
+
+    Example:
+        >>> results = read_many(glob("NETLISTS/PV/netlist_*"), [Mem])
+        >>> r = results[0].select("resistor").params["r"]
+    """
+    paths = list(paths)
+    read = partial(read_columns, components=components)
+    if workers == 1 or len(paths) <= 1:
+        return list(map(read, paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(read, paths))
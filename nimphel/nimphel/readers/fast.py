@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+
+import re
+from itertools import groupby
+from operator import itemgetter, methodcaller
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from nimphel.core import Directive, Analysis, AlterGroup, ParamSet, Sweep
+from nimphel.core import Model, Instance, Subcircuit, Circuit, Component, Node
+from nimphel.core import InstanceTable
+from nimphel.writers import SPECTRE_SCALE
+
+__all__ = ["FastSpectreReader"]
+
+#: Multiplier of each Spectre scale suffix
+SUFFIXES: Dict[str, float] = {s: 10.0**e for e, s in SPECTRE_SCALE.items() if s}
+
+#: Statements that are written `name statement params`
+ANALYSES = {
+    *("dc", "ac", "tran", "noise", "xf", "sp", "pz", "stb", "pss", "pac"),
+    *("hb", "info", "options", "set", "alter", "montecarlo"),
+}
+
+_INSTANCE = re.compile(r"(\S+)\s*\(([^()]*)\)\s*(\S+)\s*(.*)")
+# Same as _INSTANCE, for many lines at once and with the name split into cap and uid
+_INSTANCES = re.compile(
+    r"^[ \t]*(\S*?)(\d*)[ \t]*\(([^()\n]*)\)[ \t]*(\S+)[ \t]*(.*)$", re.M
+)
+# Consecutive instance lines
+_RUN = re.compile(r"(?:[ \t]*[^\s(]+[ \t]*\([^()\n]*\)[ \t]*\S+[^\n]*(?:\n|$))+")
+_NAME = re.compile(r"(.*?)(\d+)")
+_PARAM = re.compile(r'([^\s=]+)(?:\s*=\s*("[^"]*"|\[[^\]]*\]|\([^)]*\)|\S+))?')
+_NUMBER = re.compile(r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)([a-zA-Z]?)")
+
+#: Line number, text and whether the text is a run of instance lines
+Item = Tuple[int, str, bool]
+
+
+def _value(text: str) -> Any:
+    "Convert a parameter value to a Python value"
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    match = _NUMBER.fullmatch(text)
+    if match and match[2] in SUFFIXES:
+        return float(match[1]) * SUFFIXES[match[2]]
+    if text.startswith("[") and text.endswith("]"):
+        return [_value(v) for v in text[1:-1].split()]
+    if len(text) > 1 and text[0] == text[-1] == '"':
+        return text[1:-1]
+    return text
+
+
+def _column(texts: List[Optional[str]]) -> np.ndarray:
+    """Convert the values of a parameter of many instances to a column
+
+    Parameters without a value are None, in a column of objects.
+    """
+    for dtype in (int, float):
+        try:
+            return np.array(list(map(dtype, texts)))
+        except (ValueError, OverflowError, TypeError):
+            pass
+    values = [t if t is None else _value(t) for t in texts]
+    if all(isinstance(v, (int, float)) for v in values):
+        return np.array(values, dtype=np.float64)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _node(text: str) -> Node:
+    return int(text) if text.isdigit() else text
+
+
+def _nodes(texts: List[str]) -> np.ndarray:
+    "Convert the values of a node of many instances to a column"
+    if not any(map(str.isdigit, texts)):
+        return np.array(texts)
+    column = np.empty(len(texts), dtype=object)
+    column[:] = list(map(_node, texts))
+    return column
+
+
+def _is_simple(text: str) -> bool:
+    "Returns true if the parameters can be split on whitespace"
+    return not any(c in text for c in '"[(') and " =" not in text and "= " not in text
+
+
+def _params(text: str) -> Dict[str, Optional[str]]:
+    "Split `key=value` parameters, keeping the values as text"
+    if not _is_simple(text):
+        return {k: v or None for k, v in _PARAM.findall(text)}
+    params = {}
+    for token in text.split():
+        key, eq, value = token.partition("=")
+        params[key] = value if eq else None
+    return params
+
+
+def _args(text: str) -> Dict[str, Any]:
+    return {k: v if v is None else _value(v) for k, v in _params(text).items()}
+
+
+def _split_columns(rows: Tuple[str, ...]) -> Optional[List[List[str]]]:
+    "Split whitespace separated rows into columns, if all the rows have the same length"
+    width = len(rows[0].split())
+    # Rows are joined with a separator so that their length can be checked at once
+    tokens = " \0 ".join(rows).split()
+    if len(tokens) != len(rows) * (width + 1) - 1:
+        return None
+    if tokens[width :: width + 1].count("\0") != len(rows) - 1:
+        return None
+    return [tokens[i :: width + 1] for i in range(width)]
+
+
+def _param_columns(texts: Tuple[str, ...]) -> Optional[Dict[str, List[Optional[str]]]]:
+    """Split the parameters of many instances into columns of values
+
+    Returns None if the instances do not have the same parameters in the same order.
+    """
+    if not _is_simple(" ".join(texts)):
+        return None
+    columns = _split_columns(texts)
+    if columns is None:
+        return None
+    params = {}
+    for column in columns:
+        key, eq, _ = column[0].partition("=")
+        if eq:
+            prefix = key + eq
+            if not all(map(methodcaller("startswith", prefix), column)):
+                return None
+            params[key] = list(map(itemgetter(slice(len(prefix), None)), column))
+        else:
+            if column.count(key) != len(column):
+                return None
+            params[key] = [None] * len(column)
+    return params
+
+
+class FastSpectreReader:
+    """Fast reader of flat Spectre netlists
+
+    Lines are split with a handful of regular expressions instead of a grammar, which is
+    enough for the netlists written by nimphel and most flat netlists: `subckt`/`ends`,
+    instances `name (nodes) master key=value`, models, analyses, `altergroup`, `paramset`
+    and `sweep` blocks and other directives. With a columnar circuit, consecutive instance
+    lines are split all at once and their values are converted a whole column at a time,
+    so large netlists are read at hundreds of thousands of lines per second.
+
+    Instances are named after their master. The prefix of the instance name is the `cap`
+    and its trailing number is the `uid`. The nodes are named after the nodes of the Component
+    with the same name if it is given, and by position (`n0`, `n1`...) otherwise.
+    Numeric values are converted to numbers, Spectre scale suffixes included.
+
+    Args:
+        components: Components used to name the nodes of the instances
+        columnar: If True, the instances of the circuit and subcircuits are stored in InstanceTables
+
+    Example:
+        >>> reader = FastSpectreReader([Mem], columnar=True)
+        >>> circuit = reader.read("NETLISTS/netlist_no_PV0")
+        >>> circuit.subcircuits[0].instances.nets[:2] # ['IN_000', 'COL_000']
+    """
+
+    def __init__(
+        self, components: Optional[List[Component]] = None, columnar: bool = True
+    ):
+        self.components: Dict[str, Component] = {c.name: c for c in components or []}
+        self.columnar: bool = columnar
+
+    def _node_names(self, master: str, count: int) -> Tuple[str, ...]:
+        comp = self.components.get(master)
+        if comp is not None and len(comp.nodes) == count:
+            return tuple(comp.nodes)
+        return tuple(f"n{i}" for i in range(count))
+
+    @staticmethod
+    def _lines(source: str) -> Iterator[Tuple[int, str]]:
+        "Logical lines with their line number, without comments and continuations"
+        pending, start = "", 0
+        for number, line in enumerate(source.splitlines(), 1):
+            if "//" in line:
+                line = line.split("//", 1)[0]
+            line = line.strip()
+            if line.endswith("\\"):
+                pending, start = pending + line[:-1] + " ", start or number
+                continue
+            if pending:
+                line, number, pending, start = pending + line, start, "", 0
+            if line and line[0] != "*":
+                yield number, line
+
+    def _items(self, source: str) -> Iterator[Item]:
+        """Lines of a netlist, where consecutive instance lines are grouped into runs
+
+        If the netlist has no comments nor continuations, runs are found directly in the
+        source with a regular expression instead of going line by line.
+        """
+        if "//" in source or "\\" in source:
+            run, start = [], 0
+            for number, line in self._lines(source):
+                if _INSTANCE.fullmatch(line):
+                    start = start if run else number
+                    run.append(line)
+                    continue
+                if run:
+                    yield start, "\n".join(run), True
+                    run = []
+                yield number, line, False
+            if run:
+                yield start, "\n".join(run), True
+            return
+        pos, number, size = 0, 1, len(source)
+        while pos < size:
+            run = _RUN.match(source, pos)
+            if run:
+                yield number, run[0], True
+                number += run[0].count("\n")
+                pos = run.end()
+                continue
+            end = source.find("\n", pos)
+            end = size if end < 0 else end
+            line = source[pos:end].strip()
+            if line and line[0] != "*":
+                yield number, line, False
+            number, pos = number + 1, end + 1
+
+    @staticmethod
+    def _label(label: str) -> Tuple[str, Optional[int]]:
+        match = _NAME.fullmatch(label)
+        return (match[1], int(match[2])) if match else (label, None)
+
+    def _instance(self, match: re.Match, ctx: Optional[str] = None) -> Instance:
+        label, nodes, master, params = match.groups()
+        cap, uid = self._label(label)
+        nodes = nodes.split()
+        return Instance(
+            master,
+            dict(zip(self._node_names(master, len(nodes)), map(_node, nodes))),
+            _args(params),
+            uid=uid,
+            ctx=ctx,
+            cap=cap,
+        )
+
+    def _extend(self, owner: Union[Circuit, Subcircuit], run: str):
+        "Add a run of instance lines to the InstanceTable of the owner"
+        rows = _INSTANCES.findall(run)
+        caps, uids, nodes, masters, params = zip(*rows)
+        if len(set(caps)) == 1 and len(set(masters)) == 1:
+            groups = [((caps[0], masters[0]), len(rows))]
+        else:
+            keys = groupby(zip(caps, masters))
+            groups = [(key, sum(1 for _ in group)) for key, group in keys]
+        start = 0
+        for (cap, master), count in groups:
+            stop = start + count
+            node_columns = _split_columns(nodes[start:stop])
+            param_columns = _param_columns(params[start:stop])
+            if node_columns is None or param_columns is None:
+                for row in rows[start:stop]:
+                    self._extend_row(owner, row)
+            else:
+                self._extend_columns(
+                    owner, master, cap, uids[start:stop], node_columns, param_columns
+                )
+            start = stop
+
+    def _extend_row(self, owner: Union[Circuit, Subcircuit], row: Tuple[str, ...]):
+        "Add a single instance line to the InstanceTable of the owner"
+        cap, uid, nodes, master, params = row
+        params = {k: [v] for k, v in _params(params).items()}
+        nodes = [[n] for n in nodes.split()]
+        self._extend_columns(owner, master, cap, (uid,), nodes, params)
+
+    def _extend_columns(
+        self,
+        owner: Union[Circuit, Subcircuit],
+        master: str,
+        cap: str,
+        uids: Tuple[str, ...],
+        nodes: List[List[str]],
+        params: Dict[str, List[Optional[str]]],
+    ):
+        uids = np.array([int(u) if u else -1 for u in uids], dtype=np.int64)
+        owner.instances.extend(
+            master,
+            dict(zip(self._node_names(master, len(nodes)), map(_nodes, nodes))),
+            {k: _column(v) for k, v in params.items()},
+            uids,
+            cap,
+        )
+        owner.uids_map[master] = max(owner.uids_map[master], int(uids.max()))
+
+    def _block(self, items: Iterator[Item], number: int) -> List[str]:
+        "Lines of a block until its closing brace"
+        body, depth = [], 1
+        for _, line, run in items:
+            if run:
+                body.extend(l.strip() for l in line.splitlines())
+                continue
+            depth += line.count("{") - line.count("}")
+            if depth <= 0:
+                last = line.rsplit("}", 1)[0].strip()
+                return body + [last] if last else body
+            body.append(line)
+        raise ValueError(f"Line {number}: block is not closed")
+
+    def _statement(self, number: int, line: str, items: Iterator[Item]) -> Any:
+        "Parse anything that is not an instance nor a subcircuit"
+        if line.endswith("{"):
+            name, kind, *rest = line[:-1].split(None, 2)
+            body = self._block(items, number)
+            if kind == "altergroup":
+                params = [_args(l.split(None, 1)[1]) for l in body if " " in l]
+                return AlterGroup(name, {k: v for p in params for k, v in p.items()})
+            if kind == "paramset":
+                keys, *rows = [l.split() for l in body]
+                columns = zip(*rows) if rows else [[] for _ in keys]
+                return ParamSet(name, dict(zip(keys, map(_column, columns))))
+            if kind == "sweep":
+                inner = ((n, l, False) for n, l in enumerate(body, number + 1))
+                statements = [self._statement(n, l, inner) for n, l, _ in inner]
+                return Sweep(name, statements, _args(rest[0]) if rest else {})
+            return Directive(f"{line}\n" + "\n".join(body) + "\n}")
+        first, _, rest = line.partition(" ")
+        if first == "model":
+            name, base, params = (rest.split(None, 2) + ["", ""])[:3]
+            return Model(name, base, _args(params.strip().strip("()")))
+        second, _, params = rest.strip().partition(" ")
+        if second in ANALYSES:
+            return Analysis(first, second, _args(params))
+        if "=" in rest:
+            return Directive(first, _args(rest))
+        return Directive(line)
+
+    def reads(self, netlist: str, path: Optional[str] = None) -> Circuit:
+        """Parse a netlist
+
+        Args:
+            netlist: Content of the netlist
+            path: Path of the netlist file, if any
+
+        Returns:
+            The Circuit
+
+        Raises:
+            ValueError: If a subcircuit or a block is not closed
+        """
+        circuit = Circuit(columnar=self.columnar)
+        if path:
+            circuit.path = path
+        # Instances are added to the current subcircuit, if any, or to the circuit
+        owner: Union[Circuit, Subcircuit] = circuit
+        subckt_line = 0
+
+        items = self._items(netlist)
+        for number, line, run in items:
+            if run and self.columnar:
+                self._extend(owner, line)
+            elif run:
+                ctx = None if owner is circuit else owner.name
+                for l in line.splitlines():
+                    inst = self._instance(_INSTANCE.fullmatch(l.strip()), ctx)
+                    owner.instances.append(inst)
+                    owner.uids_map[inst.name] = max(
+                        owner.uids_map[inst.name], inst.uid or 0
+                    )
+            elif line.startswith(("subckt ", "inline subckt ")):
+                if owner is not circuit:
+                    raise ValueError(f"Line {number}: nested subcircuit")
+                name, *nodes = line.partition("subckt ")[2].split()
+                owner, subckt_line = Subcircuit(name, nodes), number
+                if self.columnar:
+                    owner.instances = InstanceTable(ctx=name)
+            elif owner is not circuit and line.startswith("parameters "):
+                owner.params.update(_args(line.partition(" ")[2]))
+            elif line == "ends" or line.startswith("ends "):
+                if owner is circuit:
+                    raise ValueError(f"Line {number}: ends without subckt")
+                circuit.subcircuits.append(owner)
+                owner = circuit
+            else:
+                circuit.directives.append(self._statement(number, line, items))
+        if owner is not circuit:
+            raise ValueError(f"Line {subckt_line}: subckt {owner.name} is not closed")
+        return circuit
+
+    def read(self, path: Union[str, Path]) -> Circuit:
+        """Parse a netlist file
+
+        Args:
+            path: Path of the netlist file
+
+        Returns:
+            The Circuit
+        """
+        with open(path, "r") as fp:
+            return self.reads(fp.read(), path=path)
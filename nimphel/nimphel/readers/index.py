@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from nimphel.core import Component, Instance, Subcircuit
+from nimphel.readers.fast import FastSpectreReader, _INSTANCE
+
+__all__ = ["NetlistIndex"]
+
+#: Version of the persisted index, changed when its layout changes
+INDEX_VERSION = 1
+
+# Logical lines, continuations included
+_STATEMENT = re.compile(rb"(?:[^\\\n]+|\\\r?\n|\\)*")
+_INSTANCE_BYTES = re.compile(rb"[ \t]*([^\s(]+)[ \t]*\(([^()]*)\)[ \t]*\S")
+_SUBCKT = re.compile(rb"[ \t]*(?:inline[ \t]+)?subckt[ \t]+(\S+)")
+_ENDS = re.compile(rb"[ \t]*ends\b")
+_CONTINUATION = re.compile(rb"\\\r?\n")
+
+
+class NetlistIndex:
+    """Index of the instances of a netlist file for random access
+
+    The file is scanned once through a memory map and the byte offsets of each instance
+    are recorded, along with its name, its subcircuit and its nodes. Queries only parse
+    the lines of the requested instances.
+
+    The index is saved next to the netlist (`<netlist>.index.npz`) and is rebuilt
+    when the size or the modification time of the netlist changes.
+
+    Args:
+        path: Path of the netlist file
+        components: Components used to name the nodes of the parsed instances
+        cache: If False, the index is neither loaded from nor saved to disk
+
+    Attributes:
+        names: Name of each instance (e.g. `M42`)
+        starts: Byte offset of the first character of each instance
+        stops: Byte offset of the end of each instance
+        ctx: Index of the subcircuit of each instance in `subckts`, -1 for the top level
+        subckts: Names of the subcircuits
+        spans: Byte offsets of the start and the end of each subcircuit
+        nets: Sorted names of the nets
+
+    Example:
+        >>> with NetlistIndex("NETLISTS/netlist_no_PV0", [Mem]) as index:
+        ...     resistors = index.instances(index.connected("COL_042"))
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        components: Optional[List[Component]] = None,
+        cache: bool = True,
+    ):
+        self.path = Path(path)
+        self.reader = FastSpectreReader(components, columnar=False)
+        self._fp = open(self.path, "rb")
+        size = os.fstat(self._fp.fileno()).st_size
+        self._map = (
+            mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+
+        arrays = self._load() if cache else None
+        if arrays is None:
+            arrays = self._scan()
+            if cache:
+                self._save(arrays)
+        self.names: np.ndarray = arrays["names"]
+        self.starts: np.ndarray = arrays["starts"]
+        self.stops: np.ndarray = arrays["stops"]
+        self.ctx: np.ndarray = arrays["ctx"]
+        self.subckts: np.ndarray = arrays["subckts"]
+        self.spans: np.ndarray = arrays["spans"]
+        self.nets: np.ndarray = arrays["nets"]
+        # Instances sorted by name, and instances of each net (CSR layout)
+        self._by_name: np.ndarray = arrays["by_name"]
+        self._sorted_names: np.ndarray = self.names[self._by_name]
+        self._net_ptr: np.ndarray = arrays["net_ptr"]
+        self._net_instances: np.ndarray = arrays["net_instances"]
+
+    @property
+    def index_path(self) -> Path:
+        "Path of the persisted index"
+        return self.path.with_name(self.path.name + ".index.npz")
+
+    def _stamp(self) -> np.ndarray:
+        stat = self.path.stat()
+        return np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    def _load(self) -> Optional[Dict[str, np.ndarray]]:
+        try:
+            with np.load(self.index_path, allow_pickle=False) as data:
+                if not np.array_equal(data["stamp"], self._stamp()):
+                    return None
+                return dict(data)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _save(self, arrays: Dict[str, np.ndarray]):
+        # Written to a temporary file first so that a partial index is never loaded
+        tmp = self.index_path.with_suffix(".tmp.npz")
+        try:
+            np.savez(tmp, stamp=self._stamp(), **arrays)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            # The index is still usable, it is just not persisted
+            tmp.unlink(missing_ok=True)
+
+    def _scan(self) -> Dict[str, np.ndarray]:
+        "Scan the whole file once and build the index"
+        names, starts, stops, ctx, nodes = [], [], [], [], []
+        subckts, spans = [], []
+        current = -1
+        for match in _STATEMENT.finditer(self._map):
+            line = match[0]
+            if not line.strip() or line.lstrip().startswith((b"//", b"*")):
+                continue
+            if b"\\" in line:
+                line = _CONTINUATION.sub(b" ", line)
+            inst = _INSTANCE_BYTES.match(line)
+            if inst:
+                names.append(inst[1])
+                starts.append(match.start())
+                stops.append(match.end())
+                ctx.append(current)
+                nodes.append(inst[2].split(b"//", 1)[0].split())
+            elif _SUBCKT.match(line):
+                current = len(subckts)
+                subckts.append(_SUBCKT.match(line)[1])
+                spans.append([match.start(), match.end()])
+            elif current >= 0 and _ENDS.match(line):
+                spans[current][1] = match.end()
+                current = -1
+
+        counts = np.array([len(n) for n in nodes], dtype=np.int64)
+        flat = [n.decode() for ns in nodes for n in ns]
+        nets, net_ids = np.unique(np.array(flat, dtype=str), return_inverse=True)
+        owners = np.repeat(np.arange(len(nodes)), counts)
+        order = np.argsort(net_ids, kind="stable")
+        net_instances = owners[order]
+        net_ptr = np.searchsorted(net_ids[order], np.arange(len(nets) + 1))
+        names = np.array([n.decode() for n in names], dtype=str)
+        return {
+            "names": names,
+            "starts": np.array(starts, dtype=np.int64),
+            "stops": np.array(stops, dtype=np.int64),
+            "ctx": np.array(ctx, dtype=np.int32),
+            "subckts": np.array([s.decode() for s in subckts], dtype=str),
+            "spans": np.array(spans, dtype=np.int64).reshape(-1, 2),
+            "nets": nets,
+            "by_name": np.argsort(names, kind="stable"),
+            "net_ptr": net_ptr.astype(np.int64),
+            "net_instances": net_instances.astype(np.int64),
+        }
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _ctx_mask(self, positions: np.ndarray, subckt) -> np.ndarray:
+        if subckt is ...:
+            return positions
+        code = -1
+        if subckt is not None:
+            found = np.flatnonzero(self.subckts == subckt)
+            if not len(found):
+                return positions[:0]
+            code = found[0]
+        return positions[self.ctx[positions] == code]
+
+    def find(self, name: str, subckt: Optional[str] = ...) -> np.ndarray:
+        """Positions of the instances with a given name
+
+        Args:
+            name: Name of the instance in the netlist (e.g. `M42`)
+            subckt: If given, only the instances of this subcircuit (None for the top level)
+
+        Returns:
+            An array of positions, in the order of the file
+        """
+        left = np.searchsorted(self._sorted_names, name, "left")
+        right = np.searchsorted(self._sorted_names, name, "right")
+        return self._ctx_mask(np.sort(self._by_name[left:right]), subckt)
+
+    def connected(self, net: str, subckt: Optional[str] = ...) -> np.ndarray:
+        """Positions of the instances with a node connected to a net
+
+        Args:
+            net: Name of the net
+            subckt: If given, only the instances of this subcircuit (None for the top level)
+
+        Returns:
+            An array of positions, in the order of the file
+        """
+        i = np.searchsorted(self.nets, str(net))
+        if i == len(self.nets) or self.nets[i] != str(net):
+            return np.empty(0, dtype=np.int64)
+        positions = self._net_instances[self._net_ptr[i] : self._net_ptr[i + 1]]
+        return self._ctx_mask(np.unique(positions), subckt)
+
+    def within(self, subckt: Optional[str]) -> np.ndarray:
+        """Positions of the instances of a subcircuit
+
+        Args:
+            subckt: Name of the subcircuit, or None for the top level
+
+        Returns:
+            An array of positions, in the order of the file
+        """
+        return self._ctx_mask(np.arange(len(self)), subckt)
+
+    def text(self, position: int) -> str:
+        "Text of an instance, as written in the file"
+        start, stop = int(self.starts[position]), int(self.stops[position])
+        return self._map[start:stop].decode()
+
+    def instance(self, position: int) -> Instance:
+        """Parse a single instance
+
+        Args:
+            position: Position of the instance in the index
+
+        Returns:
+            The Instance
+        """
+        _, line = next(self.reader._lines(self.text(position)))
+        code = int(self.ctx[position])
+        ctx = None if code < 0 else str(self.subckts[code])
+        return self.reader._instance(_INSTANCE.fullmatch(line), ctx)
+
+    def instances(self, positions) -> List[Instance]:
+        """Parse many instances
+
+        Args:
+            positions: Positions of the instances in the index, for instance from `find`
+
+        Returns:
+            The list of Instances
+        """
+        return [self.instance(p) for p in np.asarray(positions).tolist()]
+
+    def subcircuit(self, name: str) -> Subcircuit:
+        """Parse a single subcircuit
+
+        Args:
+            name: Name of the subcircuit
+
+        Returns:
+            The Subcircuit, with its instances in an InstanceTable
+
+        Raises:
+            KeyError: If there is no subcircuit with this name
+        """
+        found = np.flatnonzero(self.subckts == name)
+        if not len(found):
+            raise KeyError(name)
+        start, stop = self.spans[found[0]].tolist()
+        text = self._map[start:stop].decode()
+        reader = FastSpectreReader(list(self.reader.components.values()))
+        return reader.reads(text, path=str(self.path)).subcircuits[0]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._fp.close()
+
+    def __enter__(self) -> "NetlistIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
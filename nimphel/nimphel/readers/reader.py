@@ -6,10 +6,16 @@ from lark.exceptions import VisitError
 from pathlib import Path
 from os import PathLike
 from abc import ABC, abstractmethod
+from functools import lru_cache
+from hashlib import sha256
 import json
+import os
 
-from nimphel.core import Element, Instance, Directive, Subcircuit, Circuit
-from typing import Union, List, Optional, IO, Type, TextIO
+from nimphel.core import Element, Instance, Directive, Subcircuit, Circuit, Model
+from typing import Union, List, Dict, Optional, IO, Type, TextIO
+
+#: Directory of the compiled parsers cache
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "nimphel"
 
 
 class BaseReader(ABC):
@@ -50,11 +56,24 @@ class ToCircuit(Transformer):
             return float(x)
 
     def circuit(self, x):
-        return Circuit(
-            instances=[i for i in x if isinstance(i, Instance)],
-            subcircuits=[i for i in x if isinstance(i, Subcircuit)],
-            directives=[i for i in x if isinstance(i, Directive)],
-        )
+        circuit = Circuit()
+        for elem in x:
+            if isinstance(elem, Instance):
+                circuit.instances.append(elem)
+            elif isinstance(elem, Subcircuit):
+                circuit.subcircuits.append(elem)
+            elif isinstance(elem, (Directive, Model)):
+                circuit.directives.append(elem)
+        return circuit
+
+    def model(self, x):
+        return Model(str(x[0]), str(x[1]), {})
+
+    def directive_name(self, x):
+        return str(x[0])
+
+    def directive(self, x):
+        return Directive(x[0])
 
     def param_value(self, x):
         return {x[0]: x[1]}
@@ -94,13 +113,61 @@ class ToCircuit(Transformer):
         return s
 
 
+@lru_cache(maxsize=None)
+def grammars() -> Dict[str, Path]:
+    "Grammars available in this directory, by name"
+    grammars_path = Path(__file__).parents[0]
+    return {f.stem: f for f in grammars_path.iterdir() if f.suffix == ".lark"}
+
+
+@lru_cache(maxsize=None)
+def load_parser(
+    name: str, parser: str = "earley", start: str = "circuit", cache: bool = True
+) -> Lark:
+    """Compile the Lark parser of a grammar
+
+    Parsers are compiled once per process and shared by all the readers.
+    LALR parsers are also cached on disk in `CACHE_DIR`, under the hash of the grammar,
+    so they are only compiled again when the grammar changes.
+
+    Args:
+        name: Name of the language. It should not contain the suffix `.lark`
+        parser: Parsing algorithm, `earley` or `lalr`
+        start: Start rule of the grammar
+        cache: If True, LALR parsers are cached on disk
+
+    Returns:
+        The Lark parser
+    """
+    available = grammars()
+    if name not in available:
+        raise ValueError(
+            f'Language "{name}" not available. Available languages are {list(available)}'
+        )
+    grammar = available[name]
+    options = dict(parser=parser, start=start, maybe_placeholders=True)
+    if cache and parser == "lalr":
+        digest = sha256(grammar.read_bytes()).hexdigest()[:16]
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            options["cache"] = str(CACHE_DIR / f"{name}-{digest}.lark")
+        except OSError:
+            pass
+    return Lark.open(str(grammar), rel_to=__file__, **options)
+
+
 class Parser(Reader):
     """Create a reader for an specific language
 
-    The grammars are read from this directory and must end with `.lark`
+    The grammars are read from this directory and must end with `.lark`.
+    The compiled parsers are cached, so creating many readers is cheap.
 
     Args:
         name: Name of the language. It should not contain the suffix `.lark`
+        transformer: Transformer applied to the parsed tree
+        parser: Parsing algorithm. `lalr` is much faster than `earley` but the grammar must be LALR(1).
+        start: Start rule of the grammar
+        cache: If True, LALR parsers are cached on disk
 
     Returns:
         A Lark parser configured for the given language
@@ -108,16 +175,15 @@ class Parser(Reader):
     .todo: Allow creating parsers from user defined grammars
     """
 
-    def __init__(self, name: str, transformer: Type[Transformer] = ToCircuit):
-        grammars_path = Path(__file__).parents[0]
-        grammars = [f for f in grammars_path.iterdir() if f.suffix == ".lark"]
-        grammar_names = [f.stem for f in grammars]
-        if not name in grammar_names:
-            raise ValueError(
-                f'Language "{name}" not available. Available languages are {grammar_names}'
-            )
-        grammar = next(g for g in grammars if g.stem == name)
-        self.parser = Lark.open(str(grammar), maybe_placeholders=True, rel_to=__file__)
+    def __init__(
+        self,
+        name: str,
+        transformer: Type[Transformer] = ToCircuit,
+        parser: str = "earley",
+        start: str = "circuit",
+        cache: bool = True,
+    ):
+        self.parser = load_parser(name, parser, start, cache)
         self.transformer = transformer
 
     def parse(self, source: str, path: Optional[str] = None) -> Circuit:
@@ -165,6 +231,7 @@ class SpectreReader(Parser):
 
 class VerilogAReader(Parser):
     def __init__(self, *args, **kwargs):
+        kwargs.setdefault("start", "start")
         super().__init__("veriloga", *args, **kwargs)
 
 
@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+
+from .ocean import Waveforms, iter_ocnprint, read_ocnprint
+from .psf import PSFAscii, read_psf
+
+__all__ = ["Waveforms", "iter_ocnprint", "read_ocnprint", "PSFAscii", "read_psf"]
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import re
+from itertools import islice
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from nimphel.storage import PathLike, MatrixWriter, load_matrix
+from nimphel.writers import SPECTRE_SCALE
+
+__all__ = ["Waveforms", "iter_ocnprint", "read_ocnprint"]
+
+#: Multiplier of each engineering suffix printed by ocnPrint
+SUFFIXES = {s: 10.0**e for e, s in SPECTRE_SCALE.items() if s}
+
+_NUMBER = re.compile(r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)([a-zA-Z]?)")
+_SIGNAL = re.compile(r'\w+\("?([^"()]*)"?\)?')
+_TOKEN = re.compile(r"\S+")
+
+
+class Waveforms(NamedTuple):
+    """Table of signals sampled at the same points
+
+    Attributes:
+        x_label: Label of the sweep variable (e.g. `time (s)`)
+        labels: Label of each signal, as printed in the table
+        x: Values of the sweep variable, of shape (n,)
+        values: Values of the signals, of shape (n, len(labels))
+    """
+
+    x_label: str
+    labels: Tuple[str, ...]
+    x: np.ndarray
+    values: np.ndarray
+
+    @property
+    def signals(self) -> List[str]:
+        'Name of each signal without its expression (e.g. `/I0/COL_000` for `i("/I0/COL_000")`)'
+        return [
+            m[1] if (m := _SIGNAL.fullmatch(label)) else label for label in self.labels
+        ]
+
+    def column(self, name: str) -> np.ndarray:
+        """Values of a signal
+
+        Args:
+            name: Label of the signal, or its name without the expression
+
+        Raises:
+            KeyError: If there is no such signal
+        """
+        for names in (self.labels, self.signals):
+            if name in names:
+                return self.values[:, names.index(name)]
+        raise KeyError(name)
+
+
+def _number(text: str) -> float:
+    match = _NUMBER.fullmatch(text)
+    if match and (not match[2] or match[2] in SUFFIXES):
+        return float(match[1]) * SUFFIXES.get(match[2], 1.0)
+    return float(text)
+
+
+def _parse(lines: List[str], width: int) -> np.ndarray:
+    "Convert lines of numbers to a matrix"
+    tokens = " ".join(lines).split()
+    if len(tokens) != len(lines) * width:
+        raise ValueError(f"Expected {width} values on each line")
+    try:
+        values = np.array(tokens).astype(np.float64)
+    except ValueError:
+        # Engineering notation, e.g. -2.389m
+        values = np.array([_number(t) for t in tokens])
+    return values.reshape(len(lines), width)
+
+
+def _header(header: str, first: str) -> List[str]:
+    """Split the header of a table
+
+    Labels may contain spaces and be truncated to the width of the columns, so the header is
+    split at the positions of the values of the first row.
+    """
+    starts = [m.start() for m in _TOKEN.finditer(first)]
+    stops = starts[1:] + [None]
+    return [header[a:b].strip() for a, b in zip(starts, stops)]
+
+
+def iter_ocnprint(
+    path: PathLike, rows: int = 4096, labels: Optional[Sequence[str]] = None
+) -> Iterator[Waveforms]:
+    """Read a table written by the `ocnPrint` function of OCEAN by chunks of rows
+
+    Only `rows` lines are held in memory at once, so long transient runs with many signals can
+    be processed in constant memory.
+
+    Args:
+        path: Path of the table
+        rows: Number of rows of each chunk
+        labels: Labels of the signals, to replace the labels of the header. ocnPrint truncates
+            labels to the width of the columns, so they may not be unique.
+
+    Returns:
+        An iterator over the chunks of the table
+
+    Raises:
+        ValueError: If the table is malformed
+    """
+    with open(path, encoding="utf8") as fp:
+        lines = (line for line in fp if line.strip())
+        header = next(lines, None)
+        first = next(lines, None)
+        if header is None or first is None:
+            raise ValueError(f"{path}: no table")
+        x_label, *names = _header(header.rstrip("\n"), first)
+        if labels is not None:
+            if len(labels) != len(names):
+                raise ValueError(f"Expected {len(names)} labels, got {len(labels)}")
+            names = list(labels)
+        width = len(names) + 1
+        chunk = [first]
+        while True:
+            chunk += islice(lines, rows - len(chunk))
+            if not chunk:
+                return
+            values = _parse(chunk, width)
+            yield Waveforms(x_label, tuple(names), values[:, 0], values[:, 1:])
+            chunk = []
+
+
+def read_ocnprint(
+    path: PathLike,
+    rows: int = 4096,
+    labels: Optional[Sequence[str]] = None,
+    output: Optional[PathLike] = None,
+) -> Waveforms:
+    """Read a whole table written by the `ocnPrint` function of OCEAN
+
+    Args:
+        path: Path of the table
+        rows: Number of rows parsed at once
+        labels: Labels of the signals, to replace the labels of the header
+        output: If given, the values (sweep variable first) are written to this `.npy` file
+            chunk by chunk and the result is memory mapped from it
+
+    Returns:
+        The Waveforms of the table
+
+    Example:
+        >>> currents = read_ocnprint("CURRENTS/positivecurrent.txt")
+        >>> currents.values[0]  # All the columns at the first time point
+    """
+    chunks = iter_ocnprint(path, rows, labels)
+    if output is None:
+        chunks = list(chunks)
+        values = np.concatenate([np.column_stack([c.x, c.values]) for c in chunks])
+        chunk = chunks[0]
+    else:
+        with MatrixWriter(output) as writer:
+            for chunk in chunks:
+                writer.write(np.column_stack([chunk.x, chunk.values]))
+        values = load_matrix(writer.path)
+    return Waveforms(chunk.x_label, chunk.labels, values[:, 0], values[:, 1:])
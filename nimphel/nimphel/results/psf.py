@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+
+import mmap
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from nimphel.results.ocean import Waveforms
+from nimphel.storage import PathLike
+
+__all__ = ["PSFAscii", "read_psf"]
+
+_SECTIONS = {b"HEADER", b"TYPE", b"SWEEP", b"TRACE", b"VALUE", b"END"}
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[()]|[^\s()"]+')
+# Number of bytes scanned at once when indexing the lines of the values
+_CHUNK = 64 << 20
+
+
+def _unquote(token: bytes) -> str:
+    return token[1:-1].decode().replace('\\"', '"')
+
+
+def _scalar(token: bytes) -> Any:
+    if token.startswith(b'"'):
+        return _unquote(token)
+    for kind in (int, float):
+        try:
+            return kind(token)
+        except ValueError:
+            pass
+    return token.decode()
+
+
+class _Tokens:
+    "Tokens of the header sections"
+
+    def __init__(self, text: bytes):
+        self.tokens = _TOKEN.findall(text)
+        self.pos = 0
+
+    def peek(self) -> Optional[bytes]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self) -> bytes:
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of the PSF header")
+        self.pos += 1
+        return token
+
+    def props(self) -> Dict[str, Any]:
+        'Read an optional `PROP( "key" value ... )` block'
+        if self.peek() != b"PROP":
+            return {}
+        self.next()
+        if self.next() != b"(":
+            raise ValueError("Expected ( after PROP")
+        props = {}
+        while (token := self.next()) != b")":
+            props[_unquote(token)] = _scalar(self.next())
+        return props
+
+    def words(self) -> List[str]:
+        "Read unquoted words, with their parentheses, until a string or a section"
+        words = []
+        while (token := self.peek()) is not None and token not in _SECTIONS:
+            if token.startswith(b'"') or token == b"PROP":
+                break
+            words.append(self.next().decode())
+        return words
+
+
+class PSFAscii:
+    """Reader of the PSF-ASCII results written by Spectre (`spectre -format psfascii`)
+
+    The header sections (HEADER, TYPE, SWEEP and TRACE) are parsed when the file is opened.
+    The VALUE section stays in a read-only memory map: the positions of its lines are indexed
+    once, on the first access to a waveform, and then reading a signal only parses its own lines.
+
+    Results without a sweep (e.g. an operating point) have a single value per signal.
+
+    Args:
+        path: Path of the PSF-ASCII file (e.g. `psf/tran.tran`)
+
+    Attributes:
+        header: Properties of the HEADER section (simulator, analysis type...)
+        types: Type of each data type name, with its properties
+        sweep: Name of the sweep variable (e.g. `time`), or None
+        traces: Type name of each signal, in the order of the file
+
+    Raises:
+        ValueError: If the file is not a PSF-ASCII file or uses groups
+
+    Example:
+        >>> with PSFAscii("psf/tran.tran") as psf:
+        ...     current = psf.signal("I0:COL_042")
+    """
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        self._fp = open(self.path, "rb")
+        self._map = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:6] != b"HEADER":
+            self.close()
+            raise ValueError(f"{path}: not a PSF-ASCII file")
+        value = self._map.find(b"\nVALUE")
+        if value < 0:
+            self.close()
+            raise ValueError(f"{path}: no VALUE section")
+        self._values = self._map.find(b"\n", value + 1) + 1
+        self._end = self._map.rfind(b"\nEND")
+        if self._end < self._values - 1:
+            self._end = len(self._map)
+
+        self.header: Dict[str, Any] = {}
+        self.types: Dict[str, Dict[str, Any]] = {}
+        self.sweep: Optional[str] = None
+        self.traces: Dict[str, str] = {}
+        self._parse_header(_Tokens(self._map[:value]))
+        self._names = list(self.traces)
+        self._lines: Optional[np.ndarray] = None
+        self._scalars: Optional[Dict[str, Any]] = None
+
+    def _parse_header(self, tokens: _Tokens):
+        section = None
+        while (token := tokens.peek()) is not None:
+            if token in _SECTIONS:
+                section = tokens.next()
+                continue
+            name = _unquote(tokens.next())
+            if section == b"HEADER":
+                self.header[name] = _scalar(tokens.next())
+            elif section == b"TYPE":
+                kind = " ".join(tokens.words())
+                self.types[name] = {"type": kind, **tokens.props()}
+            elif section == b"SWEEP":
+                tokens.next()
+                tokens.props()
+                self.sweep = name
+            elif section == b"TRACE":
+                kind = tokens.next()
+                if kind == b"GROUP":
+                    raise ValueError(f"{self.path}: trace groups are not supported")
+                self.traces[name] = _unquote(kind)
+                tokens.props()
+            else:
+                raise ValueError(f"{self.path}: unexpected {token.decode()}")
+
+    def __len__(self) -> int:
+        "Number of points of the sweep"
+        if self.sweep is None:
+            return 1
+        return (len(self._index()) - 1) // (len(self._names) + 1)
+
+    @property
+    def names(self) -> List[str]:
+        "Name of each signal"
+        return self._names
+
+    def _index(self) -> np.ndarray:
+        "Positions of the starts of the lines of the VALUE section, and of its end"
+        if self._lines is not None:
+            return self._lines
+        data = np.frombuffer(self._map, dtype=np.uint8)
+        chunks = [np.array([self._values], dtype=np.int64)]
+        for start in range(self._values, self._end, _CHUNK):
+            stop = min(start + _CHUNK, self._end)
+            chunks.append(np.flatnonzero(data[start:stop] == ord("\n")) + start + 1)
+        del data
+        lines = np.concatenate(chunks)
+        if lines[-1] < self._end:
+            lines = np.append(lines, self._end + 1)
+        self._lines = lines
+        width = len(self._names) + 1
+        if self.sweep is not None and (len(lines) - 1) % width:
+            raise ValueError(f"{self.path}: expected {width} lines per point")
+        return lines
+
+    def _column(self, offset: int) -> np.ndarray:
+        "Values of the lines `offset`, `offset + width`... of the VALUE section"
+        lines = self._index()
+        width = len(self._names) + 1
+        starts = lines[offset:-1:width].tolist()
+        stops = lines[offset + 1 :: width].tolist()
+        # The value follows the quoted name of the signal
+        tokens = [
+            self._map[a : b - 1].rsplit(b'"', 1)[-1].strip()
+            for a, b in zip(starts, stops)
+        ]
+        if tokens and tokens[0].startswith(b"("):
+            pairs = np.array(b" ".join(tokens).translate(None, b"()").split())
+            pairs = pairs.astype(np.float64).reshape(-1, 2)
+            return pairs[:, 0] + 1j * pairs[:, 1]
+        return np.array(tokens).astype(np.float64)
+
+    def _scalar_values(self) -> Dict[str, Any]:
+        if self._scalars is None:
+            values = _Tokens(self._map[self._values : self._end])
+            self._scalars = {}
+            while values.peek() is not None:
+                name = _unquote(values.next())
+                values.next()
+                token = values.next()
+                if token == b"(":
+                    parts = [values.next(), values.next()]
+                    values.next()
+                    token = complex(float(parts[0]), float(parts[1]))
+                self._scalars[name] = (
+                    token if isinstance(token, complex) else _scalar(token)
+                )
+        return self._scalars
+
+    def sweep_values(self) -> np.ndarray:
+        """Values of the sweep variable
+
+        Raises:
+            ValueError: If the results have no sweep
+        """
+        if self.sweep is None:
+            raise ValueError(f"{self.path}: no sweep")
+        return self._column(0)
+
+    def signal(self, name: str) -> np.ndarray:
+        """Waveform of a signal
+
+        Args:
+            name: Name of the signal
+
+        Returns:
+            The value of the signal at each point of the sweep
+
+        Raises:
+            KeyError: If there is no such signal
+        """
+        if name not in self.traces:
+            raise KeyError(name)
+        if self.sweep is None:
+            return np.array([self._scalar_values()[name]])
+        return self._column(self._names.index(name) + 1)
+
+    def waveforms(self, names: Optional[Sequence[str]] = None) -> Waveforms:
+        """Waveforms of many signals
+
+        Args:
+            names: Names of the signals. Defaults to all the signals.
+
+        Returns:
+            The Waveforms, with a column per signal
+        """
+        names = list(self.traces if names is None else names)
+        columns = [self.signal(name) for name in names]
+        if self.sweep is None:
+            x = np.zeros(1)
+        else:
+            x = self.sweep_values()
+        values = np.column_stack(columns) if columns else np.empty((len(x), 0))
+        return Waveforms(self.sweep or "", tuple(names), x, values)
+
+    def close(self):
+        self._lines = None
+        self._map.close()
+        self._fp.close()
+
+    def __enter__(self) -> "PSFAscii":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_psf(path: PathLike, names: Optional[Sequence[str]] = None) -> Waveforms:
+    """Read signals of a PSF-ASCII file
+
+    Args:
+        path: Path of the PSF-ASCII file
+        names: Names of the signals. Defaults to all the signals.
+
+    Returns:
+        The Waveforms of the signals
+    """
+    with PSFAscii(path) as psf:
+        return psf.waveforms(names)
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+
+import copy
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Sequence,
+    Union,
+)
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from .core import Circuit, Columns, Directive, InstanceTable, Subcircuit
+from .readers.fast import _value
+
+__all__ = ["OperatingPoint", "DCSolver"]
+
+#: Names of the ground net
+GROUND = ("0",)
+
+# Maximum depth of nested subcircuit instances
+_MAX_DEPTH = 64
+
+
+class _Element(NamedTuple):
+    "Flattened instances of the same master"
+
+    name: str
+    labels: np.ndarray
+    nets: np.ndarray
+    params: Dict[str, np.ndarray]
+
+
+def _as_columns(instances) -> Iterator[Tuple[Columns, np.ndarray]]:
+    "Columns of instances and the names of their nets"
+    if isinstance(instances, InstanceTable):
+        nets = np.array([str(n) for n in instances.nets], dtype=object)
+        for cols in instances.columns():
+            yield cols, nets
+        return
+    for inst in instances:
+        nets = np.array([str(n) for n in inst.nodes.values()], dtype=object)
+        params = {}
+        for k, v in inst.params.items():
+            params[k] = np.empty(1, dtype=object)
+            params[k][0] = v
+        uid = -1 if inst.uid is None else inst.uid
+        yield Columns(
+            inst.name,
+            inst.cap,
+            tuple(inst.nodes),
+            np.arange(len(nets)).reshape(1, -1),
+            params,
+            np.array([uid]),
+            inst.ctx,
+        ), nets
+
+
+def _scoped(values: np.ndarray, scope: Dict[str, Any]) -> np.ndarray:
+    "Replace the names of parameters by their values"
+    if values.dtype.kind in "biuf":
+        return values
+    resolved = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values.tolist()):
+        if isinstance(v, str):
+            v = scope[v] if v in scope else _value(v)
+        resolved[i] = v
+    return resolved
+
+
+def _numbers(values: np.ndarray, what: str) -> np.ndarray:
+    try:
+        return values.astype(np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{what} must be numbers, got {values[:3].tolist()}") from None
+
+
+class _Flattener:
+    "Flatten a circuit and the instances of its subcircuits"
+
+    def __init__(self, circuit: Circuit, ground: Iterable[str]):
+        self.subckts: Dict[str, Subcircuit] = {s.name: s for s in circuit.subcircuits}
+        self.ground = {str(g) for g in ground}
+        self.elements: List[_Element] = []
+
+    def run(
+        self,
+        instances,
+        ports: Dict[str, str],
+        scope: Dict[str, Any],
+        prefix: str = "",
+        depth: int = 0,
+    ):
+        if depth > _MAX_DEPTH:
+            raise ValueError("Subcircuits are nested too deeply")
+        for cols, nets in _as_columns(instances):
+            # Local nets are renamed after the path of the subcircuit instance
+            local = np.array(
+                [
+                    n if n in self.ground else ports.get(n, prefix + n)
+                    for n in nets.tolist()
+                ],
+                dtype=object,
+            )
+            names = local[cols.nodes]
+            labels = np.array(
+                [f"{prefix}{cols.cap or 'M'}{max(u, 0)}" for u in cols.uids.tolist()],
+                dtype=object,
+            )
+            params = {k: _scoped(v, scope) for k, v in cols.params.items()}
+            subckt = self.subckts.get(cols.name)
+            if subckt is None:
+                self.elements.append(_Element(cols.name, labels, names, params))
+                continue
+            for row, label in enumerate(labels.tolist()):
+                inner = dict(zip(subckt.nodes, names[row].tolist()))
+                values = {**subckt.params, **{k: v[row] for k, v in params.items()}}
+                inner_scope = {**scope, **values}
+                self.run(subckt.instances, inner, inner_scope, label + ".", depth + 1)
+
+
+class _LowRank:
+    """Solver of `A + U·diag(d)·Uᵀ` from the factorization of `A` (Woodbury identity)
+
+    With `W = A⁻¹·U`, the solution is `x - W·(I + diag(d)·Uᵀ·W)⁻¹·diag(d)·Uᵀ·x`
+    where `x = A⁻¹·b`: a solve with the factorization and products with a few columns.
+    The update is symmetric, so the transposed system uses `W = A⁻ᵀ·U` instead.
+    """
+
+    def __init__(self, lu, U: sp.csc_matrix, d: np.ndarray, W: np.ndarray):
+        self.lu = lu
+        self.U = U
+        self.d = d
+        self.W = W
+        self.K = self._capacitance(W)
+        self._transposed: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _capacitance(self, W: np.ndarray) -> np.ndarray:
+        K = np.eye(len(self.d)) + self.d[:, None] * (self.U.T @ W)
+        cond = np.linalg.cond(K)
+        if not np.isfinite(cond) or cond > 1e15:
+            raise ValueError("The circuit has no DC solution after the changes")
+        return K
+
+    @classmethod
+    def extend(cls, lu, U: sp.csc_matrix, d: np.ndarray) -> "_LowRank":
+        "Add an update to a factorization, or to a previous update of it"
+        if not isinstance(lu, _LowRank):
+            return cls(lu, U, d, lu.solve(U.toarray()))
+        # Only the new columns need solves with the factorization
+        W = lu.lu.solve(U.toarray())
+        U = sp.hstack([lu.U, U]).tocsc()
+        return cls(lu.lu, U, np.concatenate([lu.d, d]), np.hstack([lu.W, W]))
+
+    def solve(self, rhs: np.ndarray, trans: str = "N") -> np.ndarray:
+        W, K = self.W, self.K
+        if trans == "T":
+            if self._transposed is None:
+                W = self.lu.solve(self.U.toarray(), trans="T")
+                self._transposed = (W, self._capacitance(W))
+            W, K = self._transposed
+        x = self.lu.solve(rhs, trans=trans)
+        y = (self.U.T @ x).reshape(len(self.d), -1)
+        t = np.linalg.solve(K, self.d[:, None] * y)
+        return x - (W @ t).reshape(x.shape)
+
+
+class OperatingPoint(NamedTuple):
+    """DC operating point of a circuit, for one or many source values
+
+    Attributes:
+        nets: Name of each net, ground excluded
+        sources: Name of each voltage source
+        voltages: Voltage of each net, of shape (len(nets),) or (batch, len(nets))
+        currents: Current of each source, flowing through the source from its positive
+            to its negative node, of shape (len(sources),) or (batch, len(sources))
+    """
+
+    nets: List[str]
+    sources: List[str]
+    voltages: np.ndarray
+    currents: np.ndarray
+
+    def voltage(self, net: str) -> np.ndarray:
+        "Voltage of a net"
+        return self.voltages[..., self.nets.index(net)]
+
+    def current(self, source: str) -> np.ndarray:
+        "Current of a voltage source"
+        return self.currents[..., self.sources.index(source)]
+
+
+class DCSolver:
+    """DC operating point of circuits made of resistors and voltage sources
+
+    The circuit is flattened, including the instances of its subcircuits, and its modified
+    nodal analysis (MNA) system is assembled as a sparse matrix and factored once. The
+    operating point for other source values, for instance many input vectors, only needs
+    to solve the factored system for new right-hand sides.
+
+    Parameters given by name (e.g. `dc=vin_003`) are looked up in the `parameters` directives of
+    the circuit and in the parameters of the subcircuits and of their instances.
+
+    Args:
+        circuit: Circuit of `resistor` and `vsource` instances
+        ground: Names of the nets connected to the ground
+        top: If given, only the instances of this subcircuit are simulated, with its ports as nets
+        resistor: Name of the resistor instances, with a resistance parameter `r`
+        vsource: Name of the voltage source instances, with a voltage parameter `dc`
+
+    Raises:
+        ValueError: If the circuit contains other instances or its system is singular
+            (for instance a net that is not connected to the ground)
+
+    Example:
+        >>> solver = DCSolver(circuit, ground=["0", *nets_col, *nets_col_neg], top="mnist_grid")
+        >>> op = solver.solve(load_matrix("INPUTS/inputs.npy"))
+        >>> op.currents.shape  # (number of inputs, 784)
+    """
+
+    def __init__(
+        self,
+        circuit: Circuit,
+        ground: Iterable[str] = GROUND,
+        top: Optional[str] = None,
+        resistor: str = "resistor",
+        vsource: str = "vsource",
+    ):
+        scope: Dict[str, Any] = {}
+        for d in circuit.directives:
+            if isinstance(d, Directive) and d.command == "parameters":
+                scope.update(d.args)
+        flat = _Flattener(circuit, ground)
+        if top is None:
+            flat.run(circuit.instances, {}, scope)
+        elif top in flat.subckts:
+            subckt = flat.subckts[top]
+            ports = {str(n): str(n) for n in subckt.nodes}
+            flat.run(subckt.instances, ports, {**scope, **subckt.params})
+        else:
+            raise ValueError(f"No subcircuit named {top}")
+
+        unknown = {e.name for e in flat.elements} - {resistor, vsource}
+        if unknown:
+            raise ValueError(f"Unsupported instances: {', '.join(sorted(unknown))}")
+        all_nets = [e.nets[:, :2].ravel() for e in flat.elements]
+        nets = np.concatenate(all_nets) if all_nets else np.empty(0, dtype=object)
+        names, ids = np.unique(nets.astype(str), return_inverse=True)
+        grounded = np.isin(names, list(flat.ground))
+        # Index of each net in the unknowns, -1 for the ground
+        index = np.where(grounded, -1, np.cumsum(~grounded) - 1)
+        self.nets: List[str] = names[~grounded].tolist()
+        counts = [len(e.labels) for e in flat.elements]
+        terminals = np.split(ids.reshape(-1, 2), np.cumsum(counts)[:-1])
+
+        def _join(kind, values):
+            chosen = [
+                (e, t) for e, t in zip(flat.elements, terminals) if e.name == kind
+            ]
+            if not chosen:
+                return np.empty((0, 2), dtype=np.int64), np.empty(0)
+            nodes = np.concatenate([t for _, t in chosen])
+            return nodes, np.concatenate([values(e) for e, _ in chosen])
+
+        r_ids, r = _join(resistor, lambda e: _numbers(e.params["r"], "Resistances"))
+        if np.any(r == 0):
+            raise ValueError("Resistances must not be 0")
+        dc = lambda e: e.params.get("dc", np.zeros(len(e.labels)))
+        v_ids, self.values = _join(vsource, lambda e: _numbers(dc(e), "Voltages"))
+        self.sources: List[str] = [
+            l for e in flat.elements if e.name == vsource for l in e.labels.tolist()
+        ]
+        self.resistors: List[str] = [
+            l for e in flat.elements if e.name == resistor for l in e.labels.tolist()
+        ]
+
+        n, m = len(self.nets), len(self.sources)
+        self.conductances: np.ndarray = 1.0 / r
+        self.matrix: sp.csc_matrix = self._assemble(
+            index[r_ids], self.conductances, index[v_ids], n, m
+        )
+        # Names of all the nets, ground included, and their index in the unknowns
+        self._names: List[str] = names.tolist()
+        self._index: np.ndarray = index
+        self._resistors: np.ndarray = r_ids
+        self._vsources: np.ndarray = v_ids
+        self._labels: Optional[Dict[str, int]] = None
+        self._lu = self._factor(self.matrix)
+
+    @staticmethod
+    def _factor(matrix: sp.csc_matrix):
+        try:
+            return splu(matrix)
+        except RuntimeError as e:
+            raise ValueError(f"The circuit has no DC solution: {e}") from None
+
+    @staticmethod
+    def _assemble(
+        r_nodes: np.ndarray, g: np.ndarray, v_nodes: np.ndarray, n: int, m: int
+    ) -> sp.csc_matrix:
+        "Stamp the resistors and the voltage sources into the MNA matrix"
+        a, b = r_nodes.reshape(-1, 2).T
+        rows = [a, b, a, b]
+        cols = [a, b, b, a]
+        vals = [g, g, -g, -g]
+        p, q = v_nodes.reshape(-1, 2).T
+        k = n + np.arange(m)
+        rows += [p, k, q, k]
+        cols += [k, p, k, q]
+        vals += [np.ones(m), np.ones(m), -np.ones(m), -np.ones(m)]
+        rows, cols, vals = map(np.concatenate, (rows, cols, vals))
+        # Stamps on the ground are dropped
+        keep = (rows >= 0) & (cols >= 0)
+        shape = (n + m, n + m)
+        return sp.csc_matrix((vals[keep], (rows[keep], cols[keep])), shape=shape)
+
+    def with_conductances(self, conductances: np.ndarray) -> "DCSolver":
+        """Solver of the same circuit with other conductances for its resistors
+
+        The system is assembled and factored again, the flattened circuit is reused.
+
+        Args:
+            conductances: Conductance of each resistor, in the order of `conductances`
+
+        Returns:
+            A new DCSolver
+
+        Raises:
+            ValueError: If the number of conductances differs or the system is singular
+        """
+        conductances = np.asarray(conductances, dtype=np.float64)
+        if conductances.shape != self.conductances.shape:
+            raise ValueError(
+                f"Expected {len(self.conductances)} conductances, got {conductances.shape}"
+            )
+        solver = copy.copy(self)
+        solver.conductances = conductances
+        solver.matrix = self._assemble(
+            self._index[self._resistors],
+            conductances,
+            self._index[self._vsources],
+            len(self.nets),
+            len(self.sources),
+        )
+        solver._lu = self._factor(solver.matrix)
+        return solver
+
+    def with_changes(self, changes: Dict[Union[int, str], float]) -> "DCSolver":
+        """Solver of the same circuit with a few resistors changed, without factoring it again
+
+        The factorization of the circuit is kept and the changes are applied as a low-rank
+        update of the system (Woodbury identity). Each changed resistor costs a solve with the
+        factorization, then each solve costs a few more products. Changes can be applied to a
+        solver returned by `with_changes`. For many changes, `with_conductances` is faster.
+
+        Args:
+            changes: New conductance of the changed resistors, by label (e.g. `M42` or `X1.M3`)
+                or by index in `conductances`. A conductance of 0 opens the resistor.
+
+        Returns:
+            A new DCSolver
+
+        Raises:
+            KeyError: If there is no resistor with a label
+            ValueError: If the system is singular after the changes
+
+        Example:
+            >>> faulty = solver.with_changes({"M42": 0.0, "M1337": 1 / 1e4})
+            >>> op = faulty.solve(inputs)
+        """
+        if not changes:
+            return copy.copy(self)
+        updates = dict(zip(self._resistor_index(list(changes)), changes.values()))
+        index = np.fromiter(updates, dtype=np.int64, count=len(updates))
+        values = np.fromiter(updates.values(), dtype=np.float64, count=len(updates))
+        conductances = self.conductances.copy()
+        delta = values - conductances[index]
+        conductances[index] = values
+        # Each resistor adds d·(e_a - e_b)·(e_a - e_b)ᵀ to the matrix, without the ground
+        ends = self._index[self._resistors[index]].ravel()
+        cols = np.repeat(np.arange(len(index)), 2)
+        signs = np.tile([1.0, -1.0], len(index))
+        keep = ends >= 0
+        U = sp.csc_matrix(
+            (signs[keep], (ends[keep], cols[keep])),
+            shape=(self.matrix.shape[0], len(index)),
+        )
+        solver = copy.copy(self)
+        solver.conductances = conductances
+        solver.matrix = (self.matrix + U @ sp.diags(delta) @ U.T).tocsc()
+        solver._lu = _LowRank.extend(self._lu, U, delta)
+        return solver
+
+    def _resistor_index(self, resistors: Sequence[Union[int, str]]) -> List[int]:
+        if any(isinstance(r, str) for r in resistors) and self._labels is None:
+            self._labels = {label: i for i, label in enumerate(self.resistors)}
+        return [self._labels[r] if isinstance(r, str) else int(r) for r in resistors]
+
+    def _source_values(
+        self, sources: Union[None, np.ndarray, Dict[str, Any]]
+    ) -> np.ndarray:
+        if sources is None:
+            return self.values
+        if isinstance(sources, dict):
+            columns = {self.sources.index(k): np.asarray(v) for k, v in sources.items()}
+            batch = np.broadcast_shapes(*(v.shape for v in columns.values()))
+            values = np.broadcast_to(self.values, (*batch, len(self.values))).copy()
+            for i, v in columns.items():
+                values[..., i] = v
+            return values
+        values = np.asarray(sources, dtype=np.float64)
+        if values.shape[-1] != len(self.sources):
+            raise ValueError(
+                f"Expected {len(self.sources)} source values, got {values.shape[-1]}"
+            )
+        return values
+
+    def solve(
+        self, sources: Union[None, np.ndarray, Dict[str, Any]] = None
+    ) -> OperatingPoint:
+        """Operating point for some values of the voltage sources
+
+        All the right-hand sides are solved at once with the factorization of the circuit.
+
+        Args:
+            sources: Values of the sources, in the order of `sources`: a vector, or a matrix with
+                a vector per row. A dictionary gives the values (or arrays of values) of some
+                sources by name, the others keep their value in the circuit.
+                Defaults to the values in the circuit.
+
+        Returns:
+            The OperatingPoint, with a row per vector of source values for a batch
+        """
+        values = self._source_values(sources)
+        batch = values.reshape(-1, len(self.sources))
+        n = len(self.nets)
+        rhs = np.zeros((n + len(self.sources), len(batch)))
+        rhs[n:] = batch.T
+        x = self._lu.solve(rhs).T
+        shape = values.shape[:-1]
+        return OperatingPoint(
+            self.nets,
+            self.sources,
+            x[:, :n].reshape(*shape, n),
+            x[:, n:].reshape(*shape, len(self.sources)),
+        )
+
+    def currents_into(self, op: OperatingPoint, nets: List[str]) -> np.ndarray:
+        """Currents flowing into nets from the resistors connected to them
+
+        This is the current drawn by a net connected to the ground or to a source, for
+        instance the current of a column of a crossbar whose columns are grounded.
+
+        Args:
+            op: Operating point returned by `solve`
+            nets: Names of the nets, ground nets included
+
+        Returns:
+            The current flowing into each net, of shape (len(nets),) or (batch, len(nets))
+        """
+        ends, queries = self._ends(nets)
+        C = self._currents_matrix(ends, queries, len(nets))
+        n = len(self.nets)
+        voltages = self._extended(op.voltages)
+        return (C @ voltages.reshape(-1, n + 1).T).T.reshape(
+            *op.voltages.shape[:-1], len(nets)
+        )
+
+    def sensitivities(
+        self,
+        op: OperatingPoint,
+        nets: List[str],
+        resistors: Optional[Sequence[Union[int, str]]] = None,
+    ) -> np.ndarray:
+        """Derivatives of the currents flowing into nets with respect to the resistances
+
+        The adjoint method needs a single solve with the transposed factorization per net,
+        whatever the number of resistors: with `λ = A⁻ᵀ·c`, where `c` gives the current of the
+        net as a function of the voltages, the derivative with respect to the conductance of a
+        resistor between `a` and `b` is its direct contribution minus `(λa - λb)·(Va - Vb)`.
+        The adjoint solutions do not depend on the sources, so a batch of operating points
+        costs the same solves.
+
+        Args:
+            op: Operating point returned by `solve`
+            nets: Names of the nets, ground nets included (e.g. the columns of a crossbar)
+            resistors: Labels or indices of the resistors. Defaults to all the resistors.
+
+        Returns:
+            The derivative of the current flowing into each net with respect to the resistance
+            of each resistor (in A/Ω), of shape (len(nets), len(resistors)) or
+            (batch, len(nets), len(resistors))
+
+        Example:
+            >>> op = solver.solve(inputs[0])
+            >>> dI_dR = solver.sensitivities(op, nets_col + nets_col_neg)
+        """
+        ends, queries = self._ends(nets)
+        if resistors is not None:
+            chosen = np.array(self._resistor_index(list(resistors)), dtype=np.int64)
+        else:
+            chosen = np.arange(len(self.conductances))
+        n = len(self.nets)
+        C = self._currents_matrix(ends, queries, len(nets))
+        rhs = np.zeros((self.matrix.shape[0], len(nets)))
+        rhs[:n] = C[:, :n].T.toarray()
+        adjoint = self._extended(self._lu.solve(rhs, trans="T")[:n].T)
+        voltages = self._extended(op.voltages)[..., None, :]
+
+        a, b = ends[chosen].T
+        qa, qb = queries[chosen].T
+        drop = voltages[..., a] - voltages[..., b]
+        dI_dg = -(adjoint[:, a] - adjoint[:, b]) * drop
+        # Currents of the resistors connected to the nets
+        columns = np.arange(len(chosen))
+        for q, sign in ((qb, 1.0), (qa, -1.0)):
+            on = q >= 0
+            dI_dg[..., q[on], columns[on]] += sign * drop[..., 0, on]
+        return -(self.conductances[chosen] ** 2) * dI_dg
+
+    def _ends(self, nets: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Unknown of each end of the resistors, with the ground as an extra last unknown,
+        and the index of each end in `nets`, or -1"""
+        lookup = {name: i for i, name in enumerate(self._names)}
+        query = np.full(len(self._names), -1)
+        query[[lookup[str(n)] for n in nets]] = np.arange(len(nets))
+        n = len(self.nets)
+        ends = np.where(self._index < 0, n, self._index)[self._resistors]
+        return ends, query[self._resistors]
+
+    def _currents_matrix(
+        self, ends: np.ndarray, queries: np.ndarray, count: int
+    ) -> sp.csr_matrix:
+        "Matrix of the currents flowing into nets as a function of the extended voltages"
+        a, b = ends.T
+        qa, qb = queries.T
+        g = self.conductances
+        rows = np.concatenate([qb, qb, qa, qa])
+        cols = np.concatenate([a, b, b, a])
+        vals = np.concatenate([g, -g, g, -g])
+        keep = rows >= 0
+        shape = (count, len(self.nets) + 1)
+        return sp.csr_matrix((vals[keep], (rows[keep], cols[keep])), shape)
+
+    @staticmethod
+    def _extended(voltages: np.ndarray) -> np.ndarray:
+        "Voltages with the ground as an extra last net"
+        return np.concatenate([voltages, np.zeros((*voltages.shape[:-1], 1))], axis=-1)
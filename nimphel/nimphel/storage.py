@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+
+__all__ = [
+    "save_matrix",
+    "load_matrix",
+    "read_csv",
+    "read_csv_chunks",
+    "write_csv",
+    "to_binary",
+    "to_csv",
+    "transpose_csv",
+    "MatrixWriter",
+]
+
+PathLike = Union[str, os.PathLike]
+
+# Bytes of a value converted to a Python bytes object in a list, besides its characters
+_OBJECT_SIZE = sys.getsizeof(b"") + 8
+
+
+def save_matrix(path: PathLike, matrix: np.ndarray, dtype=None) -> Path:
+    """Write a matrix to a binary `.npy` file
+
+    Args:
+        path: Filepath. The `.npy` suffix is added if missing.
+        matrix: Matrix to write
+        dtype: If given, the matrix is converted to this type (e.g. `np.float32`)
+
+    Returns:
+        The path of the written file
+
+    Example:
+        >>> save_matrix("RESISTANCES/resistances.npy", resistances)
+    """
+    path = Path(path).with_suffix(".npy")
+    np.save(path, np.asarray(matrix, dtype=dtype))
+    return path
+
+
+def read_csv(path: PathLike) -> np.ndarray:
+    """Read a CSV file containing a matrix of values
+
+    Args:
+        path: Filepath to the CSV file
+
+    Returns:
+        The matrix, with at least 2 dimensions
+    """
+    return np.loadtxt(path, delimiter=",", ndmin=2)
+
+
+def read_csv_chunks(
+    path: PathLike, rows: int, dtype=np.float64
+) -> Iterator[np.ndarray]:
+    """Read a CSV file containing a matrix of values by chunks of rows
+
+    Empty lines are skipped.
+
+    Args:
+        path: Filepath to the CSV file
+        rows: Number of rows of each chunk
+        dtype: Type of the values
+
+    Returns:
+        An iterator over the chunks, each one a matrix of at most `rows` rows
+    """
+    with open(path) as fp:
+        lines = (line for line in fp if line.strip())
+        while chunk := list(islice(lines, rows)):
+            yield np.loadtxt(chunk, delimiter=",", ndmin=2, dtype=dtype)
+
+
+def _text_chunks(path: PathLike, rows: int, dtype) -> Iterator[np.ndarray]:
+    "Like `read_csv_chunks`, but the values are kept as bytes instead of being parsed"
+    with open(path, "rb") as fp:
+        lines = (line for line in fp if line.strip())
+        while chunk := list(islice(lines, rows)):
+            yield np.array([l.rstrip(b"\r\n").split(b",") for l in chunk], dtype=dtype)
+
+
+def write_csv(path: PathLike, matrix: np.ndarray):
+    """Write a matrix to a CSV file
+
+    Values are written with `str`, so a matrix is read back identically. Zeros are written as 0.
+
+    Args:
+        path: Filepath to the CSV file
+        matrix: Matrix to write
+    """
+    with open(path, "w") as fp:
+        _write_rows(fp, np.atleast_2d(matrix))
+
+
+def _write_rows(fp, matrix: np.ndarray):
+    # Row by row, only one row of the matrix is converted to Python objects at a time
+    for row in matrix:
+        fp.write(",".join(str(j) if j else "0" for j in row.tolist()) + "\n")
+
+
+def load_matrix(
+    path: PathLike, mmap: bool = True, prefer_binary: bool = False
+) -> np.ndarray:
+    """Load a matrix from a binary `.npy` file or a CSV file
+
+    Binary files are memory mapped read-only, so loading a matrix only maps the file.
+    Any other path is read as a CSV file, unless `prefer_binary` is set.
+
+    Args:
+        path: Filepath to a `.npy` or a CSV file
+        mmap: If False, binary files are read into memory
+        prefer_binary: If True and `path` is a CSV file, the `.npy` file with the same name
+            (e.g. written by `save_matrix` next to the CSV) is loaded instead if it exists.
+
+    Returns:
+        The matrix, with at least 2 dimensions
+
+    Example:
+        >>> resistances = load_matrix("RESISTANCES/resistances.csv", prefer_binary=True)
+    """
+    path = Path(path)
+    if path.suffix != ".npy":
+        binary = path.with_suffix(".npy")
+        if not (prefer_binary and binary.exists()):
+            return read_csv(path)
+        path = binary
+    matrix = np.load(path, mmap_mode="r" if mmap else None)
+    return matrix if matrix.ndim >= 2 else matrix.reshape(1, -1)
+
+
+def to_binary(path: PathLike, output: Optional[PathLike] = None, dtype=None) -> Path:
+    """Convert a CSV file to a binary `.npy` file
+
+    Args:
+        path: Filepath to the CSV file
+        output: Filepath to the binary file. Defaults to the CSV path with a `.npy` suffix.
+        dtype: If given, the matrix is converted to this type
+
+    Returns:
+        The path of the binary file
+    """
+    return save_matrix(output or Path(path), read_csv(path), dtype)
+
+
+def to_csv(path: PathLike, output: Optional[PathLike] = None) -> Path:
+    """Convert a binary `.npy` file to a CSV file
+
+    Args:
+        path: Filepath to the binary file
+        output: Filepath to the CSV file. Defaults to the binary path with a `.csv` suffix.
+
+    Returns:
+        The path of the CSV file
+    """
+    output = Path(output or Path(path).with_suffix(".csv"))
+    write_csv(output, np.load(path, mmap_mode="r"))
+    return output
+
+
+def transpose_csv(
+    path: PathLike, output: PathLike, memory: int = 256 << 20, dtype=np.float64
+) -> Path:
+    """Transpose a CSV matrix without loading it in memory
+
+    The rows are read in chunks into a temporary memory mapped buffer, which is then written
+    transposed in blocks of columns. Each chunk and block takes about `memory` bytes, counting
+    the text and the Python objects of the values being converted, whatever the size of the
+    dataset.
+
+    A CSV output keeps the text of each value of the input (e.g. `1` stays `1`): the values are
+    buffered as bytes and are not parsed. A binary output parses them into `dtype`.
+
+    Args:
+        path: Filepath to the CSV file
+        output: Filepath to the transposed matrix. It is written as a binary file if its suffix is `.npy`.
+        memory: Memory budget of a chunk, in bytes
+        dtype: Type of the values of a binary output
+
+    Returns:
+        The path of the transposed matrix
+
+    Example:
+        >>> transpose_csv("inputs.csv", "inputs_inverted.csv", memory=64 << 20)
+    """
+    output = Path(output)
+    binary = output.suffix == ".npy"
+    n_rows, n_cols, width = 0, 0, 1
+    with open(path, "rb") as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            if not n_rows:
+                n_cols = line.count(b",") + 1
+            if not binary:
+                width = max(width, *map(len, line.rstrip(b"\r\n").split(b",")))
+            n_rows += 1
+    if not binary:
+        dtype = f"S{width}"
+    itemsize = np.dtype(dtype).itemsize
+    # Bytes of text of a value. A chunk holds the text of its lines besides the values.
+    text = os.path.getsize(path) / max(1, n_rows * n_cols)
+    if binary:
+        # The parser also makes a copy of the text
+        chunk_cost, block_cost = int(itemsize + 2 * text) + 1, itemsize
+    else:
+        # Split lines and written rows are lists of Python bytes objects
+        block_cost = itemsize + _OBJECT_SIZE
+        chunk_cost = int(block_cost + text) + 1
+    with tempfile.TemporaryDirectory(dir=output.parent) as tmp:
+        shape = (n_rows, n_cols)
+        data = np.lib.format.open_memmap(Path(tmp) / "data.npy", "w+", dtype, shape)
+        chunk = max(1, memory // max(1, n_cols * chunk_cost))
+        start = 0
+        read = read_csv_chunks if binary else _text_chunks
+        for values in read(path, chunk, dtype):
+            data[start : start + len(values)] = values
+            start += len(values)
+        block = max(1, memory // max(1, n_rows * block_cost))
+        if binary:
+            out = np.lib.format.open_memmap(output, "w+", dtype, shape[::-1])
+            for start in range(0, n_cols, block):
+                out[start : start + block] = data[:, start : start + block].T
+            out.flush()
+            del out
+        else:
+            with open(output, "wb") as fp:
+                for start in range(0, n_cols, block):
+                    columns = np.ascontiguousarray(data[:, start : start + block].T)
+                    for row in columns:
+                        fp.write(b",".join(row.tolist()) + b"\n")
+        del data
+    return output
+
+
+class MatrixWriter:
+    """Write a binary `.npy` matrix by appending rows
+
+    The number of rows does not need to be known in advance. The rows are written to a
+    temporary file and the matrix is completed when the writer is closed.
+
+    Args:
+        path: Filepath. The `.npy` suffix is added if missing.
+        dtype: Type of the values
+
+    Example:
+        >>> with MatrixWriter("inputs.npy") as writer:
+        ...     for chunk in read_csv_chunks("inputs.csv", 1024):
+        ...         writer.write(chunk)
+    """
+
+    def __init__(self, path: PathLike, dtype=np.float64):
+        self.path = Path(path).with_suffix(".npy")
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self.cols: Optional[int] = None
+        self._fp = tempfile.NamedTemporaryFile(dir=self.path.parent, delete=False)
+
+    def write(self, rows: np.ndarray):
+        """Append rows to the matrix
+
+        Args:
+            rows: Matrix of rows. All the rows must have the same number of columns.
+        """
+        rows = np.atleast_2d(np.asarray(rows, dtype=self.dtype))
+        if self.cols is None:
+            self.cols = rows.shape[1]
+        elif rows.shape[1] != self.cols:
+            raise ValueError(f"Expected {self.cols} columns, got {rows.shape[1]}")
+        self._fp.write(np.ascontiguousarray(rows).tobytes())
+        self.rows += len(rows)
+
+    def close(self) -> Path:
+        """Write the matrix
+
+        Returns:
+            The path of the matrix
+        """
+        if self._fp.closed:
+            return self.path
+        self._fp.flush()
+        self._fp.seek(0)
+        header = {
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": (self.rows, self.cols or 0),
+        }
+        try:
+            with open(self.path, "wb") as fp:
+                np.lib.format.write_array_header_1_0(fp, header)
+                shutil.copyfileobj(self._fp, fp)
+        finally:
+            self._fp.close()
+            os.remove(self._fp.name)
+        return self.path
+
+    def __enter__(self) -> "MatrixWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif not self._fp.closed:
+            # The matrix is incomplete, so it is not written
+            self._fp.close()
+            os.remove(self._fp.name)
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m nimphel.storage",
+        description="Convert matrices between CSV and binary .npy files",
+    )
+    parser.add_argument("files", nargs="+", help="Files to convert")
+    parser.add_argument(
+        "--csv", action="store_true", help="Convert .npy files back to CSV"
+    )
+    parser.add_argument(
+        "--float32", action="store_true", help="Store the values in single precision"
+    )
+    args = parser.parse_args(args)
+    for path in args.files:
+        if args.csv:
+            print(to_csv(path))
+        else:
+            print(to_binary(path, dtype=np.float32 if args.float32 else None))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 #!/usr/bin/env python
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Union
 import re
 from enum import Enum, unique
+from string import Formatter
 
-__all__ = ["missing_defaults"]
+import numpy as np
+
+__all__ = ["missing_defaults", "NetGen"]
+
+# Format specs of integers that `_format_ids` handles, e.g. "03d"
+_INT_SPEC = re.compile(r"(?:0(\d+))?d?")
 
 
 @unique
@@ -27,6 +33,31 @@ class Node(Enum):
 #     globals()[node.name] = node.value
 
 
+def _format_ids(ids: np.ndarray, prefix: str, suffix: str, width: int) -> np.ndarray:
+    """Vectorized `f"{prefix}{id:0{width}d}{suffix}"` for non-negative ids
+
+    The characters of the names are written directly into the buffer of a string array,
+    a group of ids with the same number of digits at a time.
+    """
+    head = np.frombuffer(prefix.encode("utf-32-le"), dtype=np.uint32)
+    tail = np.frombuffer(suffix.encode("utf-32-le"), dtype=np.uint32)
+    powers = 10 ** np.arange(1, 19, dtype=np.int64)
+    digits = np.maximum(np.searchsorted(powers, ids, side="right") + 1, width)
+    size = len(head) + int(digits.max(initial=1)) + len(tail)
+    names = np.empty(len(ids), dtype=f"U{size}")
+    for count in np.unique(digits).tolist():
+        rows = np.flatnonzero(digits == count)
+        chars = np.empty((len(rows), len(head) + count + len(tail)), dtype=np.uint32)
+        chars[:, : len(head)] = head
+        chars[:, len(head) + count :] = tail
+        values = ids[rows]
+        for k in range(len(head) + count - 1, len(head) - 1, -1):
+            chars[:, k] = values % 10 + ord("0")
+            values = values // 10
+        names[rows] = chars.view(f"U{chars.shape[1]}").ravel()
+    return names
+
+
 def missing_defaults(defaults: dict, data: dict) -> List[str]:
     """Check that user values meet default criteria
 
@@ -75,14 +106,39 @@ class NetGen:
         self.__step: int = step
 
     def __call__(self, step: Optional[int] = None):
-        """Generates the next net in the series
-
-        TODO: Make it behave like numpy.zeros and create nets in a given shape ?
-        """
+        """Generates the next net in the series"""
         self.__id += step or self.__step
         net = self.__pattern.format(id=self.__id)
         return net
 
+    def array(self, shape: Union[int, Tuple[int, ...]]) -> np.ndarray:
+        """Generates the next nets of the series in an array of a given shape
+
+        The result is the same as calling the generator for each element,
+        but simple patterns (e.g. "net{id}" or "n{id:04d}") are formatted without a loop.
+
+        Args:
+            shape: Shape of the array, like `numpy.zeros`
+
+        Example:
+            >>> net = NetGen("n{id}")
+            >>> net.array((2, 2)) # [["n1", "n2"], ["n3", "n4"]]
+            >>> net() # n5
+        """
+        count = int(np.prod(shape))
+        ids = self.__id + self.__step * np.arange(1, count + 1, dtype=np.int64)
+        self.__id += self.__step * count
+        fields = list(Formatter().parse(self.__pattern))
+        names = [f for f in fields if f[1] is not None]
+        spec = _INT_SPEC.fullmatch(names[0][2] or "") if len(names) == 1 else None
+        if spec and names[0][1] == "id" and not names[0][3] and ids.min(initial=0) >= 0:
+            prefix = "".join(f[0] for f in fields[: fields.index(names[0]) + 1])
+            suffix = "".join(f[0] for f in fields[fields.index(names[0]) + 1 :])
+            width = int(spec[1] or 0)
+            return _format_ids(ids, prefix, suffix, width).reshape(shape)
+        nets = [self.__pattern.format(id=i) for i in ids.tolist()]
+        return np.array(nets, dtype=str).reshape(shape)
+
     def __iter__(self):
         return self
 
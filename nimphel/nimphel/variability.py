@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import numpy as np
+
+__all__ = ["Variability"]
+
+# Each Philox counter yields 4 words of 64 bits, enough for 2 normal values
+_CELLS_PER_COUNTER = 2
+
+
+class Variability:
+    """Seeded process variability of a crossbar
+
+    Each sample is generated on demand from a counter-based generator (Philox).
+    The noise of a cell only depends on the seed, the stream, the sample and the index of the cell,
+    so samples can be generated in any order, in parallel or in chunks and are always the same.
+
+    The noise is a normal distribution clamped from below: a resistance never falls under
+    `floor`, which must be positive. With a large `sigma`, the low resistances would
+    otherwise often be negative.
+
+    Args:
+        sigma: Standard deviation of the noise added to the resistances
+        seed: Seed of the generator
+        floor: Smallest resistance of a sample
+
+    Example:
+        >>> pv = Variability(0.03 * (1e6 - 1e4), seed=42)
+        >>> sample = pv.sample(resistances, 3)
+        >>> samples = pv.samples(resistances, range(1000))
+    """
+
+    def __init__(self, sigma: float, seed: int = 0, floor: float = 1.0):
+        if floor <= 0:
+            raise ValueError(
+                f"The floor of the resistances must be positive, got {floor}"
+            )
+        self.sigma = sigma
+        self.seed = seed
+        self.floor = floor
+
+    @classmethod
+    def from_range(
+        cls, rmin: float, rmax: float, relative: float = 0.03, seed: int = 0
+    ) -> "Variability":
+        """Variability with a standard deviation relative to the range of resistances
+
+        The samples are clamped to `rmin`, the smallest resistance a cell can be programmed to.
+
+        Args:
+            rmin: Minimum resistance
+            rmax: Maximum resistance
+            relative: Standard deviation as a fraction of `rmax - rmin`
+            seed: Seed of the generator
+        """
+        return cls(relative * (rmax - rmin), seed, floor=rmin)
+
+    def normal(
+        self, sample: int, size: int, start: int = 0, stream: int = 0
+    ) -> np.ndarray:
+        """Standard normal values of the cells `start` to `start + size` of a sample
+
+        Args:
+            sample: Index of the sample
+            size: Number of cells
+            start: Index of the first cell
+            stream: Independent stream, for instance one per crossbar
+
+        Returns:
+            An array of `size` values following N(0, 1)
+        """
+        first, skip = divmod(start, _CELLS_PER_COUNTER)
+        count = -(-(skip + size) // _CELLS_PER_COUNTER)
+        counter = [first, sample, stream, 0]
+        bits = np.random.Philox(key=self.seed, counter=counter).random_raw(
+            count * 2 * _CELLS_PER_COUNTER
+        )
+        # Box-Muller transform on 53 bit uniform values
+        uniform = (bits >> np.uint64(11)) * (1.0 / (1 << 53))
+        u1, u2 = uniform[0::2], uniform[1::2]
+        values = np.sqrt(-2.0 * np.log1p(-u1)) * np.cos(2.0 * np.pi * u2)
+        return values[skip : skip + size]
+
+    def sample(
+        self, resistances: np.ndarray, sample: int, stream: int = 0
+    ) -> np.ndarray:
+        """Resistances of a crossbar for a process variability sample
+
+        Cells without resistor (resistance of 0) are kept to 0, the other cells are clamped
+        to `floor`.
+
+        Args:
+            resistances: Nominal resistances of the crossbar
+            sample: Index of the sample
+            stream: Independent stream, for instance one per crossbar
+
+        Returns:
+            The perturbed resistances
+        """
+        resistances = np.asarray(resistances, dtype=np.float64)
+        noise = self.normal(sample, resistances.size, stream=stream)
+        noise = noise.reshape(resistances.shape)
+        noisy = np.maximum(resistances + self.sigma * noise, self.floor)
+        return np.where(resistances > 0, noisy, 0.0)
+
+    def samples(
+        self,
+        resistances: np.ndarray,
+        samples: Iterable[int],
+        stream: int = 0,
+        workers: Optional[int] = None,
+    ) -> np.ndarray:
+        """Resistances of a crossbar for many process variability samples
+
+        Args:
+            resistances: Nominal resistances of the crossbar
+            samples: Indices of the samples
+            stream: Independent stream, for instance one per crossbar
+            workers: Number of threads. Defaults to the executor's default.
+
+        Returns:
+            An array with the perturbed resistances of each sample along the first axis
+        """
+        resistances = np.asarray(resistances, dtype=np.float64)
+        samples = list(samples)
+        out = np.empty((len(samples), *resistances.shape))
+
+        def fill(i):
+            out[i] = self.sample(resistances, samples[i], stream)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(fill, range(len(samples))))
+        return out
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 
-from typing import Union, IO, TypeAlias
+from typing import Union, IO, List, Dict, Any, Iterable, Iterator, Optional, TypeAlias
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 from nimphel.core import Element, Model, Directive, Instance, Subcircuit, Circuit
+from nimphel.core import Analysis, AlterGroup, ParamSet, Sweep
+from nimphel.core import InstanceBatch, InstanceTable, Columns
+
+from os import PathLike
+from itertools import chain
+from pathlib import Path
 
 """
 Jinja2 Could be used to create template partials for the netlists
@@ -26,6 +34,78 @@ https://github.com/python/cpython/blob/3.12/Lib/json/encoder.py
 """
 
 
+#: Scale factors of the Spectre language
+SPECTRE_SCALE: Dict[int, str] = {
+    12: "T", 9: "G", 6: "M", 3: "k", 0: "",
+    -3: "m", -6: "u", -9: "n", -12: "p", -15: "f", -18: "a",
+}  # fmt: skip
+
+#: Scale factors of SPICE, where `m` means milli and `meg` means mega
+SPICE_SCALE: Dict[int, str] = {
+    12: "t", 9: "g", 6: "meg", 3: "k", 0: "",
+    -3: "m", -6: "u", -9: "n", -12: "p", -15: "f",
+}  # fmt: skip
+
+
+def fmt_values(
+    values: Any,
+    precision: Optional[int] = None,
+    engineering: bool = False,
+    scale: Dict[int, str] = SPECTRE_SCALE,
+) -> List[str]:
+    """Format a column of values in a single pass
+
+    By default, the values are formatted exactly as `str` would do.
+    Floating point values can be rounded to a number of significant digits and numeric values
+    can be written in engineering notation, using the scale factors of the simulator.
+
+    Args:
+        values: Array or list of values to format
+        precision: Number of significant digits. If None, floats keep all their digits.
+        engineering: If True, numeric values are written with a scale factor (e.g. `10k`, `1.2M`).
+        scale: Dictionary containing the exponents and their scale factors.
+
+    Returns:
+        The list of formatted values
+
+    Example:
+        >>> fmt_values([1e4, 1.2e6, 998928.0325], precision=3, engineering=True)
+        >>> # ['10k', '1.2M', '999k']
+        >>> fmt_values([998928.0325], precision=3) # ['9.99e+05']
+    """
+    values = np.asarray(values)
+    kind = values.dtype.kind
+    if (precision is None and not engineering) or kind not in "iuf":
+        if kind == "f" and values.dtype != np.float64:
+            # tolist converts float32 to float, whose repr has more digits
+            return list(map(str, values.ravel()))
+        return list(map(str, values.tolist()))
+    if not engineering:
+        if kind != "f":
+            return list(map(str, values.tolist()))
+        return np.char.mod(f"%.{precision}g", values).tolist()
+
+    digits = min(precision or 15, 15)
+    # Round first so that the mantissa never rounds up to the next scale factor
+    rounded = np.char.mod(f"%.{digits - 1}e", values.astype(np.float64)).astype(float)
+    exps = np.array(sorted(scale), dtype=int)
+    exp = np.zeros(rounded.shape, dtype=int)
+    nonzero = np.isfinite(rounded) & (rounded != 0)
+    exp[nonzero] = np.floor(np.log10(np.abs(rounded[nonzero])) / 3).astype(int) * 3
+    exp = np.clip(exp, exps[0], exps[-1])
+    mantissa = np.char.mod(f"%.{max(digits, 3)}g", rounded / 10.0**exp)
+    suffixes = np.array([scale[e] for e in exps])
+    return np.char.add(mantissa, suffixes[np.searchsorted(exps, exp)]).tolist()
+
+
+def join_lines(lines: Iterable[str], sep: str = "\n") -> Iterator[str]:
+    "Lazy version of `sep.join(lines)`"
+    for i, line in enumerate(lines):
+        if i:
+            yield sep
+        yield line
+
+
 class BaseWriter(ABC):
     "Basic Interface for an Element Writer"
 
@@ -52,47 +132,292 @@ class Writer(BaseWriter):
             fmt_fn = self.__default__
         return fmt_fn(elem, *args, **kwargs)
 
+    def _iterwrite(self, elem: Element, *args, **kwargs) -> Iterator[Union[str, bytes]]:
+        fn_name = "iter_" + str(type(elem).__name__).lower()
+        try:
+            fmt_fn = getattr(self, fn_name)
+        except AttributeError:
+            yield self._write(elem, *args, **kwargs)
+            return
+        yield from fmt_fn(elem, *args, **kwargs)
+
     def dump(self, elem: Element, *args, **kwargs) -> Union[str, bytes]:
         return super().dump(elem, *args, **kwargs)
 
-    def dump_to_file(self, elem: Element, fp: IO, *args, **kwargs):
-        super().dump_to_file(elem, fp, *args, **kwargs)
+    def iterdump(self, elem: Element, *args, **kwargs) -> Iterator[Union[str, bytes]]:
+        """Format an element piece by piece
+
+        Joining the pieces gives the same result as `dump`. To stream the format of an element,
+        the writer needs to implement a generator method named `iter_` followed by the name of the element.
+        Otherwise, the whole element is formatted at once.
+        """
+        yield from self._iterwrite(elem, *args, **kwargs)
+
+    def dump_to_file(
+        self, elem: Element, fp: IO, *args, buffer_size: int = 1 << 16, **kwargs
+    ):
+        """Write an element to a file
+
+        The pieces generated by `iterdump` are written as soon as `buffer_size` characters are buffered,
+        so the whole element is never held in memory.
+
+        Args:
+            elem: The element to write
+            fp: The file object
+            buffer_size: Number of characters written at once
+        """
+        buffer, size = [], 0
+        for piece in self.iterdump(elem, *args, **kwargs):
+            buffer.append(piece)
+            size += len(piece)
+            if size >= buffer_size:
+                fp.write(buffer[0][:0].join(buffer))
+                buffer, size = [], 0
+        if buffer:
+            fp.write(buffer[0][:0].join(buffer))
 
 
 class SpectreWriter(Writer):
-    "Writer for Spectre format"
+    """Writer for Spectre format
+
+    Args:
+        precision: Number of significant digits of floating point parameters.
+            If None, parameters are written with all their digits.
+        engineering: If True, numeric parameters are written with Spectre scale factors (e.g. `10k`).
+    """
+
+    #: Number of instances of an InstanceTable formatted at once
+    chunk_size: int = 8192
+
+    def __init__(self, precision: Optional[int] = None, engineering: bool = False):
+        self.precision: Optional[int] = precision
+        self.engineering: bool = engineering
 
+    @staticmethod
     def fmt_params(p) -> str:
-        return " ".join([f"{k}={v}" if v else str(k) for k, v in p.items()])
+        "Format parameters with the default writer, a value of None gives the bare name"
+        return SpectreWriter()._fmt_params(p)
+
+    def _fmt_value(self, v: Any) -> str:
+        if isinstance(v, (list, tuple, np.ndarray)):
+            return f"[{' '.join(self._fmt_values(v))}]"
+        if self.precision is None and not self.engineering:
+            # str, not format, keeps the shortest repr of float32 scalars
+            return str(v)
+        return self._fmt_values([v])[0]
+
+    def _fmt_params(self, p) -> str:
+        "Format parameters with the precision of the writer"
+        return " ".join(
+            str(k) if v is None else f"{k}={self._fmt_value(v)}" for k, v in p.items()
+        )
+
+    def _fmt_values(self, values: Any) -> List[str]:
+        return fmt_values(values, self.precision, self.engineering, SPECTRE_SCALE)
 
     def directive(self, d: Directive, *args, **kwargs) -> str:
         if d.is_raw or not d.args:
             return d.command
-        return f"{d.command} {SpectreWriter.fmt_params(d.args)}"
+        return f"{d.command} {self._fmt_params(d.args)}"
+
+    def analysis(self, a: Analysis, *args, **kwargs) -> str:
+        if not a.args:
+            return f"{a.name} {a.command}"
+        return f"{a.name} {a.command} {self._fmt_params(a.args)}"
+
+    def altergroup(self, a: AlterGroup, *args, **kwargs) -> str:
+        return f"{a.name} altergroup {{\nparameters {self._fmt_params(a.args)}\n}}"
+
+    def iter_paramset(self, p: ParamSet, *args, **kwargs) -> Iterator[str]:
+        "Format a ParamSet row by row"
+        columns = [self._fmt_values(v) for v in p.args.values()]
+        lines = [
+            [f"{p.name} paramset {{", " ".join(str(k) for k in p.args)],
+            map(" ".join, zip(*columns)),
+            ["}"],
+        ]
+        yield from join_lines(l for group in lines for l in group)
+
+    def paramset(self, p: ParamSet, *args, **kwargs) -> str:
+        return "".join(self.iter_paramset(p))
+
+    def sweep(self, s: Sweep, *args, **kwargs) -> str:
+        params = f" {self._fmt_params(s.args)}" if s.args else ""
+        body = "\n".join(map(self._write, s.body))
+        return f"{s.name} sweep{params} {{\n{body}\n}}"
 
     def model(self, m: Model, *args, **kwargs) -> str:
-        return f"model {m.name} {m.base} ({SpectreWriter.fmt_params(m.params)})"
+        return f"model {m.name} {m.base} ({self._fmt_params(m.params)})"
 
     def instance(self, inst: Instance, *args, **kwargs) -> str:
         nodes = " ".join(str(v) for v in inst.nodes.values())
         uid = inst.uid or 0
         fmt = f"{inst.cap or 'M'}{uid} ({nodes}) {inst.name}"
         if inst.params:
-            return f"{fmt} {SpectreWriter.fmt_params(inst.params)}"
+            return f"{fmt} {self._fmt_params(inst.params)}"
         return fmt
 
-    def subcircuit(self, subckt: Subcircuit, *args, **kwargs) -> str:
+    def instancebatch(self, batch: InstanceBatch, *args, **kwargs) -> str:
+        return "\n".join(self.instance(i) for i in batch)
+
+    def _fmt_column(self, key: str, column: np.ndarray) -> List[str]:
+        "Format a parameter of all the instances of a column"
+        texts = self._fmt_values(column)
+        prefix, key = f"{key}=", str(key)
+        if column.dtype.kind != "O":
+            return [prefix + t for t in texts]
+        return [
+            key if v is None else prefix + t for t, v in zip(texts, column.tolist())
+        ]
+
+    def columns(self, cols: Columns, nets: List[str], *args, **kwargs) -> str:
+        """Format consecutive instances of an InstanceTable
+
+        The output is the same as formatting each instance with `instance`,
+        but no Instance objects are created.
+        """
+        if not isinstance(nets, np.ndarray):
+            nets = np.array(nets, dtype=object)
+        escape = lambda x: str(x).replace("{", "{{").replace("}", "}}")
+        nodes = " ".join(["{}"] * len(cols.node_names))
+        params = " {}" * len(cols.params)
+        template = (
+            f"{escape(cols.cap or 'M')}{{}} ({nodes}) {escape(cols.name)}{params}"
+        )
+
+        uids = np.maximum(cols.uids, 0).tolist()
+        node_cols = [nets[ids].tolist() for ids in cols.nodes.T]
+        param_cols = [self._fmt_column(k, v) for k, v in cols.params.items()]
+        return "\n".join(map(template.format, uids, *node_cols, *param_cols))
+
+    def iter_instancetable(
+        self, table: InstanceTable, *args, **kwargs
+    ) -> Iterator[str]:
+        "Format an InstanceTable in chunks of `chunk_size` instances"
+        nets = np.array([str(n) for n in table.nets], dtype=object)
+        chunks = (
+            self.columns(chunk, nets)
+            for cols in table.columns()
+            for chunk in cols.chunks(self.chunk_size)
+        )
+        yield from join_lines(chunks)
+
+    def instancetable(self, table: InstanceTable, *args, **kwargs) -> str:
+        return "".join(self.iter_instancetable(table))
+
+    def iter_subcircuit(self, subckt: Subcircuit, *args, **kwargs) -> Iterator[str]:
+        "Format a Subcircuit line by line"
         nodes = " ".join(str(v) for v in subckt.nodes.keys())
-        header = f"subckt {subckt.name} {nodes}\n"
+        header = [f"subckt {subckt.name} {nodes}"]
         if subckt.params:
-            params = SpectreWriter.fmt_params(subckt.params)
-            header = f"{header}parameters {params}\n"
-        instances = "\n".join(self.instance(i) for i in subckt.instances)
-        return f"{header}{instances}\nends {subckt.name}"
+            header.append(f"parameters {self._fmt_params(subckt.params)}")
+        if not subckt.instances:
+            header.append("")
+        if isinstance(subckt.instances, InstanceTable):
+            instances = (
+                [self.instancetable(subckt.instances)] if subckt.instances else []
+            )
+        else:
+            instances = map(self.instance, subckt.instances)
+        yield from join_lines([*header, *instances, f"ends {subckt.name}"])
+
+    def subcircuit(self, subckt: Subcircuit, *args, **kwargs) -> str:
+        return "".join(self.iter_subcircuit(subckt))
+
+    def iter_circuit(self, ckt: Circuit, *args, **kwargs) -> Iterator[str]:
+        """Format a Circuit piece by piece
+
+        Directives are written first, followed by the subcircuits and the instances.
+        """
+        if ckt.columnar:
+            instances = [ckt.instances] if len(ckt.instances) else []
+        else:
+            instances = ckt.instances
+        elements = [*ckt.directives, *ckt.subcircuits]
+        for i, elem in enumerate(chain(elements, instances)):
+            if i:
+                yield "\n"
+            yield from self._iterwrite(elem)
 
     def circuit(self, ckt: Circuit, *args, **kwargs) -> str:
-        instances = "\n".join(map(self._write, ckt.instances))
-        subcircuits = "\n".join(map(self._write, ckt.subcircuits))
-        directives = "\n".join(map(self._write, ckt.directives))
-        lists = [directives, subcircuits, instances]
-        return "\n".join([l for l in lists if l])
+        return "".join(self.iter_circuit(ckt))
+
+
+class Template:
+    """Netlist whose invariant part is formatted only once
+
+    Many netlists often share most of their content (e.g. a crossbar array)
+    and only differ in a few instances (e.g. the input sources).
+    A template formats the shared body once. The body is then either copied into every netlist,
+    or written once to an include file that every netlist references.
+
+    Args:
+        writer: The Writer used to format the elements
+        body: The element shared by all netlists
+        include: Path of the include file. If None, the body is copied into every netlist.
+        reference: Path written in the include statement. Defaults to `include`.
+
+    Example:
+        >>> template = Template(SpectreWriter(), crossbar, include="crossbar.scs")
+        >>> template.write_include()
+        >>> with open("netlist", "w+") as fp:
+        >>>     template.dump_to_file(fp, head=sources, tail=Directive("ends grid"))
+    """
+
+    def __init__(
+        self,
+        writer: Writer,
+        body: Element,
+        include: Optional[PathLike] = None,
+        reference: Optional[str] = None,
+    ):
+        self.writer: Writer = writer
+        self.body: Element = body
+        self.include: Optional[Path] = Path(include) if include else None
+        self.reference: Optional[str] = reference or (include and str(include))
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        "The formatted body, cached after the first access"
+        if self._text is None:
+            self._text = self.writer.dump(self.body)
+        return self._text
+
+    def write_include(self):
+        "Write the body to the include file"
+        if self.include is None:
+            raise ValueError("The template does not have an include file")
+        with open(self.include, "w+") as fp:
+            fp.write(self.text)
+
+    def _body(self) -> str:
+        if self.include is None:
+            return self.text
+        return self.writer.dump(Directive(f'include "{self.reference}"'))
+
+    def dump_to_file(
+        self, fp: IO, head: Optional[Element] = None, tail: Optional[Element] = None
+    ):
+        """Write a netlist made of the head, the body and the tail
+
+        Args:
+            fp: The file object
+            head: Element written before the body
+            tail: Element written after the body
+        """
+        if head is not None:
+            self.writer.dump_to_file(head, fp)
+            fp.write("\n")
+        fp.write(self._body())
+        if tail is not None:
+            fp.write("\n")
+            self.writer.dump_to_file(tail, fp)
+
+    def dump(
+        self, head: Optional[Element] = None, tail: Optional[Element] = None
+    ) -> str:
+        "Format a netlist made of the head, the body and the tail"
+        head = None if head is None else self.writer.dump(head)
+        tail = None if tail is None else self.writer.dump(tail)
+        return "\n".join(p for p in [head, self._body(), tail] if p is not None)
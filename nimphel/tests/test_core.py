@@ -3,6 +3,8 @@
 import unittest
 import json
 
+import numpy as np
+
 from nimphel.core import *
 
 
@@ -79,6 +81,24 @@ class TestComponent(unittest.TestCase):
         R.new(["P", "N"])
         R.new(dict(P="P", N="N"))
 
+    def test_new_many(self):
+        R = Component("Res", ["P", "N"], {"R": None})
+        batch = R.new_many([["A", "B", "C"], 0], {"R": np.array([1.0, 2.0, 3.0])})
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(
+            list(batch),
+            [
+                R.new(["A", 0], {"R": 1.0}),
+                R.new(["B", 0], {"R": 2.0}),
+                R.new(["C", 0], {"R": 3.0}),
+            ],
+        )
+
+        with self.assertRaises(ValueError):
+            R.new_many([["A", "B"], 0])
+        with self.assertRaises(ValueError):
+            R.new_many([["A", "B"], [0]], {"R": 1.0})
+
     def test_dict(self):
         R = Component("Res", {"P": 1, "N": 0}, {"R": 1e3})
         as_json = '{"name": "Res", "nodes": {"P": 1, "N": 0}, "params": {"R": 1000.0}, "cap": null}'
@@ -114,3 +134,144 @@ class TestCircuit(unittest.TestCase):
         # The instance uid in the circuit has been updated
         # So technically the instance is not in the circuit
         self.assertFalse(inst in C)
+
+    def test_add_no_copy(self):
+        C = Circuit()
+        inst = Instance("Inv", {"P": "P", "N": "N", "GND": 0, "VDD": 1}, {})
+        C.add(inst, copy=False)
+        self.assertIs(C.instances[0], inst)
+        self.assertEqual(inst.uid, 1)
+        self.assertTrue(inst.is_owned)
+
+        # Owned instances are copied, so the first one is not modified
+        C.add(inst, copy=False)
+        self.assertIsNot(C.instances[1], inst)
+        self.assertEqual([i.uid for i in C.instances], [1, 2])
+        self.assertFalse(inst.copy().is_owned)
+
+    def test_subcircuit_add_no_copy(self):
+        S = Subcircuit("Inv", ["P", "N"])
+        inst = Instance("nmos", {"D": "P", "S": "N"})
+        S.add(inst, copy=False)
+        S += inst
+        self.assertIs(S.instances[0], inst)
+        self.assertEqual(inst.ctx, "Inv")
+        self.assertEqual([i.uid for i in S.instances], [1, 2])
+
+
+class TestInstanceTable(unittest.TestCase):
+    def test_append(self):
+        table = InstanceTable()
+        R = Component("res", ["P", "N"], {"R": 1e3})
+        table.append(R.new(["IN", 0], {"R": 1e3}), uid=1)
+        table.append(R.new(["IN", "OUT"], {"R": 20}), uid=2)
+        table.append(Instance("cap", {"P": "OUT", "N": 0}, {"C": 1e-9}), uid=1)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.nets, ["IN", 0, "OUT"])
+
+        insts = list(table)
+        self.assertEqual(
+            insts[0], Instance("res", {"P": "IN", "N": 0}, {"R": 1e3}, uid=1)
+        )
+        # Mixed types are kept as they were given
+        self.assertIsInstance(insts[1].params["R"], int)
+        self.assertEqual(insts[2].name, "cap")
+
+    def test_extend(self):
+        table = InstanceTable()
+        table.extend(
+            "res",
+            {"P": ["IN", "IN"], "N": ["A", "B"]},
+            {"R": np.array([1.0, 2.0])},
+            uids=[1, 2],
+        )
+        cols = list(table.columns())
+        self.assertEqual(len(cols), 1)
+        self.assertEqual(cols[0].nodes.tolist(), [[0, 1], [0, 2]])
+        self.assertEqual([i.params["R"] for i in table], [1.0, 2.0])
+
+    def test_extend_mixed_nodes(self):
+        table = InstanceTable()
+        nodes = np.array(["IN", 0, "IN"], dtype=object)
+        table.extend("res", {"P": nodes, "N": np.array(["A", "B", "A"])})
+        self.assertEqual(table.nets, ["IN", 0, "A", "B"])
+        self.assertEqual([i.nodes["P"] for i in table], ["IN", 0, "IN"])
+        # Lists of mixed types are not converted to strings
+        self.assertEqual(table.net_ids([0, "B"]).tolist(), [1, 3])
+        table.extend("res", {"P": ["C", "C"], "N": [0, "B"]})
+        self.assertEqual(table.nets, ["IN", 0, "A", "B", "C"])
+        R = Component("res", ["P", "N"])
+        C = Circuit(columnar=True)
+        C.add(R.new({"P": "A", "N": 0}))
+        C.add(R.new_many({"P": ["A", "B"], "N": [0, "B"]}))
+        self.assertEqual(C.instances.nets, ["A", 0, "B"])
+
+    def test_extend_internal_nets(self):
+        table = InstanceTable()
+        table.extend("res", {"P": ["IN"], "N": ["A"]})
+        nets = np.array(["A", 0, "n1", "n2"], dtype=object)
+        nodes = {"P": np.array([2, 3]), "N": np.array([0, 1])}
+        table.extend("res", nodes, nets=nets, internal=2)
+        self.assertEqual(table.nets, ["IN", "A", 0, "n1", "n2"])
+        self.assertEqual([i.nodes["P"] for i in table], ["IN", "n1", "n2"])
+        # The internal nets are indexed when other nets are looked up
+        self.assertEqual(table.net_id("n2"), 4)
+        self.assertEqual(table.net_id("B"), 5)
+
+    def test_runs(self):
+        "The order of the instances is preserved"
+        table = InstanceTable()
+        R = Component("res", ["P", "N"])
+        V = Component("vsource", ["P", "N"], cap="V")
+        for inst in [R.new([1, 0]), V.new([1, 0]), R.new([2, 0])]:
+            table.append(inst)
+        self.assertEqual([i.name for i in table], ["res", "vsource", "res"])
+        self.assertEqual(table.runs, [[0, 0, 1], [1, 0, 1], [0, 1, 2]])
+
+
+class TestInstanceBatch(unittest.TestCase):
+    def test_add(self):
+        R = Component("res", ["P", "N"])
+        for C in [Circuit(), Circuit(columnar=True)]:
+            C.add(R.new([1, 0]))
+            C.add(R.new_many([[1, 2, 3], 0], {"r": [1.0, 2.0, 3.0]}))
+            self.assertEqual([i.uid for i in C.instances], [1, 2, 3, 4])
+            self.assertEqual(list(C.instances)[-1].params, {"r": 3.0})
+
+        batch = InstanceBatch("res", {"P": np.array([0, 1]), "N": np.array([2, 2])})
+        batch.nets = np.array([1, "n1", 0], dtype=object)
+        batch.internal = 1
+        for C in [Circuit(), Circuit(columnar=True)]:
+            C.add(batch)
+            self.assertEqual([i.nodes["P"] for i in C.instances], [1, "n1"])
+
+        S = Subcircuit("array", ["P"])
+        S.add(R.new_many([[1, 2], 0]))
+        self.assertEqual(
+            [(i.uid, i.ctx) for i in S.instances], [(1, "array"), (2, "array")]
+        )
+
+
+class TestColumnarCircuit(unittest.TestCase):
+    def test_add(self):
+        C = Circuit(columnar=True)
+        R = Component("res", ["P", "N"], {"R": 1e3})
+        C.add(R.new(["IN", "OUT"], {"R": 1e3}))
+        C.add([R.new(["IN", "OUT"], {"R": 2e3}), Directive("global 0")])
+        self.assertTrue(C.columnar)
+        self.assertEqual([i.uid for i in C.instances], [1, 2])
+        self.assertEqual(len(C.directives), 1)
+        self.assertTrue(
+            Instance("res", {"P": "IN", "N": "OUT"}, {"R": 2e3}, uid=2) in C
+        )
+
+
+class TestAnalysis(unittest.TestCase):
+    def test_init(self):
+        a = Analysis("tran1", "tran", stop="10m")
+        self.assertEqual(a, Analysis("tran1", "tran", {"stop": "10m"}))
+        self.assertNotEqual(a, Analysis("tran2", "tran", {"stop": "10m"}))
+        self.assertNotEqual(Analysis("op", "dc"), Directive("dc"))
+        self.assertEqual(
+            dict(a), {"command": "tran", "args": {"stop": "10m"}, "name": "tran1"}
+        )
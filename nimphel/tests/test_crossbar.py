@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import numpy as np
+
+from nimphel.core import *
+from nimphel.crossbar import *
+from nimphel.readers import FastSpectreReader
+from nimphel.solver import DCSolver
+from nimphel.utils import NetGen
+from nimphel.writers import SpectreWriter
+
+Mem = Component("resistor", ["P", "N"], {})
+Vsource = Component("vsource", ["VDD", "GND"], {"type": "dc"}, cap="V")
+
+
+class TestIdealCrossbar(unittest.TestCase):
+    def setUp(self):
+        self.positive = np.array([[1e3, 0.0], [2e3, 4e3], [0.0, 5e3]])
+        self.negative = np.array([[0.0, 1e4], [0.0, 0.0], [2e4, 0.0]])
+        self.rows = ["IN_0", "IN_1", "IN_2"]
+        self.circuit = Circuit(columnar=True)
+        for matrix, cols in (
+            (self.positive, ["COL_0", "COL_1"]),
+            (self.negative, ["COLN_0", "COLN_1"]),
+        ):
+            i, j = np.nonzero(matrix)
+            nodes = dict(P=np.array(self.rows)[i], N=np.array(cols)[j])
+            self.circuit.add(Mem.new_many(nodes, {"r": matrix[i, j]}))
+
+    def test_currents(self):
+        xbar = IdealCrossbar.from_resistances(self.positive, self.negative)
+        v = np.array([1.0, -2.0, 0.5])
+        expected = [1 / 1e3 - 2 / 2e3, -2 / 4e3 + 0.5 / 5e3, 0.5 / 2e4, 1 / 1e4]
+        np.testing.assert_allclose(xbar.currents(v), expected)
+        batch = np.vstack([v, 2 * v, np.zeros(3)])
+        currents = xbar.currents(batch)
+        self.assertEqual(currents.shape, (3, 4))
+        np.testing.assert_allclose(currents[1], 2 * np.array(expected))
+        positive, negative = xbar.split(currents)
+        np.testing.assert_allclose(xbar.differential(batch), positive - negative)
+        with self.assertRaises(ValueError):
+            xbar.currents(np.ones(4))
+
+    def test_from_circuit(self):
+        xbar = IdealCrossbar.from_circuit(
+            self.circuit, self.rows, [["COL_0", "COL_1"], ["COLN_0", "COLN_1"]]
+        )
+        expected = IdealCrossbar.from_resistances(self.positive, self.negative)
+        np.testing.assert_allclose(xbar.conductances, expected.conductances)
+        # Same crossbar read back from a netlist, in a subcircuit and with a list of instances
+        netlist = "subckt grid\n" + SpectreWriter().dump(self.circuit) + "\nends grid\n"
+        circuit = FastSpectreReader([Mem], columnar=False).reads(netlist)
+        G = conductance_matrix(circuit, self.rows, ["COL_0", "COL_1"])
+        np.testing.assert_allclose(G, expected.conductances[:, :2])
+
+    def test_conductance_matrix(self):
+        circuit = Circuit()
+        circuit.add(Mem.new(["B", "A"], {"r": 2.0}))
+        circuit.add(Mem.new(["A", "B"], {"r": 2.0}))
+        circuit.add(Mem.new(["A", "C"], {"r": 1.0}))
+        np.testing.assert_allclose(conductance_matrix(circuit, ["A"], ["B"]), [[1.0]])
+
+
+class TestBuildCrossbar(unittest.TestCase):
+    def setUp(self):
+        self.G = np.array([[1e-3, 0.0, 2e-3], [5e-4, 1e-3, 0.0]])
+        self.rows, self.cols = ["IN_0", "IN_1"], ["COL_0", "COL_1", "COL_2"]
+        self.v = np.array([1.0, 0.5])
+
+    def currents(self, batch):
+        "Currents flowing into the columns held at 0V"
+        circuit = Circuit(columnar=True)
+        circuit.add(Vsource.new_many(dict(VDD=self.rows, GND=0), {"dc": self.v}))
+        circuit.add(Vsource.new_many(dict(VDD=self.cols, GND=0), {"dc": 0.0}))
+        circuit.add(batch)
+        op = DCSolver(circuit).solve()
+        return np.array([op.current(f"V{i + 3}") for i in range(3)])
+
+    def test_ideal(self):
+        batch = build_crossbar(self.G, self.rows, self.cols)
+        self.assertEqual(len(batch), 4)
+        self.assertEqual(batch.internal, 0)
+        expected = IdealCrossbar([self.G]).currents(self.v)
+        np.testing.assert_allclose(self.currents(batch), expected, atol=1e-15)
+
+    def test_wires(self):
+        batch = build_crossbar(
+            self.G, self.rows, self.cols, row_wire=10.0, col_wire=[[5.0], [20.0]]
+        )
+        self.assertEqual(len(batch), 4 + 6 + 6)
+        self.assertEqual(batch.internal, 12)
+        first = next(iter(batch))
+        self.assertEqual(first.nodes, {"P": "IN_0_COL_0", "N": "COL_0_IN_0"})
+        segments = list(batch)[4:]
+        self.assertEqual(segments[0].nodes, {"P": "IN_0", "N": "IN_0_COL_0"})
+        self.assertEqual(segments[5].nodes, {"P": "IN_1_COL_1", "N": "IN_1_COL_2"})
+        self.assertEqual(segments[-1].nodes, {"P": "COL_2_IN_1", "N": "COL_2"})
+        self.assertEqual(segments[-1].params, {"r": 20.0})
+        currents = self.currents(batch)
+        ideal = IdealCrossbar([self.G]).currents(self.v)
+        self.assertTrue(np.all(currents < ideal))
+        # Crossbars driven by the same rows don't share nets
+        other = build_crossbar(self.G, self.rows, ["N_0", "N_1", "N_2"], 10.0, 10.0)
+        internal = lambda b: set(b.nets[-b.internal :].tolist())
+        self.assertFalse(internal(batch) & internal(other))
+        # Tiny wires are ideal
+        tiny = build_crossbar(self.G, self.rows, self.cols, 1e-9, 1e-9)
+        np.testing.assert_allclose(self.currents(tiny), ideal, rtol=1e-9)
+
+    def test_single_cell(self):
+        batch = build_crossbar([[1e-3]], ["IN"], ["COL"], 100.0, 400.0, NetGen("x{id}"))
+        circuit = Circuit()
+        circuit.add(
+            [Vsource.new(["IN", 0], {"dc": 1.5}), Vsource.new(["COL", 0], {"dc": 0.0})]
+        )
+        circuit.add(batch)
+        op = DCSolver(circuit).solve()
+        self.assertAlmostEqual(op.current("V2"), 1.5 / 1500)
+        self.assertEqual(sorted(circuit.instances[3].nodes.values()), ["IN", "x1"])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            build_crossbar(self.G, self.rows, self.cols[:2])
+        with self.assertRaises(ValueError):
+            build_crossbar(self.G, self.rows, self.cols, row_wire=0.0)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from nimphel.mapping import *
+from nimphel.storage import load_matrix, write_csv
+
+
+class TestMapping(unittest.TestCase):
+    def test_weight_to_resistance(self):
+        weights = np.array([[1.0, 0.5], [-1.0, 0.0]])
+        res = weight_to_resistance(weights, 1e4, 1e6)
+        np.testing.assert_allclose(res, [[1e4, 5.05e5], [-1e4, -1e6]])
+
+    def test_map_weights(self):
+        weights = np.array([[2.0, -1.0], [0.0, -2.0]])
+        positive, negative = map_weights(weights, 1e4, 1e6)
+        np.testing.assert_allclose(positive, [[1e4, 0], [0, 0]])
+        np.testing.assert_allclose(negative, [[0, 5.05e5], [1e6, 1e4]])
+
+    def test_conductance(self):
+        np.testing.assert_allclose(conductance([[1e3, 0.0]]), [[1e-3, 0.0]])
+
+    def test_quantize(self):
+        np.testing.assert_allclose(quantize([0.0, 0.5, 1.0], bits=2), [-3.0, -1.0, 3.0])
+        # Same truncation and mapping as the scalar DAC
+        values = np.random.default_rng(0).random(100)
+        expected = [(int(v * 1023) / 1023) * 6 + -3 for v in values]
+        self.assertEqual(quantize(values).tolist(), expected)
+
+    def test_quantize_dataset(self):
+        dataset = np.array([[0.0, 0.5, 1.0], [0.0, 0.0, 0.2], [0.1, 0.2, 0.3]])
+        with tempfile.TemporaryDirectory() as tmp:
+            path, output = os.path.join(tmp, "in.csv"), os.path.join(tmp, "out.npy")
+            write_csv(path, dataset)
+            rows = quantize_dataset(path, output, bits=2, min_nonzero=1, chunk=2)
+            self.assertEqual(rows.tolist(), [0, 2])
+            np.testing.assert_allclose(load_matrix(output), quantize(dataset[rows], 2))
+            rows = quantize_dataset(path, output, indices=[1, 2], chunk=2)
+            self.assertEqual(rows.tolist(), [1, 2])
+            self.assertEqual(load_matrix(output).shape, (2, 3))
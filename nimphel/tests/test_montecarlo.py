@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from nimphel.crossbar import IdealCrossbar
+from nimphel.mapping import map_weights
+from nimphel.montecarlo import *
+from nimphel.variability import Variability
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.positive, self.negative = map_weights(rng.normal(size=(12, 5)))
+        self.variability = Variability.from_range(1e4, 1e6, 0.01, seed=3)
+        self.inputs = rng.random((20, 12))
+
+    def reference(self, samples):
+        return np.stack(
+            [
+                IdealCrossbar.from_resistances(
+                    self.variability.sample(self.positive, s, stream=0),
+                    self.variability.sample(self.negative, s, stream=1),
+                ).differential(self.inputs)
+                for s in samples
+            ]
+        )
+
+    def test_ideal(self):
+        mc = MonteCarlo(
+            self.positive, self.negative, self.variability, memory=1 << 14, workers=2
+        )
+        result = mc.run(self.inputs, [4, 0, 7])
+        self.assertEqual(result.currents.shape, (3, 20, 5))
+        np.testing.assert_allclose(result.currents, self.reference([4, 0, 7]))
+        np.testing.assert_array_equal(result.predictions, result.currents.argmax(-1))
+        agreement = (result.predictions == result.nominal.argmax(-1)).mean(axis=1)
+        np.testing.assert_allclose(result.accuracy, agreement)
+        np.testing.assert_allclose(result.mean, result.currents.mean(axis=0))
+        np.testing.assert_allclose(
+            mc.currents(self.inputs[0], 7), result.currents[2, 0]
+        )
+
+        labels = np.zeros(20, dtype=int)
+        accuracy = mc.run(self.inputs, [4], labels).accuracy
+        self.assertEqual(accuracy[0], np.mean(result.predictions[0] == 0))
+        with self.assertRaises(ValueError):
+            mc.run(self.inputs, [4], labels[:3])
+
+    def test_output(self):
+        mc = MonteCarlo(self.positive, self.negative, self.variability, workers=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            result = mc.run(self.inputs, range(3), output=Path(tmp) / "currents")
+            self.assertIsInstance(result.currents, np.memmap)
+            np.testing.assert_allclose(result.currents, self.reference(range(3)))
+            del result
+
+    def test_wires(self):
+        tiny = MonteCarlo(
+            self.positive, self.negative, self.variability, 1e-6, 1e-6, workers=1
+        )
+        expected = self.reference([2])
+        result = tiny.run(self.inputs, [2])
+        np.testing.assert_allclose(result.currents, expected, rtol=1e-6)
+        wires = MonteCarlo(
+            self.positive, self.negative, self.variability, 100.0, 100.0, workers=1
+        )
+        currents = wires.currents(self.inputs, 2)
+        self.assertGreater(np.abs(currents - expected[0]).max(), 1e-9)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from nimphel.core import *
+from nimphel.writers import *
+from nimphel.readers.fast import *
+from nimphel.readers.bulk import *
+from nimphel.readers.index import *
+from nimphel.readers import reader
+
+NETLIST = """simulator lang=spectre
+global 0 gnd!
+// Crossbar
+subckt grid COL_0 COL_1
+V1 (IN_0 0) vsource type=pwl dc=0.5
+V2 (IN_1 0) vsource type=pwl dc=-0.5
+M1 (IN_0 COL_0) resistor r=1000.0
+M2 (IN_0 COL_1) resistor \\
+    r=2000.0
+M3 (IN_1 COL_0) resistor r=3k
+ends grid
+I0 (0 0) grid
+model nch bsim4 (vth0=0.4)
+op dc
+alt_1 altergroup {
+parameters vin=1
+}
+swp sweep param=vin values=[1 2] {
+op_0 dc
+}
+"""
+
+
+class TestFastSpectreReader(unittest.TestCase):
+    def test_reads(self):
+        R = Component("resistor", ["P", "N"], {})
+        circuit = FastSpectreReader([R]).reads(NETLIST)
+        self.assertEqual(circuit.directives[0], Directive("simulator", lang="spectre"))
+        self.assertEqual(circuit.directives[1], Directive("global 0 gnd!"))
+        self.assertEqual(circuit.directives[2], Model("nch", "bsim4", {"vth0": 0.4}))
+        self.assertEqual(circuit.directives[3], Analysis("op", "dc"))
+        self.assertEqual(circuit.directives[4], AlterGroup("alt_1", vin=1))
+        self.assertIsInstance(circuit.directives[5], Sweep)
+        self.assertEqual(circuit.directives[5].args, {"param": "vin", "values": [1, 2]})
+
+        grid = circuit.subcircuits[0]
+        self.assertEqual(list(grid.nodes), ["COL_0", "COL_1"])
+        insts = list(grid.instances)
+        self.assertEqual(len(insts), 5)
+        self.assertEqual(insts[0].nodes, {"n0": "IN_0", "n1": 0})
+        self.assertEqual(insts[0].params, {"type": "pwl", "dc": 0.5})
+        self.assertEqual(
+            insts[2],
+            Instance(
+                "resistor", {"P": "IN_0", "N": "COL_0"}, {"r": 1e3}, 1, "grid", "M"
+            ),
+        )
+        self.assertEqual(insts[4].params["r"], 3e3)
+        self.assertEqual([i.uid for i in circuit.instances], [0])
+
+    def test_columnar(self):
+        reader = FastSpectreReader(columnar=True)
+        table = reader.reads(NETLIST).subcircuits[0].instances
+        self.assertIsInstance(table, InstanceTable)
+        cols = [c for c in table.columns() if c.name == "resistor"]
+        r = np.concatenate([c.params["r"] for c in cols])
+        np.testing.assert_allclose(r, [1e3, 2e3, 3e3])
+        listed = FastSpectreReader(columnar=False).reads(NETLIST)
+        self.assertEqual(list(table), listed.subcircuits[0].instances)
+
+    def test_round_trip(self):
+        Mem = Component("resistor", ["P", "N"], {})
+        circuit = Circuit(columnar=True)
+        circuit.add(Directive("simulator", lang="spectre"))
+        circuit.add(Mem.new_many(dict(P=["A", "B", "C"], N=0), {"r": [1.5, 2.0, 1e6]}))
+        netlist = SpectreWriter().dump(circuit)
+        self.assertEqual(
+            SpectreWriter().dump(FastSpectreReader().reads(netlist)), netlist
+        )
+
+    def test_bare_params(self):
+        "Parameters without a value are written back without a value"
+        netlist = (
+            "V1 (a 0) vsource dc type=dc\nV2 (b 0) vsource dc type=dc\n"
+            "V3 (c 0) vsource dc"
+        )
+        for columnar in [False, True]:
+            circuit = FastSpectreReader(columnar=columnar).reads(netlist)
+            self.assertEqual(SpectreWriter().dump(circuit), netlist)
+            self.assertIsNone(list(circuit.instances)[0].params["dc"])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            FastSpectreReader().reads("subckt a b\nM1 (a b) res")
+        with self.assertRaises(ValueError):
+            FastSpectreReader().reads("ends a")
+
+
+class TestReadMany(unittest.TestCase):
+    def test_read_many(self):
+        R = Component("resistor", ["P", "N"], {})
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(3):
+                paths.append(Path(tmp) / f"netlist_{i}")
+                paths[-1].write_text(NETLIST.replace("r=1000.0", f"r={i}"))
+            results = read_many(paths, [R], workers=2)
+            inline = read_many(paths, [R], workers=1)
+        for result, other in zip(results, inline):
+            np.testing.assert_array_equal(result.nets, other.nets)
+        self.assertEqual([r.path for r in results], [str(p) for p in paths])
+        for i, result in enumerate(results):
+            resistors = result.select("resistor")
+            self.assertEqual(resistors.ctx, "grid")
+            np.testing.assert_allclose(resistors.params["r"], [i, 2e3, 3e3])
+            nodes = result.nets[resistors.nodes].tolist()
+            self.assertEqual(
+                nodes, [["IN_0", "COL_0"], ["IN_0", "COL_1"], ["IN_1", "COL_0"]]
+            )
+            top = result.select("grid", ctx=None)
+            self.assertEqual(result.nets[top.nodes].tolist(), [["0", "0"]])
+        self.assertIsNone(results[0].select("capacitor"))
+
+
+class TestNetlistIndex(unittest.TestCase):
+    def test_queries(self):
+        R = Component("resistor", ["P", "N"], {})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "netlist"
+            path.write_text(NETLIST)
+            with NetlistIndex(path, [R]) as index:
+                self.assertEqual(len(index), 6)
+                self.assertEqual(list(index.subckts), ["grid"])
+                self.assertEqual(
+                    index.text(index.find("M1")[0]), "M1 (IN_0 COL_0) resistor r=1000.0"
+                )
+                insts = index.instances(index.connected("COL_0"))
+                self.assertEqual([i.params["r"] for i in insts], [1e3, 3e3])
+                self.assertEqual(insts[0].nodes, {"P": "IN_0", "N": "COL_0"})
+                self.assertEqual(insts[0].ctx, "grid")
+                m2 = index.instance(index.find("M2", "grid")[0])
+                self.assertEqual(m2.params, {"r": 2e3})
+                self.assertEqual(len(index.find("M2", None)), 0)
+                self.assertEqual(len(index.connected("COL_9")), 0)
+                top = index.instances(index.within(None))
+                self.assertEqual(
+                    top, list(FastSpectreReader().reads(NETLIST).instances)
+                )
+                grid = index.subcircuit("grid")
+                self.assertEqual(
+                    list(grid.instances),
+                    list(
+                        FastSpectreReader([R]).reads(NETLIST).subcircuits[0].instances
+                    ),
+                )
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "netlist"
+            path.write_text(NETLIST)
+            NetlistIndex(path).close()
+            self.assertTrue((Path(tmp) / "netlist.index.npz").exists())
+            with NetlistIndex(path) as index:
+                self.assertIsNotNone(index._load())
+            path.write_text(NETLIST.replace("M3 (IN_1", "M30 (IN_9"))
+            with NetlistIndex(path) as index:
+                self.assertEqual(len(index.find("M30")), 1)
+                self.assertEqual(len(index.connected("IN_1")), 1)
+
+
+class TestParser(unittest.TestCase):
+    def setUp(self):
+        # LALR parsers are cached on disk, not in the cache of the user
+        self.cache_dir = reader.CACHE_DIR
+        self.tmp = tempfile.TemporaryDirectory()
+        reader.CACHE_DIR = Path(self.tmp.name)
+        # Parsers compiled by other tests are not written to this cache
+        reader.load_parser.cache_clear()
+
+    def tearDown(self):
+        reader.CACHE_DIR = self.cache_dir
+        reader.load_parser.cache_clear()
+        self.tmp.cleanup()
+
+    def test_lazy_import(self):
+        code = "import sys, nimphel; print('lark' in sys.modules)"
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+        self.assertEqual(out.stdout.strip(), "False")
+
+    def test_cache(self):
+        first, second = reader.SpectreReader(), reader.SpectreReader()
+        self.assertIs(first.parser, second.parser)
+        self.assertIsNot(first.parser, reader.SpectreReader(parser="lalr").parser)
+        with self.assertRaises(ValueError):
+            reader.Parser("unknown")
+
+    def test_disk_cache(self):
+        reader.load_parser("spice", "lalr", "circuit", True)
+        self.assertEqual(len(list(Path(self.tmp.name).glob("spice-*.lark"))), 1)
+
+    def test_lalr(self):
+        netlist = "model nch bsim4\nsimulator\n// comment\n"
+        for parser in ["earley", "lalr"]:
+            circuit = reader.SpectreReader(parser=parser).reads(netlist)
+            self.assertEqual(
+                circuit.directives, [Model("nch", "bsim4", {}), Directive("simulator")]
+            )
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from nimphel.results.ocean import *
+from nimphel.results.psf import *
+
+TABLE = """
+time (s)       i("/I0/COL_000 i("/I0/COL_001 v("/OUT")
+\n
+0              -0.002389      1.5m           0.3
+0.001          -0.0023694     2u             0.31
+0.002          -0.0023437     0              0.32
+"""
+
+
+class TestOcnPrint(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "table.txt")
+        with open(self.path, "w") as fp:
+            fp.write(TABLE)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_read(self):
+        table = read_ocnprint(self.path)
+        self.assertEqual(table.x_label, "time (s)")
+        self.assertEqual(
+            table.labels, ('i("/I0/COL_000', 'i("/I0/COL_001', 'v("/OUT")')
+        )
+        self.assertEqual(table.signals, ["/I0/COL_000", "/I0/COL_001", "/OUT"])
+        np.testing.assert_allclose(table.x, [0, 1e-3, 2e-3])
+        np.testing.assert_allclose(table.values[0], [-0.002389, 1.5e-3, 0.3])
+        np.testing.assert_allclose(table.column("/I0/COL_001"), [1.5e-3, 2e-6, 0])
+        np.testing.assert_allclose(table.column('v("/OUT")'), [0.3, 0.31, 0.32])
+        with self.assertRaises(KeyError):
+            table.column("/I0/COL_002")
+
+    def test_chunks(self):
+        chunks = list(iter_ocnprint(self.path, rows=2, labels=["a", "b", "c"]))
+        self.assertEqual([len(c.x) for c in chunks], [2, 1])
+        self.assertEqual(chunks[1].labels, ("a", "b", "c"))
+        np.testing.assert_allclose(chunks[1].values, [[-0.0023437, 0, 0.32]])
+        with self.assertRaises(ValueError):
+            next(iter_ocnprint(self.path, labels=["a"]))
+
+    def test_output(self):
+        output = os.path.join(self.dir.name, "table.npy")
+        table = read_ocnprint(self.path, rows=1, output=output)
+        self.assertIsInstance(table.values, np.memmap)
+        np.testing.assert_array_equal(table.values, read_ocnprint(self.path).values)
+        del table
+
+    def test_malformed(self):
+        with open(self.path, "a") as fp:
+            fp.write("0.003 1 2\n")
+        with self.assertRaises(ValueError):
+            read_ocnprint(self.path)
+
+
+def psf_ascii(traces, x=None, sweep="time"):
+    "Content of a PSF-ASCII file with the given signals"
+    lines = ["HEADER", '"PSFversion" "1.00"', '"simulator" "spectre"']
+    lines += ['"analysis type" "tran"' if x is not None else '"analysis type" "dc"']
+    lines += ["TYPE", '"V" FLOAT DOUBLE PROP(', '"key" "node"', ")"]
+    lines += ['"I" FLOAT DOUBLE PROP(', '"key" "branch"', '"units" "A"', ")"]
+    if x is not None:
+        lines += ["SWEEP", f'"{sweep}" "sweep" PROP(', '"key" "sweep"', ")"]
+    lines += ["TRACE"] + [f'"{name}" "{kind}"' for name, (kind, _) in traces.items()]
+    lines += ["VALUE"]
+    if x is None:
+        lines += [f'"{n}" "{k}" {v!r}' for n, (k, v) in traces.items()]
+    else:
+        for i, point in enumerate(x):
+            lines.append(f'"{sweep}" {point:.15e}')
+            lines += [f'"{n}" {v[i]:.15e}' for n, (_, v) in traces.items()]
+    return "\n".join(lines + ["END", ""])
+
+
+class TestPSFAscii(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "tran.tran")
+        self.x = np.linspace(0, 1e-3, 7)
+        self.traces = {
+            "IN_000": ("V", np.sin(self.x * 1e3)),
+            "I0:COL_000": ("I", -1e-3 * self.x),
+            "net with space": ("V", self.x + 1),
+        }
+        with open(self.path, "w") as fp:
+            fp.write(psf_ascii(self.traces, self.x))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_header(self):
+        with PSFAscii(self.path) as psf:
+            self.assertEqual(psf.header["simulator"], "spectre")
+            self.assertEqual(
+                psf.types["I"], {"type": "FLOAT DOUBLE", "key": "branch", "units": "A"}
+            )
+            self.assertEqual(psf.sweep, "time")
+            self.assertEqual(psf.names, list(self.traces))
+            self.assertEqual(psf.traces["I0:COL_000"], "I")
+            self.assertEqual(len(psf), 7)
+
+    def test_signals(self):
+        with PSFAscii(self.path) as psf:
+            np.testing.assert_allclose(psf.sweep_values(), self.x, rtol=1e-14)
+            for name, (_, values) in self.traces.items():
+                np.testing.assert_allclose(psf.signal(name), values, rtol=1e-14)
+            with self.assertRaises(KeyError):
+                psf.signal("COL_999")
+        table = read_psf(self.path, ["I0:COL_000"])
+        self.assertEqual(table.x_label, "time")
+        self.assertEqual(table.values.shape, (7, 1))
+        np.testing.assert_allclose(
+            table.column("I0:COL_000"), -1e-3 * self.x, rtol=1e-14
+        )
+
+    def test_operating_point(self):
+        with open(self.path, "w") as fp:
+            fp.write(psf_ascii({"IN_000": ("V", 0.5), "I0:COL_000": ("I", -2e-6)}))
+        with PSFAscii(self.path) as psf:
+            self.assertIsNone(psf.sweep)
+            self.assertEqual(len(psf), 1)
+            np.testing.assert_array_equal(psf.signal("I0:COL_000"), [-2e-6])
+            table = psf.waveforms()
+        np.testing.assert_array_equal(table.values, [[0.5, -2e-6]])
+
+    def test_errors(self):
+        with open(self.path, "w") as fp:
+            fp.write("time (s) i(x)\n0 1\n")
+        with self.assertRaises(ValueError):
+            PSFAscii(self.path)
+        with open(self.path, "w") as fp:
+            fp.write(
+                psf_ascii(self.traces, self.x).replace(
+                    '"IN_000" 0.000000000000000e+00\n', ""
+                )
+            )
+        with PSFAscii(self.path) as psf, self.assertRaises(ValueError):
+            psf.signal("IN_000")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import numpy as np
+
+from nimphel.core import *
+from nimphel.crossbar import IdealCrossbar, build_crossbar
+from nimphel.readers import FastSpectreReader
+from nimphel.solver import *
+
+R = Component("resistor", ["P", "N"], {})
+V = Component("vsource", ["VDD", "GND"], {}, cap="V")
+
+
+class TestDCSolver(unittest.TestCase):
+    def divider(self):
+        circuit = Circuit()
+        circuit.add(V.new(["IN", 0], {"dc": 2.0}))
+        circuit.add(R.new(["IN", "OUT"], {"r": 1e3}))
+        circuit.add(R.new(["OUT", 0], {"r": 3e3}))
+        return circuit
+
+    def test_divider(self):
+        solver = DCSolver(self.divider())
+        op = solver.solve()
+        self.assertEqual(op.nets, ["IN", "OUT"])
+        self.assertEqual(op.sources, ["V1"])
+        np.testing.assert_allclose(op.voltage("OUT"), 1.5)
+        # The current flows out of the positive node of the source
+        np.testing.assert_allclose(op.current("V1"), -0.5e-3)
+        np.testing.assert_allclose(solver.currents_into(op, ["0", "OUT"]), [0.5e-3, 0])
+
+    def test_batch(self):
+        solver = DCSolver(self.divider())
+        op = solver.solve(np.array([[1.0], [4.0], [-2.0]]))
+        self.assertEqual(op.voltages.shape, (3, 2))
+        np.testing.assert_allclose(op.voltage("OUT"), [0.75, 3.0, -1.5])
+        op = solver.solve({"V1": [1.0, 4.0]})
+        np.testing.assert_allclose(op.voltage("OUT"), [0.75, 3.0])
+        with self.assertRaises(ValueError):
+            solver.solve(np.ones(2))
+
+    def test_with_conductances(self):
+        solver = DCSolver(self.divider())
+        other = solver.with_conductances([1 / 3e3, 1 / 1e3])
+        np.testing.assert_allclose(other.solve().voltage("OUT"), 0.5)
+        np.testing.assert_allclose(solver.solve().voltage("OUT"), 1.5)
+        with self.assertRaises(ValueError):
+            solver.with_conductances([1.0])
+
+    def test_with_changes(self):
+        rng = np.random.default_rng(1)
+        resistances = rng.uniform(1e3, 1e4, 12)
+        circuit = Circuit(columnar=True)
+        circuit.add(V.new_many(dict(VDD=["A", "B"], GND=0), {"dc": [1.0, -2.0]}))
+        nodes = dict(P=["A", "B", "C", "D"] * 3, N=["C", "D", "E", 0] * 2 + [0] * 4)
+        circuit.add(R.new_many(nodes, {"r": resistances}))
+        solver = DCSolver(circuit)
+        self.assertEqual(solver.resistors[:2], ["M1", "M2"])
+        changes = {"M2": 1e-2, 4: 0.0, "M11": 1 / 50.0}
+        conductances = solver.conductances.copy()
+        conductances[[1, 4, 10]] = list(changes.values())
+        expected = solver.with_conductances(conductances).solve([[1.0, 2.0], [0, 3]])
+        updated = solver.with_changes(changes)
+        op = updated.solve([[1.0, 2.0], [0, 3]])
+        np.testing.assert_allclose(op.voltages, expected.voltages, rtol=1e-10)
+        np.testing.assert_allclose(op.currents, expected.currents, rtol=1e-10)
+        np.testing.assert_allclose(updated.conductances, conductances)
+        # Changes add up, and the original solver is not modified
+        twice = solver.with_changes({"M2": 1e-2}).with_changes({4: 0.0, 10: 1 / 50.0})
+        np.testing.assert_allclose(twice.solve().voltages, updated.solve().voltages)
+        np.testing.assert_allclose(
+            solver.solve().voltages, DCSolver(circuit).solve().voltages
+        )
+        np.testing.assert_allclose(
+            solver.with_changes({}).solve().voltages, solver.solve().voltages
+        )
+        with self.assertRaises(KeyError):
+            solver.with_changes({"M99": 1.0})
+        with self.assertRaises(ValueError):
+            # E is left floating
+            solver.with_changes({"M3": 0.0, "M7": 0.0})
+
+    def test_crossbar(self):
+        rng = np.random.default_rng(0)
+        resistances = rng.uniform(1e4, 1e6, (6, 4))
+        rows, cols = [f"IN_{i}" for i in range(6)], [f"COL_{j}" for j in range(4)]
+        circuit = Circuit(columnar=True)
+        circuit.add(V.new_many(dict(VDD=rows, GND=0), {"dc": 0.0}))
+        i, j = np.nonzero(resistances)
+        circuit.add(
+            R.new_many(
+                dict(P=np.array(rows)[i], N=np.array(cols)[j]), {"r": resistances[i, j]}
+            )
+        )
+        solver = DCSolver(circuit, ground=["0", *cols])
+        inputs = rng.uniform(-3, 3, (5, 6))
+        currents = solver.currents_into(solver.solve(inputs), cols)
+        ideal = IdealCrossbar.from_resistances(resistances).currents(inputs)
+        np.testing.assert_allclose(currents, ideal, rtol=1e-12)
+
+    def test_subcircuits(self):
+        netlist = """parameters vin=3
+subckt half IN OUT
+parameters rb=1k
+R1 (IN MID) resistor r=1k
+R2 (MID OUT) resistor r=rb
+ends half
+V1 (A 0) vsource dc=vin
+X1 (A B) half rb=2k
+X2 (B 0) half
+"""
+        circuit = FastSpectreReader([R]).reads(netlist)
+        solver = DCSolver(circuit)
+        self.assertEqual(solver.nets, ["A", "B", "X1.MID", "X2.MID"])
+        op = solver.solve()
+        # 3V across 1k + 2k + 1k + 1k
+        np.testing.assert_allclose(op.voltage("B"), 3 * 2 / 5)
+        np.testing.assert_allclose(op.voltage("X1.MID"), 3 * 4 / 5)
+        np.testing.assert_allclose(op.current("V1"), -3 / 5e3)
+        # Only the subcircuit, with its ports as nets
+        solver = DCSolver(circuit, ground=["OUT"], top="half")
+        self.assertEqual(solver.nets, ["IN", "MID"])
+
+    def test_errors(self):
+        circuit = self.divider()
+        circuit.add(Instance("capacitor", {"P": "OUT", "N": 0}, {"c": 1e-12}))
+        with self.assertRaises(ValueError):
+            DCSolver(circuit)
+        circuit = self.divider()
+        circuit.add(R.new(["FLOAT_A", "FLOAT_B"], {"r": 1.0}))
+        with self.assertRaises(ValueError):
+            DCSolver(circuit)
+        with self.assertRaises(ValueError):
+            DCSolver(self.divider(), top="missing")
+
+    def test_sensitivities(self):
+        rng = np.random.default_rng(2)
+        resistances = rng.uniform(1e4, 1e5, (4, 3))
+        rows, cols = [f"IN_{i}" for i in range(4)], [f"COL_{j}" for j in range(3)]
+        circuit = Circuit(columnar=True)
+        circuit.add(V.new_many(dict(VDD=rows, GND=0), {"dc": 0.0}))
+        g = 1 / resistances
+        circuit.add(build_crossbar(g, rows, cols))
+        solver = DCSolver(circuit, ground=["0", *cols])
+        inputs = rng.uniform(-1, 1, (2, 4))
+        # Ideal crossbar: dI_j/dR_ij = -V_i / R_ij²
+        S = solver.sensitivities(solver.solve(inputs), cols)
+        self.assertEqual(S.shape, (2, 3, 12))
+        expected = np.zeros((2, 3, 4, 3))
+        for j in range(3):
+            expected[:, j, :, j] = -inputs / resistances[:, j] ** 2
+        np.testing.assert_allclose(S, expected.reshape(2, 3, 12), atol=1e-20)
+
+        # With wires, compared to finite differences
+        wired = Circuit(columnar=True)
+        wired.add(V.new_many(dict(VDD=rows, GND=0), {"dc": 0.0}))
+        wired.add(build_crossbar(g, rows, cols, 50.0, 20.0))
+        base = DCSolver(wired, ground=["0", *cols])
+        for solver in (base, base.with_changes({"M3": 1e-3})):
+            chosen = ["M1", "M5", 20]
+            S = solver.sensitivities(solver.solve(inputs), cols, chosen)
+            for k, label in enumerate(chosen):
+                i = solver._resistor_index([label])[0]
+                currents = []
+                for step in (1e-3, -1e-3):
+                    conductances = solver.conductances.copy()
+                    conductances[i] = 1 / (1 / conductances[i] * (1 + step))
+                    other = solver.with_conductances(conductances)
+                    currents.append(other.currents_into(other.solve(inputs), cols))
+                h = 2e-3 / solver.conductances[i]
+                np.testing.assert_allclose(
+                    S[..., k], (currents[0] - currents[1]) / h, rtol=1e-5, atol=1e-16
+                )
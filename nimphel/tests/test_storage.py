@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from nimphel.storage import *
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.matrix = np.array([[1e4, 0.0, 2.5], [0.0, 505000.0, 1e6]])
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def _csv(self):
+        write_csv(self.path("res.csv"), self.matrix)
+        return self.path("res.csv")
+
+    def test_binary(self):
+        path = save_matrix(self.path("res"), self.matrix)
+        self.assertEqual(path.suffix, ".npy")
+        loaded = load_matrix(path)
+        self.assertIsInstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, self.matrix)
+        vector = load_matrix(save_matrix(self.path("vec"), self.matrix[0]))
+        self.assertEqual(vector.shape, (1, 3))
+
+    def test_csv(self):
+        write_csv(self.path("res.csv"), self.matrix)
+        with open(self.path("res.csv")) as fp:
+            self.assertEqual(fp.readline(), "10000.0,0,2.5\n")
+        np.testing.assert_array_equal(load_matrix(self.path("res.csv")), self.matrix)
+
+    def test_conversion(self):
+        write_csv(self.path("res.csv"), self.matrix)
+        binary = to_binary(self.path("res.csv"))
+        loaded = load_matrix(self.path("res.csv"), prefer_binary=True)
+        self.assertIsInstance(loaded, np.memmap)
+        os.remove(self.path("res.csv"))
+        to_csv(binary)
+        np.testing.assert_array_equal(read_csv(self.path("res.csv")), self.matrix)
+
+    def test_load_named_file(self):
+        "The CSV file is read even if a newer binary file has the same name"
+        write_csv(self.path("res.csv"), self.matrix)
+        save_matrix(self.path("res"), self.matrix.T)
+        np.testing.assert_array_equal(load_matrix(self.path("res.csv")), self.matrix)
+        binary = load_matrix(self.path("res.csv"), prefer_binary=True)
+        np.testing.assert_array_equal(binary, self.matrix.T)
+        os.rename(self.path("res.csv"), self.path("res"))
+        np.testing.assert_array_equal(load_matrix(self.path("res")), self.matrix)
+
+    def test_transpose_csv(self):
+        matrix = np.arange(35.0).reshape(5, 7)
+        write_csv(self.path("m.csv"), matrix)
+        # A tiny budget forces several chunks and blocks
+        transpose_csv(self.path("m.csv"), self.path("t.csv"), memory=64)
+        np.testing.assert_array_equal(read_csv(self.path("t.csv")), matrix.T)
+        transpose_csv(self.path("m.csv"), self.path("t.npy"), memory=64)
+        np.testing.assert_array_equal(load_matrix(self.path("t.npy")), matrix.T)
+        self.assertEqual(sorted(os.listdir(self.dir.name)), ["m.csv", "t.csv", "t.npy"])
+
+    def test_transpose_csv_text(self):
+        "The text of the values is kept"
+        with open(self.path("m.csv"), "w") as fp:
+            fp.write("1,0.50,2\n\n1e-5,0,-3.25\n")
+        transpose_csv(self.path("m.csv"), self.path("t.csv"), memory=64)
+        with open(self.path("t.csv")) as fp:
+            self.assertEqual(fp.read(), "1,1e-5\n0.50,0\n2,-3.25\n")
+
+    def test_matrix_writer(self):
+        with MatrixWriter(self.path("m")) as writer:
+            for chunk in read_csv_chunks(self._csv(), 1):
+                writer.write(chunk)
+        np.testing.assert_array_equal(load_matrix(writer.path), self.matrix)
+        with self.assertRaises(ValueError):
+            with MatrixWriter(self.path("bad")) as writer:
+                writer.write(self.matrix)
+                writer.write(self.matrix.T)
+        self.assertFalse(os.path.exists(self.path("bad.npy")))
+        self.assertEqual(len(os.listdir(self.dir.name)), 2)
@@ -16,3 +16,14 @@ class TestUtils(unittest.TestCase):
         res = missing_defaults(defaults, provided)
         self.assertIsNotNone(res)
         self.assertListEqual(res, ["a"])
+
+    def test_netgen_array(self):
+        for pattern, start, step in [("n{id}", 0, 1), ("{{x}}{id:03d}_", 95, 3)]:
+            loop, vectorized = NetGen(pattern, start, step), NetGen(
+                pattern, start, step
+            )
+            nets = vectorized.array((2, 3))
+            self.assertEqual(nets.shape, (2, 3))
+            self.assertListEqual(nets.ravel().tolist(), [loop() for _ in range(6)])
+            self.assertEqual(vectorized(), loop())
+        self.assertListEqual(NetGen("n{id:x}", 9).array(2).tolist(), ["na", "nb"])
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import numpy as np
+
+from nimphel.variability import *
+
+
+class TestVariability(unittest.TestCase):
+    def test_deterministic(self):
+        pv = Variability(1.0, seed=7)
+        full = pv.normal(3, 101)
+        np.testing.assert_array_equal(full, Variability(1.0, seed=7).normal(3, 101))
+        np.testing.assert_array_equal(full[5:60], pv.normal(3, 55, start=5))
+        self.assertFalse(np.array_equal(full, pv.normal(4, 101)))
+        self.assertFalse(np.array_equal(full, pv.normal(3, 101, stream=1)))
+
+    def test_distribution(self):
+        values = Variability(1.0, seed=1).normal(0, 100000)
+        self.assertAlmostEqual(values.mean(), 0.0, delta=0.02)
+        self.assertAlmostEqual(values.std(), 1.0, delta=0.02)
+
+    def test_samples(self):
+        res = np.array([[1e4, 0.0], [5e5, 1e6]])
+        pv = Variability.from_range(1e4, 1e6, seed=3)
+        samples = pv.samples(res, [2, 0], workers=2)
+        self.assertEqual(samples.shape, (2, 2, 2))
+        np.testing.assert_array_equal(samples[0], pv.sample(res, 2))
+        np.testing.assert_array_equal(samples[:, 0, 1], 0.0)
+        # Cells at the floor can be clamped back to their nominal value
+        self.assertTrue(np.all(samples[:, res > 1e4] != res[res > 1e4]))
+        self.assertTrue(np.all(samples[:, res > 0] >= 1e4))
+
+    def test_floor(self):
+        "Low resistances stay positive, and above the floor"
+        res = np.full((50, 40), 1e4)
+        samples = Variability.from_range(1e4, 1e6, 0.03, seed=5).samples(res, range(4))
+        self.assertEqual(samples.min(), 1e4)
+        self.assertTrue(np.any(samples > 1e4))
+        samples = Variability(3e4, seed=5).samples(res, range(4))
+        self.assertEqual(samples.min(), 1.0)
+        with self.assertRaises(ValueError):
+            Variability(3e4, floor=0.0)
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
+import io
 import unittest
 
+import numpy as np
+
 from nimphel.core import *
 from nimphel.writers import *
 
@@ -25,3 +28,141 @@ class TestWriter(unittest.TestCase):
         self.assertEqual(SW.dump(inst), "M1 (P N 0 1) Inv")
         inst = Instance("R", {"P": "P", "N": "N"}, params={"R": 1e3}, uid=2, cap="M")
         self.assertEqual(SW.dump(inst), "M2 (P N) R R=1000.0")
+
+    def test_columnar(self):
+        "Columnar circuits produce the same netlist"
+        SW = SpectreWriter()
+        V = Component("vsource", ["P", "N"], {"type": "pwl"}, cap="V")
+        R = Component("resistor", ["P", "N"], {})
+        circuits = [Circuit(), Circuit(columnar=True)]
+        for C in circuits:
+            C.add(Directive("simulator", lang="spectre"))
+            for i in range(3):
+                C.add(V.new([f"IN_{i}", 0], {"dc": float(i)}))
+                for j in range(2):
+                    C.add(R.new([f"IN_{i}", f"COL_{j}"], {"r": 1e3 * (i + j)}))
+            C.add(R.new(["COL_0", 0]))
+        self.assertEqual(SW.dump(circuits[0]), SW.dump(circuits[1]))
+        self.assertIn("V1 (IN_0 0) vsource dc", SW.dump(circuits[1]))
+
+    def test_columnar_float32(self):
+        "float32 parameters keep their shortest repr in both layouts"
+        SW = SpectreWriter()
+        R = Component("resistor", ["P", "N"], {})
+        r = np.array([0.1, 1e4, 2.5e-3], dtype=np.float32)
+        netlists = []
+        for C in [Circuit(), Circuit(columnar=True)]:
+            C.add(R.new_many([["A", "B", "C"], 0], {"r": r}))
+            netlists.append(SW.dump(C))
+        self.assertEqual(netlists[0], netlists[1])
+        self.assertIn("M1 (A 0) resistor r=0.1\n", netlists[1])
+
+    def test_dump_to_file(self):
+        "Streaming a circuit gives the same result as dump"
+        SW = SpectreWriter()
+        SW.chunk_size = 2
+        R = Component("resistor", ["P", "N"])
+        S = Subcircuit("cell", ["P", "N"], {"w": 1})
+        S.add(R.new(["P", "N"], {"r": 1e3}))
+        for C in [Circuit(), Circuit(columnar=True)]:
+            C.add(
+                [Directive("simulator", lang="spectre"), S, Subcircuit("empty", ["A"])]
+            )
+            C.add(R.new_many([[f"IN_{i}" for i in range(5)], 0], {"r": 1e3}))
+            C.add(S.new(["IN_0", 0]))
+            fp = io.StringIO()
+            SW.dump_to_file(C, fp, buffer_size=16)
+            self.assertEqual(fp.getvalue(), SW.dump(C))
+            self.assertEqual("".join(SW.iterdump(C)), SW.dump(C))
+
+    def test_fmt_values(self):
+        values = np.array([998928.0325523573, 1e-5, 1e16, 3.0, -3.0, 0.0])
+        self.assertEqual(fmt_values(values), [str(v) for v in values.tolist()])
+        self.assertEqual(fmt_values([1e4, 1.234e6], precision=2), ["1e+04", "1.2e+06"])
+        single = np.array([0.1, 1e20, 3.0], dtype=np.float32)
+        self.assertEqual(fmt_values(single), ["0.1", "1e+20", "3.0"])
+
+        eng = fmt_values([1e4, 1.2e6, 999.96, -4.7e-9, 0.0, 20], 3, engineering=True)
+        self.assertEqual(eng, ["10k", "1.2M", "1k", "-4.7n", "0", "20"])
+        spice = fmt_values([1.2e6], 3, engineering=True, scale=SPICE_SCALE)
+        self.assertEqual(spice, ["1.2meg"])
+
+    def test_precision(self):
+        R = Component("resistor", ["P", "N"])
+        for C in [Circuit(), Circuit(columnar=True)]:
+            C.add(R.new_many([["A", "B"], 0], {"r": [12345.678, 0.0]}))
+            SW = SpectreWriter(precision=3, engineering=True)
+            self.assertEqual(
+                SW.dump(C), "M1 (A 0) resistor r=12.3k\nM2 (B 0) resistor r=0"
+            )
+
+    def test_template(self):
+        SW = SpectreWriter()
+        R = Component("resistor", ["P", "N"])
+        V = Component("vsource", ["P", "N"], cap="V")
+        body, head = Circuit(), Circuit()
+        body.add(R.new_many([["A", "B"], 0], {"r": 1e3}))
+        head.add(V.new(["A", 0], {"dc": 1.0}))
+        full = Circuit()
+        full.add(
+            [V.new(["A", 0], {"dc": 1.0}), *R.new_many([["A", "B"], 0], {"r": 1e3})]
+        )
+
+        template = Template(SW, body)
+        self.assertEqual(template.dump(head), SW.dump(full))
+        fp = io.StringIO()
+        template.dump_to_file(fp, head, Directive("ends grid"))
+        self.assertEqual(fp.getvalue(), SW.dump(full) + "\nends grid")
+
+        template = Template(SW, body, include="body.scs")
+        self.assertEqual(
+            template.dump(head), 'V1 (A 0) vsource dc=1.0\ninclude "body.scs"'
+        )
+
+    def test_analysis(self):
+        SW = SpectreWriter()
+        self.assertEqual(
+            SW.dump(Analysis("tran1", "tran", stop="10m")), "tran1 tran stop=10m"
+        )
+        self.assertEqual(SW.dump(Analysis("op", "dc")), "op dc")
+        alter = AlterGroup("alt1", {"vin": 0.5})
+        self.assertEqual(SW.dump(alter), "alt1 altergroup {\nparameters vin=0.5\n}")
+        paramset = ParamSet("inputs", {"v0": [0, 1], "v1": [1, 0]})
+        self.assertEqual(SW.dump(paramset), "inputs paramset {\nv0 v1\n0 1\n1 0\n}")
+        self.assertEqual("".join(SW.iterdump(paramset)), SW.dump(paramset))
+        sweep = Sweep("swp", [Analysis("op", "dc")], param="vin", values=[0, 1])
+        self.assertEqual(SW.dump(sweep), "swp sweep param=vin values=[0 1] {\nop dc\n}")
+        sweep = Sweep(
+            "swp", [Analysis("op", "dc")], param="vin", values=np.array([0, 1])
+        )
+        self.assertEqual(SW.dump(sweep), "swp sweep param=vin values=[0 1] {\nop dc\n}")
+        self.assertEqual(SW.dump(Directive("global", {"0": None})), "global 0")
+        self.assertEqual(SpectreWriter.fmt_params({"a": 0, "b": None}), "a=0 b")
+
+    def test_parameter_sweep(self):
+        SW = SpectreWriter()
+        table = {"a": [1, 2, 2], "b": [0.5, 0.5, 1.5]}
+        directives = parameter_sweep(Analysis("op", "dc"), table)
+        self.assertEqual(
+            [SW.dump(d).split("\n")[0] for d in directives],
+            [
+                "parameters a=1 b=0.5",
+                "swp_values paramset {",
+                "swp sweep paramset=swp_values {",
+            ],
+        )
+        directives = parameter_sweep(Analysis("op", "dc"), table, altergroups=True)
+        self.assertEqual(
+            "\n".join(map(SW.dump, directives)),
+            "parameters a=1 b=0.5\nop0 dc\n"
+            "swp_alt1 altergroup {\nparameters a=2\n}\nop1 dc\n"
+            "swp_alt2 altergroup {\nparameters b=1.5\n}\nop2 dc",
+        )
+        directives = parameter_sweep(
+            Analysis("op", "dc"), {"v": [0.0, 1.0]}, altergroups=True
+        )
+        self.assertEqual(
+            "\n".join(map(SW.dump, directives)),
+            "parameters v=0.0\nop0 dc\n"
+            "swp_alt1 altergroup {\nparameters v=1.0\n}\nop1 dc",
+        )